@@ -0,0 +1,57 @@
+"""
+Time ``bulk_parse_summary`` over an archive of summary files with an
+increasing number of worker processes.
+
+The 2016 primary summary file is copied ``files`` times to a temporary
+directory.  The first run parses them in this process, and the others use
+pools of 2, 4, ... processes, up to the number of CPUs.
+
+Usage:
+
+    python benchmarks/bench_bulk.py [files]
+
+"""
+import multiprocessing
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+
+from chi_elections.bulk import bulk_parse_summary
+
+SUMMARY_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'tests', 'data', 'results', 'ap', 'summary__2016_primary.txt')
+
+
+def main(files=200):
+    dirname = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(files):
+            path = os.path.join(dirname, 'summary_{:04d}.txt'.format(i))
+            shutil.copy(SUMMARY_FILENAME, path)
+            paths.append(path)
+
+        cpus = multiprocessing.cpu_count()
+        process_counts = [1]
+        while process_counts[-1] * 2 <= cpus:
+            process_counts.append(process_counts[-1] * 2)
+
+        baseline = None
+        for processes in process_counts:
+            start = time.time()
+            rows = sum(len(batch) for batch in
+                       bulk_parse_summary(paths, processes=processes,
+                           chunksize=4))
+            secs = time.time() - start
+            if baseline is None:
+                baseline = secs
+            print("{} processes: {:.2f} sec, {:.0f} rows/sec, {:.2f}x".format(
+                processes, secs, rows / secs, baseline / secs))
+    finally:
+        shutil.rmtree(dirname)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
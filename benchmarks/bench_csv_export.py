@@ -0,0 +1,85 @@
+"""
+Compare the throughput of writing precinct results as CSV with
+``csv.DictWriter`` and ``Result.serialize()``, as the ``precincts`` command
+used to, and with the tuple rows from ``cli.precinct_rows``.
+
+About a million results are generated, written to the null device, for
+``Result`` objects and for a ``ResultTable``.
+
+Usage:
+
+    python benchmarks/bench_csv_export.py [races]
+
+"""
+import csv
+import os
+import sys
+import time
+
+from chi_elections.cli import PRECINCT_FIELDNAMES, precinct_rows, write_rows
+from chi_elections.precincts import (Election, PrecinctClient, Race,
+        ResultTable)
+
+WARDS = 50
+PRECINCTS_PER_WARD = 41
+CANDIDATES = 10
+
+
+def ward_result_dicts():
+    names = ['Candidate {}'.format(i) for i in range(CANDIDATES)]
+    for ward in range(1, WARDS + 1):
+        yield ward, [{
+            'reporting_unit_id': str(precinct),
+            'candidate': name,
+            'votes': ward + precinct + i,
+            'percent': 1.0 * i,
+        } for precinct in range(1, PRECINCTS_PER_WARD + 1)
+          for i, name in enumerate(names)]
+
+
+def load(races):
+    client = PrecinctClient(register_results=False)
+    election = Election('0', client=client)
+    wards = list(ward_result_dicts())
+    results = []
+    table = ResultTable()
+    for r in range(races):
+        race = Race(election, name='Race {}'.format(r), number=r)
+        for ward_num, result_dicts in wards:
+            results.extend(client.create_result(rd, race, ward_num)
+                           for rd in result_dicts)
+            table.extend(race, ward_num, result_dicts)
+    return results, table
+
+
+def write_dicts(f, results):
+    writer = csv.DictWriter(f, fieldnames=PRECINCT_FIELDNAMES)
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result.serialize())
+
+
+def write_tuples(f, results):
+    writer = csv.writer(f)
+    writer.writerow(PRECINCT_FIELDNAMES)
+    write_rows(writer, precinct_rows(results))
+
+
+def main(races=49):
+    results, table = load(races)
+    print("{} results".format(len(results)))
+
+    with open(os.devnull, 'w') as f:
+        for label, write, source in (
+                ('DictWriter, objects', write_dicts, results),
+                ('tuples, objects', write_tuples, results),
+                ('tuples, table', write_tuples, table)):
+            start = time.time()
+            write(f, source)
+            secs = time.time() - start
+            print("{:20s} {:.2f} sec, {:.0f} rows/sec".format(label, secs,
+                len(results) / secs))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
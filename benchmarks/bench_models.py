@@ -0,0 +1,85 @@
+"""
+Report the memory used per result by the precinct models for a synthetic
+full-city election.
+
+Results are created for every candidate in every precinct of 50 wards, as
+``PrecinctClient.create_result`` does, using:
+
+* dict: subclasses of the models without ``__slots__``
+* slots: the models, with results added to their reporting unit
+* unregistered: the models, without adding results to reporting units
+
+Usage:
+
+    python benchmarks/bench_models.py [races] [candidates]
+
+"""
+import sys
+import tracemalloc
+
+from chi_elections.precincts import (Candidate, Election, PrecinctClient,
+        Precinct, Race, Result, Ward)
+
+WARDS = 50
+PRECINCTS_PER_WARD = 41
+
+
+class DictResult(Result):
+    pass
+
+
+class DictWard(Ward):
+    pass
+
+
+class DictPrecinct(Precinct):
+    pass
+
+
+class DictCandidate(Candidate):
+    pass
+
+
+def load(races, candidates, result_cls, ward_cls, precinct_cls,
+        candidate_cls, register):
+    election = Election('0', client=PrecinctClient())
+    candidate_models = [candidate_cls('Candidate {}'.format(i))
+                        for i in range(candidates)]
+    wards = [ward_cls(w) for w in range(1, WARDS + 1)]
+    precincts = [(ward, [precinct_cls(p, ward)
+                         for p in range(1, PRECINCTS_PER_WARD + 1)])
+                 for ward in wards]
+
+    results = []
+    for r in range(races):
+        race = Race(election, name='Race {}'.format(r), number=r)
+        for ward, ward_precincts in precincts:
+            for precinct in ward_precincts:
+                for i, candidate in enumerate(candidate_models):
+                    results.append(result_cls(candidate, precinct.number + i,
+                        reporting_unit=precinct, percent=float(i), race=race,
+                        register=register))
+    return results
+
+
+def measure(races, candidates, *args):
+    tracemalloc.start()
+    results = load(races, candidates, *args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(results), size
+
+
+def main(races=10, candidates=5):
+    for label, args in (
+            ('dict', (DictResult, DictWard, DictPrecinct, DictCandidate,
+                      True)),
+            ('slots', (Result, Ward, Precinct, Candidate, True)),
+            ('unregistered', (Result, Ward, Precinct, Candidate, False))):
+        count, size = measure(races, candidates, *args)
+        print("{:12s} {} results, {:.1f} bytes/result".format(label, count,
+            float(size) / count))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
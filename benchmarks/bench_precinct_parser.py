@@ -0,0 +1,61 @@
+"""
+Compare peak memory and time of ``PrecinctParser.parse``, which builds a
+whole tree, and ``PrecinctParser.iter_results``, which streams rows.
+
+The synthetic page has a row for each of 50 wards' precincts and a vote and
+percentage column for each of 30 candidates.
+
+Usage:
+
+    python benchmarks/bench_precinct_parser.py [wards] [candidates]
+
+"""
+import sys
+import time
+import tracemalloc
+
+from chi_elections.precincts import PrecinctParser
+from chi_elections.synthetic import results_table
+
+PRECINCTS_PER_WARD = 40
+
+
+def build_page(wards, candidates):
+    names = ['Candidate {}'.format(i) for i in range(candidates)]
+    rows = [(ward * 1000 + precinct,
+             [(ward + precinct + i) % 97 for i in range(candidates)])
+            for ward in range(1, wards + 1)
+            for precinct in range(1, PRECINCTS_PER_WARD + 1)]
+    return results_table('Synthetic', 'Pct', rows, names)
+
+
+def measure(fn):
+    start = time.time()
+    count = fn()
+    secs = time.time() - start
+
+    # Tracing slows things down, so measure memory in a separate run.  Only
+    # memory allocated by Python is traced, not libxml2's tree.
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, secs, peak
+
+
+def main(wards=50, candidates=30):
+    page = build_page(wards, candidates)
+    parser = PrecinctParser()
+    print("{:.1f} MB page, {} rows, {} candidates".format(
+        len(page) / 1e6, wards * PRECINCTS_PER_WARD, candidates))
+
+    for label, fn in (
+            ('tree', lambda: len(parser.parse(page))),
+            ('streaming', lambda: sum(1 for r in parser.iter_results(page)))):
+        count, secs, peak = measure(fn)
+        print("{:9s} {} results in {:.2f} sec, peak {:.1f} MB".format(
+            label, count, secs, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
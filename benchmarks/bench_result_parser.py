@@ -0,0 +1,51 @@
+"""
+Compare the compiled ``ResultParser.parse_line`` against the per-field path.
+
+The 2016 primary summary file is repeated until it is large enough to time
+reliably, then both code paths are run over every line.
+
+Usage:
+
+    python benchmarks/bench_result_parser.py [repeat]
+
+"""
+import io
+import os.path
+import sys
+import time
+
+from chi_elections.summary import ResultParser
+
+SUMMARY_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'tests', 'data', 'results', 'ap', 'summary__2016_primary.txt')
+
+
+def load_lines(repeat):
+    with io.open(SUMMARY_FILENAME, encoding='utf-8') as f:
+        lines = f.read().splitlines(True)
+
+    return lines * repeat
+
+
+def time_parse(parse_line, lines):
+    start = time.time()
+    for line in lines:
+        parse_line(line)
+    return time.time() - start
+
+
+def main(repeat=100):
+    lines = load_lines(repeat)
+    parser = ResultParser()
+
+    fields_secs = time_parse(parser.parse_line_fields, lines)
+    compiled_secs = time_parse(parser.parse_line, lines)
+
+    print("{} lines".format(len(lines)))
+    print("per-field: {:.0f} lines/sec".format(len(lines) / fields_secs))
+    print("compiled:  {:.0f} lines/sec".format(len(lines) / compiled_secs))
+    print("speedup:   {:.2f}x".format(fields_secs / compiled_secs))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
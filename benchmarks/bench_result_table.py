@@ -0,0 +1,73 @@
+"""
+Compare the memory used per precinct result by ``Result`` objects and by a
+``ResultTable``.
+
+Result dictionaries, like those from ``PrecinctParser``, are generated for
+every precinct in 50 wards and loaded both ways.
+
+Usage:
+
+    python benchmarks/bench_result_table.py [precincts_per_ward] [candidates]
+
+"""
+import sys
+import time
+import tracemalloc
+
+from chi_elections.precincts import (Election, PrecinctClient, Race,
+        ResultTable)
+
+WARDS = 50
+
+
+def ward_result_dicts(precincts_per_ward, candidates):
+    names = ['Candidate {}'.format(i) for i in range(candidates)]
+    for ward in range(1, WARDS + 1):
+        yield ward, [{
+            'reporting_unit_id': str(precinct),
+            'candidate': name,
+            'votes': ward + precinct + i,
+            'percent': 1.0 * i,
+        } for precinct in range(1, precincts_per_ward + 1)
+          for i, name in enumerate(names)]
+
+
+def load_objects(client, race, wards):
+    results = []
+    for ward_num, result_dicts in wards:
+        results.extend(client.create_result(rd, race, ward_num)
+                       for rd in result_dicts)
+    return results
+
+
+def load_table(client, race, wards):
+    table = ResultTable()
+    for ward_num, result_dicts in wards:
+        table.extend(race, ward_num, result_dicts)
+    return table
+
+
+def measure(load, precincts_per_ward, candidates):
+    client = PrecinctClient()
+    race = Race(Election('0', client=client), name='Synthetic', number=1)
+    # Parse results up front so only the loaded results are measured
+    wards = list(ward_result_dicts(precincts_per_ward, candidates))
+
+    tracemalloc.start()
+    start = time.time()
+    loaded = load(client, race, wards)
+    secs = time.time() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(loaded), size, secs
+
+
+def main(precincts_per_ward=40, candidates=10):
+    for label, load in (('objects', load_objects), ('table', load_table)):
+        rows, size, secs = measure(load, precincts_per_ward, candidates)
+        print("{:8s} {} results, {:.1f} bytes/result, {:.2f} sec".format(
+            label, rows, float(size) / rows, secs))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,249 @@
+"""
+Time the parsers, ``Race.fetch_results`` and the command line CSV output
+against a synthetic election, and report the peak memory of each.
+
+Each benchmark is a class in the style of asv: ``setup()`` builds its input
+from a ``SyntheticElection`` and isn't timed, ``run()`` is timed ``repeat``
+times and the fastest run is reported, and ``teardown()`` cleans up.  Peak
+memory is measured with ``tracemalloc`` in a separate run, because tracing
+slows things down.  Only memory allocated by Python is counted, not
+libxml2's.
+
+Usage:
+
+    python benchmarks/bench_suite.py [--races N] [--candidates N]
+        [--wards N] [--precincts N] [--repeat N] [benchmark ...]
+
+"""
+import argparse
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'tests'))
+
+from chi_elections.cli import (PRECINCT_FIELDS, SUMMARY_FIELDS, precinct_rows,
+        summary_result_rows, write_output)
+from chi_elections.precincts import (Election, PrecinctClient,
+        PrecinctParser, Race)
+from chi_elections.summary import ResultParser, SummaryParser
+from chi_elections.synthetic import SyntheticElection
+
+from stub_server import StubServer
+
+
+class Benchmark(object):
+    name = None
+    unit = None
+
+    def setup(self, election):
+        pass
+
+    def run(self):
+        """
+        Run the benchmark and return the number of ``unit`` processed.
+        """
+        raise NotImplementedError
+
+    def teardown(self):
+        pass
+
+
+class ParseLine(Benchmark):
+    name = 'ResultParser.parse_line'
+    unit = 'lines'
+
+    def setup(self, election):
+        self.parser = ResultParser()
+        self.lines = [line + u'\r\n' for line in election.summary_lines()]
+
+    def run(self):
+        parse_line = self.parser.parse_line
+        for line in self.lines:
+            parse_line(line)
+        return len(self.lines)
+
+
+class SummaryParse(Benchmark):
+    name = 'SummaryParser.parse'
+    unit = 'lines'
+
+    def setup(self, election):
+        self.text = election.summary_text()
+
+    def run(self):
+        parser = SummaryParser()
+        parser.parse(self.text)
+        return sum(len(race.candidates) for race in parser.races)
+
+
+class PrecinctParse(Benchmark):
+    name = 'PrecinctParser.parse'
+    unit = 'rows'
+
+    def setup(self, election):
+        self.parser = PrecinctParser()
+        self.pages = [election.precinct_results_html(
+            election.race_numbers[0], ward) for ward in election.wards]
+
+    def run(self):
+        return sum(len(self.parser.parse(page)) for page in self.pages)
+
+
+def html_route(html_string):
+    return 200, {'Content-Type': 'text/html'}, html_string
+
+
+class FetchResults(Benchmark):
+    name = 'Race.fetch_results'
+    unit = 'results'
+    max_workers = 4
+
+    def setup(self, election):
+        self.server = StubServer(routes={
+            ('GET', '/en/wdlevel3.asp'): lambda r: html_route(
+                election.election_html()),
+            ('POST', '/en/wdlevel3.asp'): lambda r: html_route(
+                election.ward_results_html(r['form']['D3'][0])),
+            ('GET', '/en/pctlevel3.asp'): lambda r: html_route(
+                election.precinct_results_html(
+                    int(r['query']['race_number'][0]),
+                    int(r['query']['Ward'][0]))),
+        }).start()
+        client = PrecinctClient(
+            election_url=self.server.url('/en/wdlevel3.asp'),
+            precinct_url=self.server.url('/en/pctlevel3.asp'),
+            max_workers=self.max_workers,
+            register_results=False)
+        self.race = Election(elec_code=election.elec_code,
+            client=client).races[0]
+        self.race.wards
+
+    def run(self):
+        return len(self.race.fetch_results())
+
+    def teardown(self):
+        self.server.stop()
+
+
+def build_race(election, columnar=False):
+    """
+    Parse the precinct pages of the election's first race into results,
+    without a server.
+    """
+    race = Race(Election(elec_code=election.elec_code,
+        client=PrecinctClient(register_results=False)),
+        name=election.race_names[0], number=election.race_numbers[0])
+    parser = PrecinctParser()
+    return race.build_results([
+        (ward, parser.parse(election.precinct_results_html(race.number,
+            ward)))
+        for ward in election.wards], columnar=columnar)
+
+
+class SummaryCSV(Benchmark):
+    """
+    Stream a summary file on disk to CSV, like ``summary --file``.
+    """
+    name = 'summary CSV'
+    unit = 'rows'
+
+    def setup(self, election):
+        self.dirname = tempfile.mkdtemp()
+        self.path = os.path.join(self.dirname, 'summary.txt')
+        with open(self.path, 'wb') as f:
+            f.write(election.summary_text().encode('utf-8'))
+        self.rows = len(list(election.summary_lines()))
+
+    def run(self):
+        with open(self.path, 'rb') as f:
+            write_output(summary_result_rows(
+                SummaryParser().iter_file_results(f)), SUMMARY_FIELDS,
+                output=os.devnull)
+        return self.rows
+
+    def teardown(self):
+        shutil.rmtree(self.dirname)
+
+
+class PrecinctCSV(Benchmark):
+    name = 'precincts CSV'
+    unit = 'rows'
+    columnar = False
+
+    def setup(self, election):
+        self.results = build_race(election, columnar=self.columnar)
+
+    def run(self):
+        write_output(precinct_rows(self.results), PRECINCT_FIELDS,
+            output=os.devnull)
+        return len(self.results)
+
+
+class PrecinctTableCSV(PrecinctCSV):
+    name = 'precincts CSV, ResultTable'
+    columnar = True
+
+
+BENCHMARKS = [ParseLine, SummaryParse, PrecinctParse, FetchResults,
+              SummaryCSV, PrecinctCSV, PrecinctTableCSV]
+
+
+def measure(benchmark, election, repeat):
+    benchmark.setup(election)
+    try:
+        best = None
+        for i in range(repeat):
+            start = time.time()
+            count = benchmark.run()
+            secs = time.time() - start
+            if best is None or secs < best:
+                best = secs
+
+        tracemalloc.start()
+        benchmark.run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        benchmark.teardown()
+
+    return count, best, peak
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--races', type=int, default=100)
+    arg_parser.add_argument('--candidates', type=int, default=8)
+    arg_parser.add_argument('--wards', type=int, default=50)
+    arg_parser.add_argument('--precincts', type=int, default=40,
+        help="Precincts per ward")
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+        help="Class names of the benchmarks to run (default: all)")
+    args = arg_parser.parse_args(argv)
+
+    benchmarks = BENCHMARKS
+    if args.benchmarks:
+        benchmarks = [b for b in BENCHMARKS if b.__name__ in args.benchmarks]
+
+    election = SyntheticElection(races=args.races,
+        candidates=args.candidates, wards=args.wards,
+        precincts=args.precincts)
+    print("{} races, {} candidates, {} wards, {} precincts per ward".format(
+        args.races, args.candidates, args.wards, args.precincts))
+
+    for benchmark_cls in benchmarks:
+        count, secs, peak = measure(benchmark_cls(), election, args.repeat)
+        print("{:28s} {:8d} {:7s} {:8.4f} sec {:10.0f} {}/sec "
+              "peak {:6.1f} MB".format(benchmark_cls.name, count,
+                benchmark_cls.unit, secs, count / secs, benchmark_cls.unit,
+                peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare replaying an archive of summary files read into strings against
+memory-mapping them with ``SummaryParser.parse_file``.
+
+The 2016 primary summary file is written ``repeat`` times to a temporary
+directory, with different vote totals in each copy, like the polls of an
+election night.  Each approach then parses every file with one parser.
+
+Usage:
+
+    python benchmarks/bench_summary_mmap.py [repeat]
+
+"""
+import io
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import time
+
+from chi_elections.summary import SummaryParser
+
+SUMMARY_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'tests', 'data', 'results', 'ap', 'summary__2016_primary.txt')
+
+
+def write_archive(dirname, repeat):
+    with io.open(SUMMARY_FILENAME, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+
+    paths = []
+    for i in range(repeat):
+        path = os.path.join(dirname, 'summary_{:04d}.txt'.format(i))
+        with io.open(path, 'w', encoding='utf-8', newline='\r\n') as f:
+            for j, line in enumerate(lines):
+                vote_total = (i * 37 + j) % 10000000
+                f.write(line[:11] + u"{:07d}".format(vote_total) + line[18:] +
+                        u"\n")
+        paths.append(path)
+    return paths
+
+
+def time_call(fn, paths):
+    parser = SummaryParser()
+    start = time.time()
+    for path in paths:
+        fn(parser, path)
+    return time.time() - start
+
+
+def parse_string(parser, path):
+    with io.open(path, encoding='utf-8') as f:
+        parser.parse(f.read())
+
+
+def parse_mmap(parser, path):
+    with open(path, 'rb') as f:
+        parser.parse_file(f)
+
+
+def main(repeat=100):
+    dirname = tempfile.mkdtemp()
+    try:
+        paths = write_archive(dirname, repeat)
+        size = sum(os.path.getsize(p) for p in paths)
+        string_secs = time_call(parse_string, paths)
+        mmap_secs = time_call(parse_mmap, paths)
+    finally:
+        shutil.rmtree(dirname)
+
+    print("{} files, {:.1f} MB".format(len(paths), size / 1024.0 / 1024.0))
+    print("read + parse:     {:.2f} sec".format(string_secs))
+    print("mmap parse_file:  {:.2f} sec".format(mmap_secs))
+    print("speedup:          {:.2f}x".format(string_secs / mmap_secs))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,68 @@
+"""
+Time ``Race.fetch_results`` against a local server that adds latency to
+every response, with and without concurrent ward requests.
+
+Usage:
+
+    python benchmarks/bench_ward_fetch.py [latency] [max_workers]
+
+"""
+import os.path
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'tests'))
+
+from chi_elections.precincts import Election, PrecinctClient
+from chi_elections.synthetic import (election_html, precinct_results_html,
+        ward_results_html)
+
+from stub_server import StubServer
+
+RACE_NAME = 'Mayor'
+CANDIDATES = ['Candidate {}'.format(i) for i in range(5)]
+WARDS = list(range(1, 51))
+PRECINCTS = list(range(1, 41))
+
+
+def votes(ward, precinct):
+    if precinct is None:
+        return [sum(v) for v in zip(*[votes(ward, p) for p in PRECINCTS])]
+
+    return [ward + precinct + i for i in range(len(CANDIDATES))]
+
+
+def html_route(html_string):
+    return 200, {'Content-Type': 'text/html'}, html_string
+
+
+def main(latency=0.05, max_workers=10):
+    server = StubServer(routes={
+        ('GET', '/en/wdlevel3.asp'): lambda r: html_route(
+            election_html([RACE_NAME])),
+        ('POST', '/en/wdlevel3.asp'): lambda r: html_route(
+            ward_results_html('5', 1, RACE_NAME, CANDIDATES, WARDS, votes)),
+        ('GET', '/en/pctlevel3.asp'): lambda r: html_route(
+            precinct_results_html(RACE_NAME, CANDIDATES,
+                int(r['query']['Ward'][0]), PRECINCTS, votes)),
+    }, latency=latency).start()
+
+    try:
+        for workers in (1, max_workers):
+            client = PrecinctClient(
+                election_url=server.url('/en/wdlevel3.asp'),
+                precinct_url=server.url('/en/pctlevel3.asp'))
+            race = Election(elec_code='5', client=client).races[0]
+            race.wards
+            start = time.time()
+            results = race.fetch_results(max_workers=workers)
+            secs = time.time() - start
+            print("{:2d} workers: {} wards, {} results in {:.2f} sec".format(
+                workers, len(WARDS), len(results), secs))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main(*[float(a) for a in sys.argv[1:2]] + [int(a) for a in sys.argv[2:3]])
@@ -1,2 +1,39 @@
+import importlib
+import sys
+
 from .version import __version__
-from .summary import SummaryClient, SummaryParser
+
+# The clients are imported from their modules the first time they're used,
+# so importing the package, or running the command line interface, doesn't
+# import requests and lxml unless they're needed.
+_LAZY_ATTRIBUTES = {
+    'SummaryClient': 'summary',
+    'SummaryParser': 'summary',
+    'Election': 'precincts',
+    'PrecinctClient': 'precincts',
+}
+
+__all__ = ['__version__'] + sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+
+    value = getattr(importlib.import_module('.' + module_name, __name__),
+        name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ isn't supported
+    from .summary import SummaryClient, SummaryParser
+    from .precincts import Election, PrecinctClient
@@ -0,0 +1,219 @@
+"""
+Aggregate precinct results stored in a ``ResultTable``.
+
+Group-by sums and vote shares are computed over the table's columns in one
+pass, with NumPy if it's installed and with plain Python loops over the
+arrays otherwise.  Results are keyed by tuples of races, candidates, wards
+or precincts, in the order of the ``by`` columns, and sorted by those
+columns.
+
+"""
+from collections import OrderedDict, namedtuple
+
+from .precincts import ResultTable
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+GROUP_COLUMNS = ('race_id', 'candidate_id', 'ward', 'precinct')
+
+# Columns of the Board's results tables that aren't candidates
+NON_CANDIDATES = ('Votes Cast',)
+
+Discrepancy = namedtuple('Discrepancy',
+    ['race', 'candidate', 'ward', 'precinct_votes', 'ward_total'])
+
+
+def as_table(results):
+    if isinstance(results, ResultTable):
+        return results
+    return ResultTable.from_results(results)
+
+
+def _level_filter(table, level):
+    """
+    Return a function that is True for the row indexes at ``level``.
+    """
+    if level == 'precinct':
+        return lambda i: table.precinct[i] != ResultTable.WARD_TOTAL
+    elif level == 'ward':
+        return lambda i: table.precinct[i] == ResultTable.WARD_TOTAL
+    elif level is None:
+        return None
+    raise ValueError("level must be 'precinct', 'ward' or None")
+
+
+def _numpy_mask(table, columns, level, candidates_only):
+    mask = numpy.ones(len(table), dtype=bool)
+    if level == 'precinct':
+        mask &= columns['precinct'] != ResultTable.WARD_TOTAL
+    elif level == 'ward':
+        mask &= columns['precinct'] == ResultTable.WARD_TOTAL
+    elif level is not None:
+        raise ValueError("level must be 'precinct', 'ward' or None")
+
+    if candidates_only:
+        excluded = [i for i, c in enumerate(table.candidates.values)
+                    if c.name in NON_CANDIDATES]
+        if excluded:
+            mask &= ~numpy.isin(columns['candidate_id'], excluded)
+
+    return mask
+
+
+def _group_sums_numpy(table, by, level, candidates_only):
+    columns = table.to_numpy()
+    mask = _numpy_mask(table, columns, level, candidates_only)
+    if not mask.any():
+        return []
+
+    # Combine the key columns into a single integer per row, so grouping is
+    # a one-dimensional unique rather than a much slower unique of rows
+    key_columns = [columns[c][mask].astype(numpy.int64) for c in by]
+    sizes = [int(column.max()) + 1 for column in key_columns]
+    combined = numpy.zeros(len(key_columns[0]), dtype=numpy.int64)
+    for column, size in zip(key_columns, sizes):
+        combined = combined * size + column
+
+    groups, inverse = numpy.unique(combined, return_inverse=True)
+    sums = numpy.bincount(inverse.ravel(),
+        weights=columns['votes'][mask].astype(numpy.float64),
+        minlength=len(groups))
+
+    keys = []
+    for size in reversed(sizes):
+        keys.append(groups % size)
+        groups = groups // size
+    keys.reverse()
+
+    return [(tuple(int(k) for k in key), int(total))
+            for key, total in zip(zip(*keys), sums)]
+
+
+def _group_sums_python(table, by, level, candidates_only):
+    include = _level_filter(table, level)
+    excluded = set()
+    if candidates_only:
+        excluded = set(i for i, c in enumerate(table.candidates.values)
+                       if c.name in NON_CANDIDATES)
+
+    key_columns = [getattr(table, c) for c in by]
+    candidate_id = table.candidate_id
+    votes = table.votes
+    sums = {}
+    for i in range(len(table)):
+        if include is not None and not include(i):
+            continue
+        if candidate_id[i] in excluded:
+            continue
+        key = tuple(column[i] for column in key_columns)
+        sums[key] = sums.get(key, 0) + votes[i]
+
+    return sorted(sums.items())
+
+
+def _decode_key(table, by, key):
+    decoded = []
+    for column, value in zip(by, key):
+        if column == 'race_id':
+            decoded.append(table.races[value])
+        elif column == 'candidate_id':
+            decoded.append(table.candidates[value])
+        else:
+            decoded.append(value)
+    return tuple(decoded)
+
+
+def _group_sums(table, by, level, candidates_only, use_numpy):
+    for column in by:
+        if column not in GROUP_COLUMNS:
+            raise ValueError("Can't group by {}".format(column))
+
+    if use_numpy is None:
+        use_numpy = numpy is not None
+
+    if use_numpy:
+        return _group_sums_numpy(table, by, level, candidates_only)
+    return _group_sums_python(table, by, level, candidates_only)
+
+
+def group_sums(results, by=('race_id', 'candidate_id'), level='precinct',
+        candidates_only=False, use_numpy=None):
+    """
+    Sum votes grouped by columns of a ``ResultTable``.
+
+    ``results`` is a ``ResultTable`` or a list of ``Result`` objects.  ``by``
+    is a sequence of ``GROUP_COLUMNS``.  ``level`` is 'precinct' to only
+    sum precinct rows, 'ward' to only sum the ward total rows, or None for
+    all rows.  If ``candidates_only`` is True, columns like 'Votes Cast' are
+    left out.
+
+    Returns an ``OrderedDict`` mapping tuples of the ``by`` values, with
+    ids replaced by ``Race`` and ``Candidate`` objects, to vote totals.
+
+    """
+    table = as_table(results)
+    sums = _group_sums(table, tuple(by), level, candidates_only, use_numpy)
+    return OrderedDict((_decode_key(table, by, key), total)
+                       for key, total in sums)
+
+
+def totals_by_race(results, **kwargs):
+    return group_sums(results, by=('race_id', 'candidate_id'), **kwargs)
+
+
+def totals_by_ward(results, **kwargs):
+    return group_sums(results, by=('race_id', 'ward', 'candidate_id'),
+        **kwargs)
+
+
+def vote_shares(results, by=('race_id',), level='precinct', use_numpy=None):
+    """
+    Calculate each candidate's share of the candidate votes in each group.
+
+    ``by`` are the columns, other than 'candidate_id', to group by.  Returns
+    an ``OrderedDict`` mapping tuples of the ``by`` values followed by the
+    candidate to the fraction of the group's votes, or None if the group
+    has no votes.
+
+    """
+    table = as_table(results)
+    by = tuple(by)
+    group_totals = group_sums(table, by=by, level=level,
+        candidates_only=True, use_numpy=use_numpy)
+    candidate_totals = group_sums(table, by=by + ('candidate_id',),
+        level=level, candidates_only=True, use_numpy=use_numpy)
+
+    shares = OrderedDict()
+    for key, votes in candidate_totals.items():
+        total = group_totals[key[:-1]]
+        shares[key] = float(votes) / total if total else None
+    return shares
+
+
+def reconcile_ward_totals(results, use_numpy=None):
+    """
+    Check that the precinct results in each ward add up to the ward's
+    "Total" row.
+
+    Returns a list of ``Discrepancy`` tuples for each race, candidate and
+    ward where they don't.
+
+    """
+    table = as_table(results)
+    by = ('race_id', 'ward', 'candidate_id')
+    precinct_sums = dict(_group_sums(table, by, 'precinct', False, use_numpy))
+    ward_totals = dict(_group_sums(table, by, 'ward', False, use_numpy))
+
+    discrepancies = []
+    for key in sorted(set(precinct_sums) | set(ward_totals)):
+        precinct_votes = precinct_sums.get(key, 0)
+        ward_total = ward_totals.get(key, 0)
+        if precinct_votes != ward_total:
+            race, ward, candidate = _decode_key(table, by, key)
+            discrepancies.append(Discrepancy(race, candidate, ward,
+                precinct_votes, ward_total))
+
+    return discrepancies
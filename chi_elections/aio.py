@@ -0,0 +1,378 @@
+"""
+Fetch results with asyncio.
+
+``AsyncSummaryClient`` and ``AsyncPrecinctClient`` make their requests with
+``aiohttp`` so the summary file can be polled and precinct results scraped
+concurrently in one event loop.  They use the same parsers and models as
+``SummaryClient`` and ``PrecinctClient``; only the requests are different.
+
+Each client has its own ``aiohttp.ClientSession``, which is created the first
+time it's needed, inside the running event loop.  Use the clients as async
+context managers, or call ``close()``, to close their connections.
+
+This module requires Python 3.6 or later and the ``aiohttp`` package.
+
+"""
+import asyncio
+from collections import deque
+import random
+import time
+
+import aiohttp
+
+from .cache import CacheMiss
+from .precincts import Election, PrecinctClient, is_server_error
+from .summary import SummaryClient
+
+
+def is_retriable(exc):
+    """
+    Return True if an exception raised by an ``aiohttp`` request is worth
+    retrying, like ``precincts.is_retriable()``.
+    """
+    if isinstance(exc, (asyncio.TimeoutError,
+                        aiohttp.ClientConnectionError)):
+        return True
+    return (isinstance(exc, aiohttp.ClientResponseError) and
+            is_server_error(exc.status))
+
+
+class AsyncSessionMixin(object):
+    """
+    Create an ``aiohttp.ClientSession`` on demand and close it.
+    """
+    def create_session(self):
+        # A ClientSession has to be created in the event loop it's used in,
+        # so wait until the first request
+        return None
+
+    def create_connector(self):
+        return aiohttp.TCPConnector()
+
+    def get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=self.create_connector())
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class LineFeed(object):
+    """
+    An iterator of lines that are added as they're read from a response.
+    """
+    def __init__(self):
+        self._lines = deque()
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._lines:
+            return self._lines.popleft()
+        if self._closed:
+            raise StopIteration
+        raise RuntimeError("The parser read past the lines received")
+
+    next = __next__
+
+    def append(self, line):
+        self._lines.append(line)
+
+    def close(self):
+        self._closed = True
+
+
+class AsyncSummaryClient(AsyncSessionMixin, SummaryClient):
+    """
+    Fetch and parse the summary file with ``aiohttp``.
+
+    This makes the same conditional requests as ``SummaryClient``, and
+    ``fetch()`` and ``poll()`` take the same arguments, but they're
+    coroutines.  ``session`` is an ``aiohttp.ClientSession``.
+
+    """
+    async def fetch(self):
+        """
+        Fetch the summary file and parse it if it has changed.
+
+        Returns True if the file was parsed.  Parsing happens in the event
+        loop, which is fine for a file the size of the summary file.
+
+        """
+        url = self.get_url()
+        start = time.time()
+        try:
+            async with self.get_session().get(url,
+                    headers=self.get_request_headers()) as r:
+                content = await r.read()
+        except aiohttp.ClientError:
+            self.record_request(url, None, 0, start)
+            raise
+        self.record_request(url, r.status, len(content), start)
+        if r.status != 304:
+            r.raise_for_status()
+        text = content.decode(r.get_encoding())
+        return self.handle_response(r.status, r.headers, content, text)
+
+    async def poll(self, interval=30, backoff=1, max_interval=None,
+            callback=None, max_polls=None):
+        """
+        Fetch the summary file repeatedly.
+
+        This waits between fetches like ``SummaryClient.poll()``.
+        ``callback`` can be a function or a coroutine function.
+
+        """
+        if max_interval is None:
+            max_interval = interval
+
+        wait = interval
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            try:
+                changed = await self.fetch()
+            except aiohttp.ClientError:
+                self.stats.errors += 1
+                changed = False
+
+            polls += 1
+
+            if changed:
+                wait = interval
+                if callback is not None:
+                    value = callback(self)
+                    if asyncio.iscoroutine(value):
+                        await value
+            else:
+                wait = min(wait * backoff, max_interval)
+
+            if max_polls is None or polls < max_polls:
+                await asyncio.sleep(wait)
+
+    async def iter_results(self):
+        """
+        Stream the summary file and generate ``(race, result)`` tuples.
+
+        This is an asynchronous generator, to be used with ``async for``.
+        Like ``SummaryClient.iter_results()``, results are generated as
+        lines arrive, and this doesn't make a conditional request or change
+        ``races``.
+
+        """
+        url = self.get_url()
+        start = time.time()
+        try:
+            r = await self.get_session().get(url)
+        except aiohttp.ClientError:
+            self.record_request(url, None, 0, start)
+            raise
+        self.stats.fetches += 1
+        latency = time.time() - start
+        size = self.stats.bytes
+        races = results = 0
+        race = None
+        start = time.time()
+        try:
+            r.raise_for_status()
+            # The parser generates a result for each line that isn't blank,
+            # so it's fed one line before each result is taken from it
+            lines = LineFeed()
+            parsed = self._parser.iter_results(lines)
+            async for line in r.content:
+                self.stats.bytes += len(line)
+                line = line.rstrip(b'\r\n')
+                if not line.strip():
+                    continue
+                lines.append(line)
+                race_result = next(parsed)
+                results += 1
+                if race_result[0] is not race:
+                    race = race_result[0]
+                    races += 1
+                yield race_result
+            lines.close()
+            for race_result in parsed:
+                yield race_result
+        finally:
+            r.release()
+            if self.instrumentation is not None:
+                self.instrumentation.record_request('summary', 'GET', url,
+                    r.status, self.stats.bytes - size, latency)
+                self.instrumentation.record_parse('summary', results,
+                    time.time() - start)
+                self.instrumentation.record_created('summary.Race', races)
+                self.instrumentation.record_created('summary.Result',
+                    results)
+
+
+class AsyncPrecinctClient(AsyncSessionMixin, PrecinctClient):
+    """
+    Fetch and parse precinct results with ``aiohttp``.
+
+    At most ``max_workers`` requests are in flight at once, across every
+    coroutine using the client, and they share one connection pool.  The
+    ``fetch_*`` methods are coroutines.  ``session`` is an
+    ``aiohttp.ClientSession``.
+
+    The models' own ``fetch_*`` methods make blocking requests, so fetch
+    races, wards and results through the client instead:
+
+        async with AsyncPrecinctClient(max_workers=8) as client:
+            election = await client.fetch_election('25')
+            race = election.races[0]
+            await client.fetch_wards(race)
+            results = await client.fetch_results(race)
+
+    ``timeout`` and ``retries`` work as they do for ``PrecinctClient``.
+    ``AdaptiveConcurrency`` blocks its thread while it waits, so
+    ``concurrency`` isn't supported.
+
+    """
+    def __init__(self, *args, **kwargs):
+        if kwargs.get('concurrency') is not None:
+            raise ValueError(
+                "AsyncPrecinctClient doesn't support concurrency")
+        super(AsyncPrecinctClient, self).__init__(*args, **kwargs)
+        self._semaphore = None
+
+    def create_connector(self):
+        return aiohttp.TCPConnector(limit=max(self.max_workers, 10))
+
+    def get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    async def request(self, method, url, data=None):
+        if self._cache is not None:
+            text = self._cache.get(method, url, data)
+            if text is not None:
+                return text
+            if self._cache.offline:
+                raise CacheMiss("{} {} is not cached".format(method, url))
+
+        attempt = 0
+        while True:
+            try:
+                text = await self.send_request(method, url, data)
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries or not is_retriable(e):
+                    raise
+                attempt += 1
+                await asyncio.sleep(random.uniform(0,
+                    self.retry_wait * 2 ** (attempt - 1)))
+
+        if self._cache is not None:
+            self._cache.set(method, url, data, text)
+
+        return text
+
+    async def send_request(self, method, url, data=None):
+        """
+        Make a single request and return its text, raising an
+        ``aiohttp.ClientResponseError`` for an error status.
+        """
+        kwargs = {}
+        if self.timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with self.get_semaphore():
+            if self._rate_limiter is not None:
+                delay = self._rate_limiter.reserve(url)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            start = time.time()
+            try:
+                async with self.get_session().request(method, url,
+                        data=data, **kwargs) as r:
+                    content = await r.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.record_request(method, url, None, 0, start)
+                raise
+            self.record_request(method, url, r.status, len(content), start)
+            r.raise_for_status()
+            return content.decode(r.get_encoding())
+
+    async def fetch_precinct_result_dicts(self, elec_code, race_number,
+            ward_num):
+        html_string = await self.fetch_precinct_results_html(elec_code,
+            race_number, ward_num)
+        return self.parse_results(self._parser, html_string)
+
+    async def fetch_precinct_results(self, elec_code, race, ward_num):
+        race_number = getattr(race, 'number', race)
+        results = await self.fetch_precinct_result_dicts(elec_code,
+            race_number, ward_num)
+        return self.create_results(results, race, ward_num)
+
+    async def fetch_races(self, election):
+        """
+        Fetch the races of an ``Election`` and return them.
+        """
+        election.parse_races(await self.fetch_election_html(
+            election.elec_code))
+        return election.races
+
+    async def fetch_election(self, elec_code, name=None):
+        """
+        Create an ``Election`` using this client and fetch its races.
+        """
+        election = Election(elec_code, name=name, client=self)
+        await self.fetch_races(election)
+        return election
+
+    async def fetch_wards(self, race):
+        """
+        Fetch the wards of a ``Race`` and return them.
+        """
+        race.parse_wards(await self.fetch_ward_results_html(
+            elec_code=race.election.elec_code, race_name=race.name))
+        return race.wards
+
+    async def fetch_result_dicts(self, race):
+        """
+        Fetch and parse the precinct results for every ward in a race
+        concurrently.
+
+        Returns a list of ``(ward_number, result_dicts)`` tuples in ward
+        order.  The race's wards are fetched first if they haven't been.
+
+        """
+        if race._wards is None:
+            await self.fetch_wards(race)
+
+        ward_numbers = [ward.number for ward in race.wards]
+        ward_result_dicts = await asyncio.gather(*[
+            self.fetch_precinct_result_dicts(race.election.elec_code,
+                race.number, ward_num)
+            for ward_num in ward_numbers
+        ])
+        return list(zip(ward_numbers, ward_result_dicts))
+
+    async def fetch_results(self, race, columnar=None):
+        """
+        Fetch the precinct results for every ward in a race.
+
+        Results are returned in ward order, and set as the race's
+        ``results``.  If ``columnar`` is True, they're returned as a
+        ``ResultTable``.  It defaults to the client's ``columnar``.
+
+        """
+        ward_result_dicts = await self.fetch_result_dicts(race)
+        race._results = race.build_results(ward_result_dicts,
+            columnar=columnar)
+        return race._results
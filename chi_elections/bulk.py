@@ -0,0 +1,228 @@
+"""
+Parse archives of summary files and precinct pages in parallel.
+
+Files are spread across a pool of processes.  Each worker reads and parses
+its files and sends the results back as a batch of ``array`` columns, with
+repeated text like race and candidate names stored once, rather than as
+``Race`` and ``Result`` objects, so little time is spent pickling.  Batches
+are yielded in the same order as the paths, as soon as each one and the
+batches before it are ready.
+
+"""
+from array import array
+from collections import namedtuple
+from functools import partial
+import gzip
+import multiprocessing
+
+from .cache import ResponseCache
+from .summary import iter_records
+
+# Reporting unit of the "Total" rows of precinct and ward pages
+TOTAL = 0
+
+
+class SummaryBatch(namedtuple('SummaryBatch', ['path', 'contest_code',
+        'candidate_number', 'precincts_total', 'precincts_reporting',
+        'vote_total', 'text_id', 'texts'])):
+    """
+    The results parsed from one summary file.
+
+    The numeric columns are arrays with a value per line.  ``texts`` is a
+    list of ``(race_name, vote_for, candidate_name, party)`` tuples, and
+    ``text_id`` gives the index of each line's tuple.
+
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.contest_code)
+
+    def rows(self):
+        """
+        Generate a tuple of ``(contest_code, race_name, precincts_total,
+        precincts_reporting, vote_for, candidate_number, full_name, party,
+        vote_total)`` for each line.
+        """
+        texts = self.texts
+        for i in range(len(self.contest_code)):
+            race_name, vote_for, full_name, party = texts[self.text_id[i]]
+            yield (self.contest_code[i], race_name, self.precincts_total[i],
+                   self.precincts_reporting[i], vote_for,
+                   self.candidate_number[i], full_name, party,
+                   self.vote_total[i])
+
+
+class PrecinctBatch(namedtuple('PrecinctBatch', ['path', 'reporting_unit',
+        'candidate_id', 'votes', 'percent', 'candidates'])):
+    """
+    The results parsed from one precinct or ward results page.
+
+    ``reporting_unit`` is the precinct or ward number of each result, or
+    ``TOTAL`` for the "Total" row.  ``candidates`` is a list of names, and
+    ``candidate_id`` gives the index of each result's candidate.  Missing
+    percentages are NaN.
+
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.votes)
+
+    def rows(self):
+        """
+        Generate a tuple of ``(reporting_unit, candidate, votes)`` for each
+        result, with None as the reporting unit of totals.
+        """
+        candidates = self.candidates
+        for i in range(len(self.votes)):
+            reporting_unit = self.reporting_unit[i]
+            yield (None if reporting_unit == TOTAL else reporting_unit,
+                   candidates[self.candidate_id[i]], self.votes[i])
+
+
+def parse_summary_file(path):
+    """
+    Parse a summary file into a ``SummaryBatch``.
+
+    Missing numbers, like the vote totals of malformed lines, are stored as
+    0.
+
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    batch = SummaryBatch(path, array('H'), array('H'), array('H'),
+        array('H'), array('I'), array('I'), [])
+    text_ids = {}
+    for record in iter_records(content):
+        batch.contest_code.append(record.contest_code or 0)
+        batch.candidate_number.append(record.candidate_number or 0)
+        batch.precincts_total.append(record.precincts_total or 0)
+        batch.precincts_reporting.append(record.precincts_reporting or 0)
+        batch.vote_total.append(record.vote_total or 0)
+
+        raw_text = record.raw_text()
+        try:
+            batch.text_id.append(text_ids[raw_text])
+        except KeyError:
+            text_ids[raw_text] = len(batch.texts)
+            batch.text_id.append(len(batch.texts))
+            batch.texts.append((record.race_name, record.vote_for,
+                                record.candidate_name, record.party))
+
+    return batch
+
+
+def _read_page(path):
+    if path.endswith('.gz'):
+        f = gzip.open(path, 'rb')
+    else:
+        f = open(path, 'rb')
+    with f:
+        return f.read()
+
+
+def _parse_results_file(path, parser, encoding=None):
+    content = _read_page(path)
+    if encoding is None and ResponseCache.is_cache_path(path):
+        encoding = 'utf-8'
+
+    reporting_unit = array('H')
+    candidate_id = array('I')
+    votes = array('I')
+    percent = array('d')
+    candidates = []
+    candidate_ids = {}
+    for result in parser.iter_results(content, encoding=encoding):
+        unit = result['reporting_unit_id']
+        reporting_unit.append(TOTAL if unit == 'Total' else int(unit))
+        try:
+            candidate_id.append(candidate_ids[result['candidate']])
+        except KeyError:
+            candidate_ids[result['candidate']] = len(candidates)
+            candidate_id.append(len(candidates))
+            candidates.append(result['candidate'])
+        votes.append(result['votes'])
+        percent.append(result.get('percent', float('nan')))
+
+    return PrecinctBatch(path, reporting_unit, candidate_id, votes, percent,
+        candidates)
+
+
+def parse_precinct_file(path, encoding=None):
+    """
+    Parse a saved precinct results page into a ``PrecinctBatch``.
+
+    Pages are decoded using the character set they declare, which is
+    windows-1252 for pages saved from the Board of Elections website,
+    unless ``encoding`` is specified.  Pages saved by ``ResponseCache`` are
+    read as UTF-8, which is how it saves them, and pages are gunzipped if
+    the path ends in '.gz', so a cache directory can be parsed directly.
+
+    """
+    # lxml is only imported by processes that parse precinct pages
+    from .precincts import PrecinctParser
+    return _parse_results_file(path, PrecinctParser(), encoding)
+
+
+def parse_ward_file(path, encoding=None):
+    """
+    Parse a saved ward results page into a ``PrecinctBatch``, like
+    ``parse_precinct_file()``.
+    """
+    from .precincts import WardParser
+    return _parse_results_file(path, WardParser(), encoding)
+
+
+def bulk_parse(paths, parse_file, processes=None, chunksize=1):
+    """
+    Generate the result of calling ``parse_file`` on each path, in order.
+
+    ``parse_file`` must be a module-level function so it can be sent to the
+    worker processes.  ``processes`` defaults to the number of CPUs.  If it's
+    1, files are parsed in this process.  ``chunksize`` paths are sent to a
+    worker at a time.
+
+    """
+    if processes == 1:
+        for path in paths:
+            yield parse_file(path)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for batch in pool.imap(parse_file, paths, chunksize):
+            yield batch
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def bulk_parse_summary(paths, **kwargs):
+    """
+    Generate a ``SummaryBatch`` for each summary file, in order.
+
+    Numeric-only lines aren't joined with saved metadata, so their names are
+    empty.
+
+    """
+    return bulk_parse(paths, parse_summary_file, **kwargs)
+
+
+def bulk_parse_precincts(paths, wards=False, encoding=None, **kwargs):
+    """
+    Generate a ``PrecinctBatch`` for each precinct results page, in order.
+
+    If ``wards`` is True, the pages are ward results pages.  ``encoding``
+    overrides the character set of the pages, as for
+    ``parse_precinct_file()``.
+
+    """
+    parse_file = parse_ward_file if wards else parse_precinct_file
+    if encoding is not None:
+        parse_file = partial(parse_file, encoding=encoding)
+    return bulk_parse(paths, parse_file, **kwargs)
@@ -0,0 +1,201 @@
+"""
+Cache responses from the Board of Elections website on disk.
+
+Precinct results stop changing once they're certified, so there's no need
+to request them again for every scrape.  A ``ResponseCache`` stores each
+response body in a file named for a hash of the request's method, URL and
+form data.  Files are written atomically, so a scrape that is interrupted
+can be run again and will only request the pages it didn't get to.
+
+"""
+import gzip
+import hashlib
+import io
+import os
+import os.path
+import tempfile
+import threading
+import time
+
+from six.moves.urllib.parse import urlencode
+
+
+class CacheMiss(Exception):
+    """
+    Raised when a response isn't cached and the cache is offline.
+    """
+    pass
+
+
+class ResponseCache(object):
+    """
+    Store response bodies in the directory ``path``.
+
+    Cached responses older than ``ttl`` seconds are ignored.  If
+    ``max_size`` is specified, expired and then the oldest responses are
+    removed once the cached files take up more than that many bytes, until
+    they take up ``LOW_WATER_MARK`` of it.  Responses are gzipped unless
+    ``compress`` is False.
+
+    If ``offline`` is True, clients using the cache should raise
+    ``CacheMiss`` rather than make requests for responses that aren't
+    cached.
+
+    """
+    LOW_WATER_MARK = 0.9
+
+    def __init__(self, path, ttl=None, max_size=None, compress=True,
+            offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compress = compress
+        self.offline = offline
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self._size = sum(os.path.getsize(p) for p in self._iter_paths())
+
+    @classmethod
+    def get_key(cls, method, url, data=None):
+        parts = [method.upper(), url]
+        if data:
+            parts.append(urlencode(sorted(data.items())))
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def is_cache_path(cls, path):
+        """
+        Return True if ``path`` is named like a file saved by a cache, whose
+        contents are UTF-8 whatever character set the page declares.
+        """
+        key, extension = os.path.splitext(os.path.basename(path))
+        return (extension in ('.gz', '.html') and len(key) == 64 and
+                all(c in '0123456789abcdef' for c in key))
+
+    def get_path(self, key):
+        extension = '.gz' if self.compress else '.html'
+        return os.path.join(self.path, key[:2], key + extension)
+
+    def _iter_paths(self):
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.html')):
+                    yield os.path.join(dirpath, filename)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, method, url, data=None):
+        """
+        Return the cached response body for a request, or None.
+        """
+        path = self.get_path(self.get_key(method, url, data))
+        try:
+            mtime = os.path.getmtime(path)
+            if self.ttl is not None and time.time() - mtime > self.ttl:
+                raise OSError
+            if self.compress:
+                f = gzip.open(path, 'rb')
+            else:
+                f = io.open(path, 'rb')
+            with f:
+                content = f.read()
+        except (IOError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return content.decode('utf-8')
+
+    def set(self, method, url, data, text):
+        """
+        Save the response body for a request.
+        """
+        path = self.get_path(self.get_key(method, url, data))
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            try:
+                os.makedirs(dirname)
+            except OSError:
+                # Created by another thread
+                pass
+
+        content = text.encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            if self.compress:
+                with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                    gz.write(content)
+            else:
+                f.write(content)
+
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.rename(tmp_path, path)
+            self._size += os.path.getsize(path)
+
+        if self.max_size is not None and self._size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove expired responses, then the oldest ones until the cache is
+        down to ``LOW_WATER_MARK`` of ``max_size``.
+
+        Evicting below ``max_size`` means the directory is only walked
+        every so often, rather than on every ``set()`` once the cache is
+        full.  Only one thread evicts at a time, and the lock that guards
+        the cache's size is only held while each file is removed.
+
+        """
+        if not self._evict_lock.acquire(False):
+            # Another thread is already evicting
+            return
+
+        try:
+            now = time.time()
+            entries = []
+            for path in self._iter_paths():
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if self.ttl is not None and now - mtime > self.ttl:
+                    self._remove(path)
+                else:
+                    entries.append((mtime, path))
+
+            target = self.max_size * self.LOW_WATER_MARK
+            entries.sort()
+            for mtime, path in entries:
+                if self._size <= target:
+                    break
+                self._remove(path)
+        finally:
+            self._evict_lock.release()
+
+    def _remove(self, path):
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            self._size -= size
+
+    def clear(self):
+        with self._lock:
+            for path in list(self._iter_paths()):
+                os.remove(path)
+            self._size = 0
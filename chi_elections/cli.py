@@ -1,105 +1,462 @@
 import codecs
+import io
+import json
 import sys
 
-if sys.version_info < 3:
-    from backports import csv
-else:
-    import csv
-
 import click
+from six.moves.urllib.parse import urlparse
 
 from .constants import SUMMARY_URL, TEST_SUMMARY_URL
-from .precincts import Election
-from .summary import SummaryClient, SummaryParser
+from .writers import WRITERS
+
+# Each command imports the modules it needs when it runs, so commands that
+# are run often, like summary --file, don't pay for importing requests and
+# lxml.
 
-if sys.version_info < 3:
+if sys.version_info < (3,):
     # Wrap sys.stdout into a StreamWriter to allow writing unicode.
     # See https://wiki.python.org/moin/PrintFails
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout)
 
+SUMMARY_FIELDS = [
+   ('contest_code', int),
+   ('race_name', str),
+   ('precincts_total', int),
+   ('precincts_reporting', int),
+   ('vote_for', int),
+   ('candidate_number', int),
+   ('full_name', str),
+   ('party', str),
+   ('vote_total', int),
+]
+SUMMARY_FIELDNAMES = [name for name, type in SUMMARY_FIELDS]
+
+PRECINCT_FIELDS = [
+   ('race_name', str),
+   ('race_number', int),
+   ('candidate', str),
+   ('ward', int),
+   ('precinct', int),
+   ('votes', int),
+]
+PRECINCT_FIELDNAMES = [name for name, type in PRECINCT_FIELDS]
+
+BULK_SUMMARY_FIELDS = [('file', str)] + SUMMARY_FIELDS
+
+BULK_PRECINCT_FIELDS = [
+   ('file', str),
+   ('reporting_unit', int),
+   ('candidate', str),
+   ('votes', int),
+]
+
+
+def summary_result_rows(results):
+    """
+    Generate a tuple of ``SUMMARY_FIELDNAMES`` values for each ``(race,
+    result)`` tuple, as generated by ``SummaryParser.iter_results()``.
+    """
+    for race, result in results:
+        yield (race.contest_code, race.name, race.precincts_total,
+               race.precincts_reporting, race.vote_for,
+               result.candidate_number, result.full_name, result.party,
+               result.vote_total)
+
+
+def precinct_rows(results):
+    """
+    Generate a tuple of ``PRECINCT_FIELDNAMES`` values for each result.
+
+    ``results`` can be an iterable of ``Result`` objects or a
+    ``ResultTable``, whose columns are read directly.
+
+    """
+    from .precincts import ResultTable
+
+    if isinstance(results, ResultTable):
+        races = [(r.name, r.number) for r in results.races.values]
+        candidates = [c.name for c in results.candidates.values]
+        for race_id, candidate_id, ward, precinct, votes in zip(
+                results.race_id, results.candidate_id, results.ward,
+                results.precinct, results.votes):
+            yield races[race_id] + (
+                candidates[candidate_id], ward,
+                None if precinct == ResultTable.WARD_TOTAL else precinct,
+                votes)
+        return
+
+    for result in results:
+        yield (result.race.name, result.race.number, result.candidate.name,
+               result.ward_number, result.precinct_number, result.votes)
+
+
+def write_output(rows, fields, format='csv', output=None):
+    """
+    Write rows to the file named ``output``, or stdout, in ``format``.
+    """
+    writer_cls = WRITERS[format]
+    if output is None or output == '-':
+        if writer_cls.binary:
+            f = click.get_binary_stream('stdout')
+        else:
+            f = sys.stdout
+        close = False
+    else:
+        if writer_cls.binary:
+            f = open(output, 'wb')
+        else:
+            f = io.open(output, 'w', newline='', encoding='utf-8')
+        close = True
+
+    try:
+        writer = writer_cls(f, fields)
+        writer.write(rows)
+        writer.close()
+    finally:
+        if close:
+            f.close()
+
+
+format_option = click.option('--format', 'output_format', default='csv',
+    type=click.Choice(sorted(WRITERS)), help="Output format")
+output_option = click.option('--output', '-o', default=None,
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help="Output file (defaults to stdout)")
+stats_option = click.option('--stats', 'stats_path', default=None,
+    type=click.Path(dir_okay=False),
+    help="File to write request and parse timings to, as JSON if it ends "
+         "in .json or in the Prometheus text format otherwise")
+
+
+def create_stats_exporter(stats_path):
+    """
+    Return a ``StatsFileExporter`` writing to ``stats_path``, or None if no
+    path was given.
+    """
+    if not stats_path:
+        return None
+
+    from .instrumentation import Instrumentation, StatsFileExporter
+    return StatsFileExporter(Instrumentation(), stats_path)
+
+
+url_option = click.option('--url', default=None,
+    help="URL of the summary file, overriding --test")
+
+
+def board_url(base_url, default_url):
+    """
+    Return the URL of ``default_url``'s page on the site at ``base_url``,
+    like a ``simulate`` server.
+    """
+    return base_url.rstrip('/') + urlparse(default_url).path
+
+
 @click.group()
 def main():
     pass
 
 @click.command()
-@click.option('-f', '--file', type=click.File())
+@click.option('-f', '--file', type=click.File('rb'))
 @click.option('--test/--no-test', default=False)
-def summary(file, test):
-    if test:
-        url = TEST_SUMMARY_URL
-    else:
-        url = SUMMARY_URL
+@url_option
+@format_option
+@output_option
+def summary(file, test, url, output_format, output):
+    from .summary import SummaryClient, SummaryParser
+
+    if url is None:
+        url = TEST_SUMMARY_URL if test else SUMMARY_URL
 
+    # Stream results so rows are written as the file is read or downloaded
     if file:
-        parser = SummaryParser()
-        parser.parse(file.read())
-        races = parser.races
+        results = SummaryParser().iter_file_results(file)
     else:
-        client = SummaryClient(url=url)
-        client.fetch()
-        races = client.races
-
-    fieldnames = [
-       'contest_code',
-       'race_name',
-       'precincts_total',
-       'precincts_reporting',
-       'vote_for',
-       'candidate_number',
-       'full_name',
-       'party',
-       'vote_total',
-    ]
-    writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
-    writer.writeheader()
-    for race in races:
-        race_attrs = race.serialize()
-        for candidate_result in race.candidates:
-            row = dict(**race_attrs)
-            row.update(candidate_result.serialize())
-            writer.writerow(row)
+        results = SummaryClient(url=url).iter_results()
+
+    write_output(summary_result_rows(results), SUMMARY_FIELDS,
+        format=output_format, output=output)
 
 main.add_command(summary)
 
 
+@click.command()
+@click.option('--test/--no-test', default=False)
+@url_option
+@click.option('--interval', default=5.0,
+              help="Seconds between polls while precincts are reporting")
+@click.option('--max-interval', default=60.0,
+              help="Longest wait between polls while results are idle")
+@click.option('--backoff', default=2.0,
+              help="Multiply the wait by this after each idle poll")
+@click.option('--snapshot', type=click.Path(dir_okay=False),
+              help="File to write a JSON snapshot of the results to")
+@click.option('--history', type=click.Path(dir_okay=False),
+              help="SQLite database to record the history of results in")
+@click.option('--serve/--no-serve', default=True,
+              help="Stream changes as server-sent events")
+@click.option('--host', default='127.0.0.1', help="Address to serve on")
+@click.option('--port', default=8765, help="Port to serve on")
+@click.option('--max-polls', type=int, default=None,
+              help="Stop after this many polls")
+@stats_option
+def watch(test, url, interval, max_interval, backoff, snapshot, history,
+        serve, host, port, max_polls, stats_path):
+    """
+    Poll the summary file and push changes to subscribers.
+
+    Subscribers can stream changes from /events, or get every race from
+    /snapshot.
+    """
+    from .summary import HistoryStore, SummaryClient
+    from .watch import ChangeBroadcaster, EventServer, SummaryWatcher
+
+    if url is None:
+        url = TEST_SUMMARY_URL if test else SUMMARY_URL
+    history_store = HistoryStore(history) if history else None
+    exporter = create_stats_exporter(stats_path)
+    broadcaster = None
+    server = None
+    if serve:
+        broadcaster = ChangeBroadcaster()
+        server = EventServer(broadcaster, host=host, port=port).start()
+        click.echo("Serving events at {}/events".format(server.url),
+            err=True)
+
+    watcher = SummaryWatcher(
+        client=SummaryClient(url=url, incremental=True,
+            history=history_store,
+            instrumentation=exporter and exporter.instrumentation),
+        interval=interval,
+        max_interval=max_interval,
+        backoff=backoff,
+        snapshot_path=snapshot,
+        broadcaster=broadcaster,
+    )
+    try:
+        watcher.run(max_polls=max_polls)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.stop()
+        if history_store is not None:
+            history_store.close()
+        if exporter is not None:
+            exporter.close()
+
+main.add_command(watch)
+
+
 @click.command()
 @click.argument('elections', nargs=-1)
 @click.option('--race', '-r', default=None, multiple=True)
-def precincts(elections, race):
-    fieldnames = [
-       'race_name',
-       'race_number',
-       'candidate',
-       'ward',
-       'precinct',
-       'votes',
-    ]
-    writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
-    writer.writeheader()
-    for election_id in elections:
-        election = Election(elec_code=election_id)
-        if len(race):
-            races_set = set()
-            for rid in race:
-                try:
-                    race_identifier = int(rid)
-                except ValueError:
-                    race_identifier = rid
-
-                races_set.add(race_identifier)
-
-            races = [r for r in election.races
-                     if r.number in races_set or r.name in races_set]
+@click.option('--workers', '-w', default=1,
+              help="Number of concurrent requests")
+@click.option('--retries', default=2,
+              help="Number of times to retry a failed request")
+@click.option('--adaptive', is_flag=True, default=False,
+              help="Adjust the number of concurrent requests, up to "
+                   "--workers, to how the server responds")
+@click.option('--timeout', type=float, default=None,
+              help="Seconds before a request times out")
+@click.option('--progress/--no-progress', default=True,
+              help="Report progress and throughput on stderr")
+@click.option('--cache', 'cache_dir', type=click.Path(file_okay=False),
+              help="Directory for caching responses")
+@click.option('--cache-ttl', type=float, default=None,
+              help="Seconds before cached responses expire")
+@click.option('--offline', is_flag=True, default=False,
+              help="Only use cached responses")
+@click.option('--base-url', default=None,
+              help="Scrape the site at this URL instead, like a simulate "
+                   "server")
+@format_option
+@output_option
+@stats_option
+def precincts(elections, race, workers, retries, adaptive, timeout, progress,
+        cache_dir, cache_ttl, offline, base_url, output_format, output,
+        stats_path):
+    from .cache import ResponseCache
+    from .precincts import AdaptiveConcurrency, PrecinctClient
+    from .scheduler import ScrapeProgress, ScrapeScheduler
 
-        else:
-            races = election.races
+    race_filter = None
+    if len(race):
+        races_set = set()
+        for rid in race:
+            try:
+                race_identifier = int(rid)
+            except ValueError:
+                race_identifier = rid
+
+            races_set.add(race_identifier)
 
-        for race in races:
-            for result in race.results:
-                try:
-                    writer.writerow(result.serialize())
-                except UnicodeDecodeError:
-                    print(result.serialize())
-                    raise
+        race_filter = lambda r: r.number in races_set or r.name in races_set
+
+    cache = None
+    if cache_dir:
+        cache = ResponseCache(cache_dir, ttl=cache_ttl, offline=offline)
+    elif offline:
+        raise click.UsageError("--offline requires --cache")
+
+    urls = {}
+    if base_url is not None:
+        urls['election_url'] = board_url(base_url,
+            PrecinctClient.DEFAULT_ELECTION_URL)
+        urls['precinct_url'] = board_url(base_url,
+            PrecinctClient.DEFAULT_PRECINCT_URL)
+
+    concurrency = None
+    client_retries = 0
+    if adaptive:
+        # The client retries within the controller's budget, instead of
+        # the scheduler retrying regardless
+        concurrency = AdaptiveConcurrency(initial=min(2, workers),
+            max_limit=workers)
+        client_retries, retries = retries, 0
+
+    exporter = create_stats_exporter(stats_path)
+    scheduler = ScrapeScheduler(
+        client=PrecinctClient(max_workers=workers, cache=cache,
+            instrumentation=exporter and exporter.instrumentation,
+            concurrency=concurrency, timeout=timeout, retries=client_retries,
+            **urls),
+        max_workers=workers,
+        retries=retries,
+        progress=ScrapeProgress(stream=sys.stderr if progress else None,
+            concurrency=concurrency),
+    )
+    try:
+        # Results are scraped as they're written
+        results = scheduler.run(elections, race_filter=race_filter)
+        write_output(precinct_rows(results), PRECINCT_FIELDS,
+            format=output_format, output=output)
+    finally:
+        if exporter is not None:
+            exporter.close()
 
 main.add_command(precincts)
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', help="Address to serve on")
+@click.option('--port', default=8000, help="Port to serve on")
+@click.option('--races', default=10, help="Number of races")
+@click.option('--candidates', default=5, help="Candidates per race")
+@click.option('--wards', default=50, help="Number of wards")
+@click.option('--precincts', 'precincts_per_ward', default=40,
+              help="Precincts per ward")
+@click.option('--duration', default=600.0,
+              help="Seconds until every precinct has reported")
+@click.option('--update-interval', default=10.0,
+              help="Seconds between updates of the summary file")
+@click.option('--full-width', is_flag=True, default=False,
+              help="Keep every column of the summary file after precincts "
+                   "start reporting")
+@click.option('--latency', default=0.0, help="Seconds to delay responses")
+@click.option('--jitter', default=0.0,
+              help="Up to this many more seconds of random delay")
+@click.option('--error-rate', default=0.0,
+              help="Fraction of requests that fail with a 500 error")
+@click.option('--max-rate', type=float, default=None,
+              help="Requests per second to handle before queueing")
+@click.option('--max-concurrent', type=int, default=None,
+              help="Requests to handle at once before refusing with a 503 "
+                   "error")
+@click.option('--bandwidth', type=float, default=None,
+              help="Bytes per second to send each response at")
+def simulate(host, port, races, candidates, wards, precincts_per_ward,
+        duration, update_interval, full_width, latency, jitter, error_rate,
+        max_rate, max_concurrent, bandwidth):
+    """
+    Serve a simulated Board of Elections website.
+
+    Point the other commands at it with --url or --base-url.
+    """
+    from .simulator import BoardSimulator, ElectionNight
+    from .synthetic import SyntheticElection
+
+    night = ElectionNight(
+        SyntheticElection(races=races, candidates=candidates, wards=wards,
+            precincts=precincts_per_ward),
+        duration=duration,
+        update_interval=update_interval,
+        numeric_only=not full_width,
+    )
+    server = BoardSimulator(night, host=host, port=port, latency=latency,
+        jitter=jitter, error_rate=error_rate, max_rate=max_rate,
+        max_concurrent=max_concurrent, bandwidth=bandwidth)
+    click.echo("Serving a simulated election at {}".format(server.url),
+        err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        click.echo(json.dumps(server.stats()), err=True)
+
+main.add_command(simulate)
+
+
+processes_option = click.option('--processes', '-p', type=int, default=None,
+    help="Number of worker processes (defaults to the number of CPUs)")
+
+
+@click.group()
+def bulk():
+    """
+    Parse archives of saved files in parallel.
+    """
+    pass
+
+main.add_command(bulk)
+
+
+@bulk.command('summary')
+@click.argument('paths', nargs=-1, type=click.Path(exists=True,
+                dir_okay=False))
+@processes_option
+@format_option
+@output_option
+def bulk_summary(paths, processes, output_format, output):
+    """
+    Parse summary files, writing a row per line of each file.
+    """
+    from .bulk import bulk_parse_summary
+
+    def rows():
+        for batch in bulk_parse_summary(paths, processes=processes):
+            for row in batch.rows():
+                yield (batch.path,) + row
+
+    write_output(rows(), BULK_SUMMARY_FIELDS, format=output_format,
+        output=output)
+
+
+@bulk.command('precincts')
+@click.argument('paths', nargs=-1, type=click.Path(exists=True,
+                dir_okay=False))
+@click.option('--wards', is_flag=True, default=False,
+              help="The files are ward results pages")
+@click.option('--encoding', default=None,
+              help="Character set of the files, instead of the one they "
+                   "declare")
+@processes_option
+@format_option
+@output_option
+def bulk_precincts(paths, wards, encoding, processes, output_format, output):
+    """
+    Parse saved precinct results pages, writing a row per result.
+    """
+    from .bulk import bulk_parse_precincts
+
+    def rows():
+        for batch in bulk_parse_precincts(paths, wards=wards,
+                encoding=encoding, processes=processes):
+            for row in batch.rows():
+                yield (batch.path,) + row
+
+    write_output(rows(), BULK_PRECINCT_FIELDS, format=output_format,
+        output=output)
@@ -0,0 +1,41 @@
+"""
+Write files that other processes read while they're being replaced.
+"""
+import binascii
+import io
+import os
+import os.path
+
+
+def write_atomic(path, content):
+    """
+    Write text to ``path`` as UTF-8, replacing it atomically.
+
+    The content is written to a temporary file in the same directory, which
+    is then renamed over ``path``, so readers never see a partial file.
+    Unlike ``tempfile.mkstemp()``, which makes files only their owner can
+    read, the file gets the same permissions as one created with
+    ``open()``: 0644, less the umask.
+
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    while True:
+        tmp_path = os.path.join(dirname, '.{}.{}.tmp'.format(
+            os.path.basename(path),
+            binascii.hexlify(os.urandom(6)).decode('ascii')))
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                0o644)
+        except OSError:
+            if os.path.exists(tmp_path):
+                continue
+            raise
+        break
+
+    try:
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
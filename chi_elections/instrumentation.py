@@ -0,0 +1,307 @@
+"""
+Measure where time goes when fetching and parsing results.
+
+Pass an ``Instrumentation`` to ``SummaryClient`` or ``PrecinctClient`` as
+``instrumentation`` and it records:
+
+* every HTTP request, with its status, response size and latency
+* every parse, with the number of lines or rows and its duration
+* the number of model objects created, by type
+
+The totals can be written to a file as JSON or in the Prometheus text
+format, either directly with ``export()`` or periodically by registering a
+``StatsFileExporter``.  Callbacks registered with ``add_callback()`` are
+called with each measurement as it's recorded.
+
+"""
+from collections import OrderedDict
+import json
+import threading
+import time
+
+from .files import write_atomic
+
+PROMETHEUS_PREFIX = 'chi_elections'
+
+
+class TimingStats(object):
+    """
+    The count, total size and total and longest duration of a kind of
+    operation.
+    """
+    __slots__ = ('count', 'size', 'seconds', 'max_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.size = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, size, seconds):
+        self.count += 1
+        self.size += size
+        self.seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def serialize(self):
+        return OrderedDict((
+            ('count', self.count),
+            ('size', self.size),
+            ('seconds', self.seconds),
+            ('max_seconds', self.max_seconds),
+        ))
+
+
+class Instrumentation(object):
+    """
+    Collect request and parse timings and object counts.
+
+    Requests are grouped by client, method and status, and parses by the
+    kind of page that was parsed.  The status of a request that failed
+    without a response is None.  It's safe to record from multiple threads.
+
+    Callbacks are called with an event name and a dictionary describing it.
+    Events are 'request', with ``client``, ``method``, ``url``, ``status``,
+    ``size`` and ``seconds``; 'parse', with ``parser``, ``rows`` and
+    ``seconds``; and 'created', with ``kind`` and ``count``.
+
+    """
+    def __init__(self, callbacks=None):
+        self.requests = {}
+        self.parses = {}
+        self.objects = {}
+        self._callbacks = list(callbacks or [])
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def _notify(self, event, attrs):
+        for callback in self._callbacks:
+            callback(event, attrs)
+
+    def record_request(self, client, method, url, status, size, seconds):
+        key = (client, method, status)
+        with self._lock:
+            try:
+                stats = self.requests[key]
+            except KeyError:
+                stats = self.requests[key] = TimingStats()
+            stats.add(size, seconds)
+
+        if self._callbacks:
+            self._notify('request', {
+                'client': client,
+                'method': method,
+                'url': url,
+                'status': status,
+                'size': size,
+                'seconds': seconds,
+            })
+
+    def record_parse(self, parser, rows, seconds):
+        with self._lock:
+            try:
+                stats = self.parses[parser]
+            except KeyError:
+                stats = self.parses[parser] = TimingStats()
+            stats.add(rows, seconds)
+
+        if self._callbacks:
+            self._notify('parse', {
+                'parser': parser,
+                'rows': rows,
+                'seconds': seconds,
+            })
+
+    def record_created(self, kind, count=1):
+        if not count:
+            return
+
+        with self._lock:
+            self.objects[kind] = self.objects.get(kind, 0) + count
+
+        if self._callbacks:
+            self._notify('created', {
+                'kind': kind,
+                'count': count,
+            })
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.parses = {}
+            self.objects = {}
+
+    def serialize(self):
+        """
+        Return the totals as a dictionary that can be serialized as JSON.
+        """
+        with self._lock:
+            requests = []
+            for (client, method, status), stats in sorted(
+                    self.requests.items(), key=_request_sort_key):
+                request = OrderedDict((
+                    ('client', client),
+                    ('method', method),
+                    ('status', status),
+                ))
+                request.update(stats.serialize())
+                requests.append(request)
+
+            parses = []
+            for parser, stats in sorted(self.parses.items()):
+                parse = OrderedDict((('parser', parser),))
+                parse.update(stats.serialize())
+                parse['rows'] = parse.pop('size')
+                parses.append(parse)
+
+            objects = OrderedDict(sorted(self.objects.items()))
+
+        return OrderedDict((
+            ('requests', requests),
+            ('parses', parses),
+            ('objects', objects),
+        ))
+
+    def to_json(self):
+        return json.dumps(self.serialize(), indent=2)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """
+        Return the totals in the Prometheus text exposition format.
+        """
+        stats = self.serialize()
+        lines = []
+
+        def metric(name, type, help, samples):
+            name = prefix + '_' + name
+            lines.append('# HELP {} {}'.format(name, help))
+            lines.append('# TYPE {} {}'.format(name, type))
+            for suffix, labels, value in samples:
+                lines.append('{}{}{{{}}} {}'.format(name, suffix,
+                    _format_labels(labels), _format_value(value)))
+
+        request_labels = [(OrderedDict((
+            ('client', r['client']),
+            ('method', r['method']),
+            ('status', 'error' if r['status'] is None else r['status']),
+        )), r) for r in stats['requests']]
+        metric('http_request_seconds', 'summary',
+            "Latency of HTTP requests.",
+            [(suffix, labels, r[key])
+             for labels, r in request_labels
+             for suffix, key in (('_sum', 'seconds'), ('_count', 'count'))])
+        metric('http_request_max_seconds', 'gauge',
+            "Longest HTTP request.",
+            [('', labels, r['max_seconds']) for labels, r in request_labels])
+        metric('http_response_bytes_total', 'counter',
+            "Bytes received in HTTP responses.",
+            [('', labels, r['size']) for labels, r in request_labels])
+
+        parse_labels = [({'parser': p['parser']}, p) for p in stats['parses']]
+        metric('parse_seconds', 'summary', "Time spent parsing.",
+            [(suffix, labels, p[key])
+             for labels, p in parse_labels
+             for suffix, key in (('_sum', 'seconds'), ('_count', 'count'))])
+        metric('parse_max_seconds', 'gauge', "Longest parse.",
+            [('', labels, p['max_seconds']) for labels, p in parse_labels])
+        metric('parse_rows_total', 'counter',
+            "Lines or table rows parsed.",
+            [('', labels, p['rows']) for labels, p in parse_labels])
+
+        metric('objects_created_total', 'counter',
+            "Model objects created.",
+            [('', {'kind': kind}, count)
+             for kind, count in stats['objects'].items()])
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path, format=None):
+        """
+        Write the totals to ``path``, replacing it atomically.
+
+        ``format`` is 'json' or 'prometheus'.  By default, files whose names
+        end in '.json' are written as JSON, and others in the Prometheus text
+        format, which can be collected with the node exporter's textfile
+        collector.
+
+        """
+        if format is None:
+            format = 'json' if path.endswith('.json') else 'prometheus'
+
+        if format == 'json':
+            content = self.to_json()
+        elif format == 'prometheus':
+            content = self.to_prometheus()
+        else:
+            raise ValueError("Unknown stats format: {}".format(format))
+
+        write_atomic(path, content)
+
+class StatsFileExporter(object):
+    """
+    Export an ``Instrumentation``'s totals to a file as they change.
+
+    The exporter registers itself as a callback, and writes the file after a
+    measurement is recorded if at least ``interval`` seconds have passed
+    since it was last written.  ``close()`` writes the final totals and
+    unregisters it.
+
+    """
+    def __init__(self, instrumentation, path, format=None, interval=10):
+        self.instrumentation = instrumentation
+        self.path = path
+        self.format = format
+        self.interval = interval
+        self._last_export = None
+        self._lock = threading.Lock()
+        instrumentation.add_callback(self)
+
+    def __call__(self, event, attrs):
+        now = time.time()
+        if (self._last_export is not None and
+                now - self._last_export < self.interval):
+            return
+
+        # Don't hold up other threads while one of them writes the file
+        if not self._lock.acquire(False):
+            return
+        try:
+            self._last_export = now
+            self.export()
+        finally:
+            self._lock.release()
+
+    def export(self):
+        self.instrumentation.export(self.path, format=self.format)
+
+    def close(self):
+        self.instrumentation.remove_callback(self)
+        with self._lock:
+            self.export()
+
+
+def _request_sort_key(item):
+    (client, method, status), stats = item
+    return (client, method, -1 if status is None else status)
+
+
+def _format_labels(labels):
+    return ','.join('{}="{}"'.format(name, _escape_label(value))
+                    for name, value in sorted(labels.items()))
+
+
+def _escape_label(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
@@ -1,16 +1,24 @@
 """
 Parse tabular precinct-level results.
 """
+from array import array
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
 
-from lxml import html
+from lxml import etree, html
 import requests
 from six.moves.urllib.parse import urlencode, urlparse, parse_qs
 from six import text_type
 
+from chi_elections.cache import CacheMiss
 from chi_elections.transforms import replace_single_quotes
 
 class BaseParser(object):
+    CHUNK_SIZE = 64 * 1024
+
     @classmethod
     def clean_cell(cls, s):
         return text_type(s).strip()
@@ -18,6 +26,14 @@ class BaseParser(object):
     def get_row_data(self, tr):
         return [self.clean_cell(td.text_content()) for td in tr.xpath('td')]
 
+    def get_streamed_row_data(self, tr):
+        # Elements from a pull parser aren't ``lxml.html`` elements, so they
+        # don't have ``text_content()``.  Serializing as text is the fastest
+        # way to get the same string.
+        return [self.clean_cell(etree.tostring(td, method='text',
+                    encoding=text_type, with_tail=False))
+                for td in tr.findall('td')]
+
     @classmethod
     def clean_candidate_name(cls, s):
         return replace_single_quotes(s)
@@ -82,6 +98,69 @@ class BaseParser(object):
 
         return results
 
+    @classmethod
+    def iter_chunks(cls, source):
+        if isinstance(source, (bytes, text_type)):
+            for i in range(0, len(source), cls.CHUNK_SIZE):
+                yield source[i:i + cls.CHUNK_SIZE]
+        else:
+            for chunk in source:
+                yield chunk
+
+    @classmethod
+    def is_first_table(cls, table):
+        return not any(sibling.tag == 'table'
+                       for sibling in table.itersiblings(preceding=True))
+
+    def iter_rows(self, source, encoding=None):
+        """
+        Generate the cells of each row of the results table in ``source``.
+
+        This selects the same rows as ``parse()``, but the document is fed to
+        the parser in chunks and each row is discarded once its cells have
+        been read, so the whole tree is never held in memory.
+
+        """
+        parser = etree.HTMLPullParser(events=('end',), tag='tr',
+            encoding=encoding)
+        for chunk in self.iter_chunks(source):
+            parser.feed(chunk)
+            for event, tr in parser.read_events():
+                parent = tr.getparent()
+                if parent is not None and parent.tag == 'table' and \
+                        self.is_first_table(parent):
+                    yield self.get_streamed_row_data(tr)
+
+                tr.clear()
+                while tr.getprevious() is not None:
+                    del parent[0]
+
+        parser.close()
+
+    def iter_results(self, source, encoding=None):
+        """
+        Generate result dictionaries, like those returned by ``parse()``,
+        one table row at a time.
+
+        ``source`` can be a string, bytes, or an iterable of chunks of
+        either, such as the ``iter_content()`` of a streamed ``requests``
+        response.  When parsing bytes, ``encoding`` overrides the character
+        set declared in the page.
+
+        """
+        candidate_lookup = None
+        for row in self.iter_rows(source, encoding=encoding):
+            if len(row) < 2:
+                continue
+
+            if row[0] == self.reporting_unit_column_name:
+                if candidate_lookup is None:
+                    candidate_lookup = self.parse_candidates(row)
+                continue
+
+            for result in self.parse_result_row(row, candidate_lookup):
+                yield result
+
 
 class WardParser(BaseParser):
     reporting_unit_column_name = 'Ward'
@@ -92,19 +171,26 @@ class PrecinctParser(BaseParser):
 
 
 class ReportingUnit(object):
+    __slots__ = ('number', '_results')
+
     def __init__(self, number):
         self.number = number
-        self._results = []
+        self._results = None
 
     def add_result(self, result):
+        if self._results is None:
+            self._results = []
         self._results.append(result)
 
     @property
     def results(self):
+        if self._results is None:
+            return []
         return self._results
 
 
 class Ward(ReportingUnit):
+    __slots__ = ('_precincts',)
     level = 'ward'
 
     def __init__(self, number):
@@ -126,6 +212,7 @@ class Ward(ReportingUnit):
 
 
 class Precinct(ReportingUnit):
+    __slots__ = ('ward',)
     level = 'precinct'
 
     def __init__(self, number, ward):
@@ -141,6 +228,8 @@ class Precinct(ReportingUnit):
 
 
 class Candidate(object):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -157,7 +246,10 @@ class Election(object):
         self.name = name
 
         if client is None:
-            self.client = PrecinctClient()
+            client = PrecinctClient()
+        self.client = client
+        if client.instrumentation is not None:
+            client.instrumentation.record_created('precincts.Election')
 
         self._races_by_number = None
         self._races_by_name = None
@@ -171,6 +263,11 @@ class Election(object):
         return self._races
 
     def add_race(self, race):
+        if self._races is None:
+            self._races_by_number = {}
+            self._races_by_name = {}
+            self._races = []
+
         if race.number is not None:
             self._races_by_number[race.number] = race
 
@@ -187,6 +284,10 @@ class Election(object):
 
     def fetch_races(self):
         race_html = self.client.fetch_election_html(self.elec_code)
+        self.parse_races(race_html)
+
+    def parse_races(self, race_html):
+        start = time.time()
         option_els = html.fromstring(race_html).xpath(
             "//select[@name='D3']/option")
 
@@ -200,6 +301,10 @@ class Election(object):
                 continue
             race = Race(self, name=race_name)
 
+        if self.client.instrumentation is not None:
+            self.client.instrumentation.record_parse('election',
+                len(option_els), time.time() - start)
+
 
 class Race(object):
     def __init__(self, election, name=None, number=None):
@@ -207,6 +312,8 @@ class Race(object):
         self.name = name
         self.election = election
         self.client = election.client
+        if self.client.instrumentation is not None:
+            self.client.instrumentation.record_created('precincts.Race')
 
         election.add_race(self)
 
@@ -242,7 +349,9 @@ class Race(object):
             elec_code=self.election.elec_code,
             race_name=self.name
         )
+        self.parse_wards(ward_results_html)
 
+    def parse_wards(self, ward_results_html):
         if self.number is None:
             first_ward_url = html.fromstring(ward_results_html).xpath('//a[1]')[0].get('href')
             # TODO: Factor this out
@@ -250,8 +359,8 @@ class Race(object):
             query_string_parsed = parse_qs(query_string)
             self.number = int(query_string_parsed['race_number'][0])
 
-        parser = WardParser()
-        results_attrs = parser.parse(ward_results_html)
+        results_attrs = self.client.parse_results(WardParser(),
+            ward_results_html)
         self._wards = {}
 
         for result_attrs in results_attrs:
@@ -259,31 +368,105 @@ class Race(object):
                 continue
 
             ward_number = int(result_attrs['reporting_unit_id'])
-            self._wards.setdefault(ward_number, Ward(
-                number=ward_number,
-            ))
+            if ward_number not in self._wards:
+                self._wards[ward_number] = Ward(number=ward_number)
 
-    def fetch_results(self):
-        results = []
-        for ward in self.wards:
-            ward_results =  self.client.fetch_precinct_results(
+        if self.client.instrumentation is not None:
+            self.client.instrumentation.record_created('precincts.Ward',
+                len(self._wards))
+
+    def fetch_result_dicts(self, max_workers=None):
+        """
+        Fetch and parse the precinct results for every ward in the race.
+
+        Returns a list of ``(ward_number, result_dicts)`` tuples in ward
+        order.  If ``max_workers`` is greater than 1, that many wards are
+        requested concurrently.  It defaults to the client's
+        ``max_workers``.
+
+        """
+        if max_workers is None:
+            max_workers = self.client.max_workers
+
+        ward_numbers = [ward.number for ward in self.wards]
+
+        def fetch_result_dicts(ward_num):
+            return self.client.fetch_precinct_result_dicts(
                 elec_code=self.election.elec_code,
-                race=self,
-                ward_num=ward.number)
-            results.extend(ward_results)
+                race_number=self.number,
+                ward_num=ward_num)
+
+        if max_workers > 1:
+            # Only the requests and parsing happen in the pool.  The model
+            # objects are created by the caller, because the client caches
+            # wards, precincts and candidates in shared dictionaries.
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                ward_result_dicts = list(executor.map(fetch_result_dicts,
+                    ward_numbers))
+        else:
+            ward_result_dicts = [fetch_result_dicts(ward_num)
+                                 for ward_num in ward_numbers]
+
+        return list(zip(ward_numbers, ward_result_dicts))
+
+    def fetch_results(self, max_workers=None, columnar=None):
+        """
+        Fetch the precinct results for every ward in the race.
+
+        Results are returned in ward order.  If ``columnar`` is True, they're
+        returned as a ``ResultTable`` rather than a list of ``Result``
+        objects.  It defaults to the client's ``columnar``.
+
+        """
+        ward_result_dicts = self.fetch_result_dicts(max_workers=max_workers)
+        return self.build_results(ward_result_dicts, columnar=columnar)
+
+    def build_results(self, ward_result_dicts, columnar=None):
+        """
+        Create results from a list of ``(ward_number, result_dicts)`` tuples,
+        as returned by ``fetch_result_dicts()``.
+        """
+        if columnar is None:
+            columnar = self.client.columnar
+
+        if columnar:
+            table = ResultTable()
+            for ward_num, result_dicts in ward_result_dicts:
+                table.extend(self, ward_num, result_dicts)
+            return table
+
+        results = []
+        for ward_num, result_dicts in ward_result_dicts:
+            results.extend(self.client.create_result(rd, self, ward_num)
+                           for rd in result_dicts)
 
+        if self.client.instrumentation is not None:
+            self.client.instrumentation.record_created('precincts.Result',
+                len(results))
         return results
 
 
 class Result(object):
-    def __init__(self, candidate, votes, reporting_unit, percent=None, race=None):
+    """
+    A candidate's votes in a ward or precinct.
+
+    Unless ``register`` is False, the result is added to the results of its
+    reporting unit.  Use ``group_by_reporting_unit()`` to find the results
+    for each reporting unit when results aren't registered.
+
+    """
+    __slots__ = ('candidate', 'votes', 'reporting_unit', 'percent', 'race')
+
+    def __init__(self, candidate, votes, reporting_unit, percent=None,
+            race=None, register=True):
         self.candidate = candidate
         self.votes = votes
         self.reporting_unit = reporting_unit
         self.percent = percent
         self.race = race
 
-        self.reporting_unit.add_result(self)
+        if register:
+            self.reporting_unit.add_result(self)
 
     def __str__(self):
         return "{} - {} ({})".format(self.candidate, self.votes,
@@ -321,11 +504,430 @@ class Result(object):
         ))
 
 
+def group_by_reporting_unit(results):
+    """
+    Return an ``OrderedDict`` mapping reporting units to lists of results.
+    """
+    index = OrderedDict()
+    for result in results:
+        index.setdefault(result.reporting_unit, []).append(result)
+    return index
+
+
+class Dimension(object):
+    """
+    Assign each distinct key a small integer id.
+
+    ``factory`` is called with a key the first time it's seen to create the
+    value stored for it.
+
+    """
+    def __init__(self, factory=None):
+        self._factory = factory
+        self._ids = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, id):
+        return self.values[id]
+
+    def get_id(self, key):
+        try:
+            return self._ids[key]
+        except KeyError:
+            id = len(self.values)
+            self._ids[key] = id
+            self.values.append(key if self._factory is None
+                               else self._factory(key))
+            return id
+
+
+class ResultView(object):
+    """
+    A row of a ``ResultTable``, with the same attributes as ``Result``.
+    """
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    @property
+    def race(self):
+        return self._table.races[self._table.race_id[self._index]]
+
+    @property
+    def candidate(self):
+        return self._table.candidates[self._table.candidate_id[self._index]]
+
+    @property
+    def votes(self):
+        return self._table.votes[self._index]
+
+    @property
+    def percent(self):
+        percent = self._table.percent[self._index]
+        return None if percent != percent else percent
+
+    @property
+    def ward_number(self):
+        return self._table.ward[self._index]
+
+    @property
+    def precinct_number(self):
+        precinct = self._table.precinct[self._index]
+        return None if precinct == ResultTable.WARD_TOTAL else precinct
+
+    @property
+    def reporting_unit(self):
+        ward = self._table.get_ward(self.ward_number)
+        precinct_number = self.precinct_number
+        if precinct_number is None:
+            return ward
+        return ward.get_or_create_precinct(precinct_number)
+
+    def __str__(self):
+        return "{} - {} ({})".format(self.candidate, self.votes,
+            self.reporting_unit)
+
+    def __repr__(self):
+        return "ResultView(candidate={}, reporting_unit={}, votes={})".format(
+            repr(self.candidate), repr(self.reporting_unit), self.votes
+        )
+
+    def serialize(self):
+        return OrderedDict((
+            ('race_name', self.race.name),
+            ('race_number', self.race.number),
+            ('candidate', self.candidate.name),
+            ('ward', self.ward_number),
+            ('precinct', self.precinct_number),
+            ('votes', self.votes),
+        ))
+
+
+class ResultTable(object):
+    """
+    Precinct results stored in columns rather than as ``Result`` objects.
+
+    Each column is an ``array``: ``race_id``, ``candidate_id``, ``ward``,
+    ``precinct``, ``votes`` and ``percent``.  Races and candidates are
+    stored once each, in the ``races`` and ``candidates`` dimensions, and
+    rows refer to them by id.  Ward totals have a precinct of
+    ``WARD_TOTAL`` and missing percentages are NaN.  Wards are stored in
+    one byte and precincts in two, which is plenty for Chicago's 50 wards.
+
+    Indexing or iterating over the table gives ``ResultView`` objects, which
+    can be used in place of ``Result`` objects.
+
+    """
+    WARD_TOTAL = 0
+    COLUMNS = ('race_id', 'candidate_id', 'ward', 'precinct', 'votes',
+               'percent')
+
+    def __init__(self):
+        self.races = Dimension()
+        self.candidates = Dimension(factory=Candidate)
+        self.race_id = array('H')
+        self.candidate_id = array('I')
+        self.ward = array('B')
+        self.precinct = array('H')
+        self.votes = array('I')
+        self.percent = array('d')
+        self._wards = {}
+
+    def __len__(self):
+        return len(self.votes)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ResultTable index out of range")
+        return ResultView(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield ResultView(self, i)
+
+    def append(self, race, candidate_name, ward, precinct, votes,
+            percent=None):
+        self.race_id.append(self.races.get_id(race))
+        self.candidate_id.append(self.candidates.get_id(candidate_name))
+        self.ward.append(ward)
+        self.precinct.append(self.WARD_TOTAL if precinct is None
+                             else precinct)
+        self.votes.append(votes)
+        self.percent.append(float('nan') if percent is None else percent)
+
+    def extend(self, race, ward_num, result_dicts):
+        """
+        Add the result dictionaries parsed from a ward's precinct results.
+        """
+        for rd in result_dicts:
+            reporting_unit_id = rd['reporting_unit_id']
+            if reporting_unit_id == 'Total':
+                precinct = None
+            else:
+                precinct = int(reporting_unit_id)
+            self.append(race, rd['candidate'], ward_num, precinct,
+                rd['votes'], rd.get('percent'))
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Create a table from ``Result`` objects.
+        """
+        table = cls()
+        for result in results:
+            precinct = result.precinct_number
+            table.append(result.race, result.candidate.name,
+                result.ward_number,
+                None if precinct is None else int(precinct),
+                result.votes, result.percent)
+        return table
+
+    def get_ward(self, number):
+        try:
+            return self._wards[number]
+        except KeyError:
+            self._wards[number] = Ward(number)
+            return self._wards[number]
+
+    def to_numpy(self):
+        """
+        Return a dictionary of NumPy arrays that share memory with the
+        columns.
+        """
+        import numpy
+
+        return OrderedDict((name, numpy.frombuffer(getattr(self, name),
+                                dtype=getattr(self, name).typecode))
+                           for name in self.COLUMNS)
+
+
+class RateLimiter(object):
+    """
+    Limit the rate of requests to each host.
+
+    ``wait()`` blocks until at least ``1 / rate`` seconds have passed since
+    the last request to the same host was allowed.  It's safe to call from
+    multiple threads.
+
+    """
+    def __init__(self, rate):
+        self._interval = 1.0 / rate
+        self._next_request = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url):
+        """
+        Reserve the next request to the URL's host and return the number of
+        seconds to wait before making it.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.time()
+            request_time = max(now, self._next_request.get(host, now))
+            self._next_request[host] = request_time + self._interval
+
+        return request_time - now
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def is_server_error(status):
+    """
+    Return True if a response status means the server is overloaded or
+    failing, rather than that the request was wrong.
+    """
+    return status == 429 or status >= 500
+
+
+def is_retriable(exc):
+    """
+    Return True if a ``requests.RequestException`` is worth retrying.
+    """
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    response = getattr(exc, 'response', None)
+    return (isinstance(exc, requests.HTTPError) and response is not None and
+            is_server_error(response.status_code))
+
+
+class AdaptiveConcurrency(object):
+    """
+    Adjust the number of requests made at once to how the server copes.
+
+    Like TCP congestion control, the limit grows additively and shrinks
+    multiplicatively.  It starts at ``initial``, and each fast, successful
+    response received while the limit is fully used raises it by
+    ``increase / limit``, or by about ``increase`` per round trip.  A
+    request that times out, can't connect or gets a 429 or 5xx response,
+    or a response slower than ``slow_factor`` times the fastest one seen
+    (and than ``min_slow_latency`` seconds), multiplies the limit by
+    ``decrease``.  The requests in flight when the server starts to
+    struggle tend to fail together, so the limit is decreased at most once
+    per average round trip.  It always stays between ``min_limit`` and
+    ``max_limit``.
+
+    ``retry()`` keeps the retries of all requests within a budget of
+    ``retry_ratio`` retries per request made, plus ``min_retries``, so that
+    a failing server isn't sent a storm of retries.
+
+    ``acquire()`` and ``release()`` are safe to call from multiple threads.
+
+    """
+    def __init__(self, initial=2, min_limit=1, max_limit=32, increase=1.0,
+            decrease=0.5, slow_factor=2.0, min_slow_latency=0.05,
+            retry_ratio=0.2, min_retries=10):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.min_slow_latency = min_slow_latency
+        self.retry_ratio = retry_ratio
+        self.min_retries = min_retries
+
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.slowdowns = 0
+        self.retries = 0
+        # Exponentially weighted moving average, and minimum, of the
+        # latency of requests that got a response
+        self.latency = None
+        self.min_latency = None
+        self.start_time = time.time()
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Block until another request can be made, and count it as in flight.
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, success=True):
+        """
+        Count a request as finished and adjust the limit.
+
+        ``success`` is False if the request failed in a way that suggests
+        the server is overloaded, and None if it failed in a way that
+        doesn't, like a 404 error.
+        """
+        with self._condition:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self.requests += 1
+
+            if success is not False:
+                if self.min_latency is None or latency < self.min_latency:
+                    self.min_latency = latency
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency += 0.2 * (latency - self.latency)
+
+            if success is False:
+                self.errors += 1
+                self.backoff()
+            elif latency > max(self.min_latency * self.slow_factor,
+                               self.min_slow_latency):
+                self.slowdowns += 1
+                self.backoff()
+            elif success and saturated:
+                self.limit = min(self.max_limit,
+                                 self.limit + self.increase / self.limit)
+
+            self._condition.notify_all()
+
+    def backoff(self):
+        now = time.time()
+        if (self._last_decrease is not None and
+                now - self._last_decrease < (self.latency or 0)):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+
+    def retry(self):
+        """
+        Return True, and count a retry, if the retry budget allows one.
+        """
+        with self._condition:
+            if (self.retries >=
+                    self.retry_ratio * self.requests + self.min_retries):
+                return False
+            self.retries += 1
+            return True
+
+    @property
+    def requests_per_sec(self):
+        return self.requests / max(time.time() - self.start_time, 1e-6)
+
+    def serialize(self):
+        with self._condition:
+            return OrderedDict([
+                ('limit', self.limit),
+                ('in_flight', self.in_flight),
+                ('requests', self.requests),
+                ('errors', self.errors),
+                ('slowdowns', self.slowdowns),
+                ('retries', self.retries),
+                ('latency', self.latency),
+                ('min_latency', self.min_latency),
+                ('requests_per_sec', self.requests_per_sec),
+            ])
+
+
 class PrecinctClient(object):
+    """
+    Fetch and parse results from the Board of Elections website.
+
+    ``max_workers`` is the default number of wards ``Race.fetch_results()``
+    requests concurrently.  If ``rate_limit`` is specified, no more than
+    that many requests per second are made to each host.
+
+    If ``columnar`` is True, ``Race.results`` is a ``ResultTable`` rather
+    than a list of ``Result`` objects.  If ``register_results`` is False,
+    results aren't added to the ``results`` of their ward or precinct.
+
+    Requests are made through ``session``, a ``requests.Session`` whose
+    connection pool is sized for ``max_workers`` if one isn't provided.
+
+    If a ``ResponseCache`` is provided as ``cache``, responses are read from
+    it when possible and saved to it otherwise.
+
+    If an ``Instrumentation`` is provided as ``instrumentation``, requests
+    that aren't answered from the cache, parses and the model objects
+    created by the client and its elections and races are recorded to it.
+
+    If an ``AdaptiveConcurrency`` is provided as ``concurrency``, requests
+    wait for it to allow them, however many threads make them, and report
+    their latency and outcome to it.  Requests time out after ``timeout``
+    seconds, if specified.  A request that times out, can't connect or gets
+    a 429 or 5xx response is retried up to ``retries`` times, waiting a
+    random time up to ``retry_wait`` seconds, doubled for each attempt,
+    beforehand, as long as the ``concurrency`` retry budget allows.
+
+    """
     DEFAULT_PRECINCT_URL = 'http://www.chicagoelections.com/en/pctlevel3.asp'
     DEFAULT_ELECTION_URL = 'http://www.chicagoelections.com/en/wdlevel3.asp'
 
-    def __init__(self, election_url=None, precinct_url=None):
+    def __init__(self, election_url=None, precinct_url=None, max_workers=1,
+            rate_limit=None, session=None, cache=None, columnar=False,
+            register_results=True, instrumentation=None, concurrency=None,
+            timeout=None, retries=0, retry_wait=0.5):
         if election_url is None:
             election_url = self.DEFAULT_ELECTION_URL
 
@@ -336,10 +938,36 @@ class PrecinctClient(object):
 
         self._precinct_url = precinct_url
 
+        self.max_workers = max_workers
+        self.columnar = columnar
+        self.register_results = register_results
+        self.instrumentation = instrumentation
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_wait = retry_wait
+        if session is None:
+            session = self.create_session()
+        self._session = session
+        self._cache = cache
+
+        if rate_limit is not None:
+            self._rate_limiter = RateLimiter(rate_limit)
+        else:
+            self._rate_limiter = None
+
         self._parser = PrecinctParser()
         self._wards = {}
         self._candidates_by_name = {}
 
+    def create_session(self):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=max(self.max_workers, 10))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     def get_election_url(self, elec_code):
         url = self._election_url
         query_params = {
@@ -348,18 +976,100 @@ class PrecinctClient(object):
         qs = urlencode(query_params)
         return url + '?' + qs
 
+    def request(self, method, url, data=None):
+        if self._cache is not None:
+            text = self._cache.get(method, url, data)
+            if text is not None:
+                return text
+            if self._cache.offline:
+                raise CacheMiss("{} {} is not cached".format(method, url))
+
+        attempt = 0
+        while True:
+            try:
+                r = self.send_request(method, url, data)
+                break
+            except requests.RequestException as e:
+                if attempt >= self.retries or not is_retriable(e):
+                    raise
+                if (self.concurrency is not None and
+                        not self.concurrency.retry()):
+                    raise
+                attempt += 1
+                time.sleep(random.uniform(0,
+                    self.retry_wait * 2 ** (attempt - 1)))
+
+        if self._cache is not None:
+            self._cache.set(method, url, data, r.text)
+
+        return r.text
+
+    def send_request(self, method, url, data=None):
+        """
+        Make a single request and return the response, raising a
+        ``requests.HTTPError`` for an error status.
+        """
+        if self._rate_limiter is not None:
+            self._rate_limiter.wait(url)
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+
+        start = time.time()
+        success = False
+        try:
+            r = self._session.request(method, url, data=data,
+                timeout=self.timeout)
+            if r.status_code < 400:
+                success = True
+            elif not is_server_error(r.status_code):
+                success = None
+            size = len(r.content)
+        except requests.RequestException:
+            self.record_request(method, url, None, 0, start)
+            raise
+        finally:
+            if self.concurrency is not None:
+                self.concurrency.release(time.time() - start, success)
+
+        self.record_request(method, url, r.status_code, size, start)
+        r.raise_for_status()
+        return r
+
+    def record_request(self, method, url, status, size, start):
+        """
+        Record a request that started at ``start`` to the instrumentation.
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.record_request('precinct', method, url,
+                status, size, time.time() - start)
+
+    def parse_results(self, parser, html_string):
+        """
+        Parse a results page with ``parser``, recording the parse to the
+        instrumentation.
+        """
+        if self.instrumentation is None:
+            return parser.parse(html_string)
+
+        start = time.time()
+        results = parser.parse(html_string)
+        self.instrumentation.record_parse(
+            'ward' if isinstance(parser, WardParser) else 'precinct',
+            len(results), time.time() - start)
+        return results
+
     def fetch_election_html(self, elec_code):
         url = self.get_election_url(elec_code)
-        return requests.get(url).text
+        return self.request('GET', url)
 
     def fetch_ward_results_html(self, elec_code, race_name):
         url = self.get_election_url(elec_code)
-        return requests.post(url, data={
+        return self.request('POST', url, data={
                 'VTI-GROUP': 0,
                 'flag': 1,
                 'B1': 'View The Results',
                 'D3': race_name,
-            }).text
+            })
 
     def get_precinct_result_url(self, elec_code, race_number, ward):
         url = self._precinct_url
@@ -373,13 +1083,15 @@ class PrecinctClient(object):
 
     def fetch_precinct_results_html(self, elec_code, race_number, ward):
         url = self.get_precinct_result_url(elec_code, race_number, ward)
-        return requests.get(url).text
+        return self.request('GET', url)
 
     def get_or_create_ward(self, ward_num):
         try:
             return self._wards[ward_num]
         except KeyError:
             self._wards[ward_num] = Ward(ward_num)
+            if self.instrumentation is not None:
+                self.instrumentation.record_created('precincts.Ward')
             return self._wards[ward_num]
 
     def get_or_create_candidate_by_name(self, name):
@@ -387,12 +1099,15 @@ class PrecinctClient(object):
             return self._candidates_by_name[name]
         except KeyError:
             self._candidates_by_name[name] = Candidate(name)
+            if self.instrumentation is not None:
+                self.instrumentation.record_created('precincts.Candidate')
             return self._candidates_by_name[name]
 
     def create_ward_result(self, result_dict, ward):
         candidate = self.get_or_create_candidate_by_name(result_dict['candidate'])
         return Result(candidate, result_dict['votes'],
-            percent=result_dict['percent'], reporting_unit=ward)
+            percent=result_dict['percent'], reporting_unit=ward,
+            register=self.register_results)
 
     def create_result(self, result_dict, race, ward_num):
         ward = self.get_or_create_ward(ward_num)
@@ -413,7 +1128,8 @@ class PrecinctClient(object):
             votes=result_dict['votes'],
             reporting_unit=reporting_unit,
             percent=result_dict.get('percent', None),
-            race=race_model
+            race=race_model,
+            register=self.register_results,
         )
 
     def fetch_precinct_results(self, elec_code, race, ward_num):
@@ -422,7 +1138,26 @@ class PrecinctClient(object):
         else:
             race_number = race
 
+        results = self.fetch_precinct_result_dicts(elec_code, race_number,
+            ward_num)
+        return self.create_results(results, race, ward_num)
+
+    def create_results(self, result_dicts, race, ward_num):
+        results = [self.create_result(rd, race, ward_num)
+                   for rd in result_dicts]
+        if self.instrumentation is not None:
+            self.instrumentation.record_created('precincts.Result',
+                len(results))
+        return results
+
+    def fetch_precinct_result_dicts(self, elec_code, race_number, ward_num):
+        """
+        Fetch and parse a ward's precinct results, without creating models.
+
+        This doesn't modify the client, so it's safe to call from multiple
+        threads.
+
+        """
         html_string = self.fetch_precinct_results_html(elec_code, race_number,
             ward_num)
-        results = self._parser.parse(html_string)
-        return [self.create_result(rd, race, ward_num) for rd in results]
+        return self.parse_results(self._parser, html_string)
@@ -0,0 +1,187 @@
+"""
+Scrape precinct results for whole elections concurrently.
+
+The serial way to scrape an election is to fetch its races, then the wards
+for each race, then the precinct results for each ward, one request at a
+time.  ``ScrapeScheduler`` makes the same requests through a single thread
+pool: the races for every election are fetched, then the wards for every
+race, and then every (election, race, ward) request is submitted at once.
+Results are yielded as soon as each ward's request completes.
+
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+
+import requests
+
+from .precincts import Election, PrecinctClient, is_retriable
+
+
+class ScrapeProgress(object):
+    """
+    Track and report the progress of a scrape.
+
+    A summary line is written to ``stream``, if one is provided, at most
+    every ``interval`` seconds.  If the client's ``AdaptiveConcurrency`` is
+    provided as ``concurrency``, the line includes its current limit and
+    the number of requests it has seen fail or slow down.
+
+    """
+    def __init__(self, stream=None, interval=1.0, concurrency=None):
+        self.stream = stream
+        self.interval = interval
+        self.concurrency = concurrency
+
+        self.requests = 0
+        self.retries = 0
+        self.rows = 0
+        self.wards_total = 0
+        self.wards_done = 0
+        self.start_time = time.time()
+        self._last_report = None
+        self._lock = threading.Lock()
+
+    def add_request(self, retry=False):
+        with self._lock:
+            self.requests += 1
+            if retry:
+                self.retries += 1
+
+    def add_ward(self, rows):
+        self.wards_done += 1
+        self.rows += rows
+        self.maybe_report()
+
+    @property
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    @property
+    def requests_per_sec(self):
+        return self.requests / max(self.elapsed, 1e-6)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / max(self.elapsed, 1e-6)
+
+    def maybe_report(self):
+        now = time.time()
+        if self._last_report is None or now - self._last_report >= self.interval:
+            self.report()
+
+    def report(self):
+        self._last_report = time.time()
+        if self.stream is None:
+            return
+
+        line = ("{}/{} wards, {} requests ({} retries), {} rows, "
+                "{:.1f} requests/sec, {:.1f} rows/sec".format(
+                    self.wards_done, self.wards_total, self.requests,
+                    self.retries, self.rows, self.requests_per_sec,
+                    self.rows_per_sec))
+        if self.concurrency is not None:
+            stats = self.concurrency.serialize()
+            line += (", concurrency limit {:.1f} ({} errors, {} slow, "
+                     "{} retries, {:.1f} requests/sec sent)".format(
+                         stats['limit'], stats['errors'],
+                         stats['slowdowns'], stats['retries'],
+                         stats['requests_per_sec']))
+        self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+class ScrapeScheduler(object):
+    """
+    Fetch precinct results for many elections through one thread pool.
+
+    At most ``max_workers`` requests are in flight at once, across all
+    elections, races and wards.  A request that times out, can't connect
+    or gets a 429 or 5xx response is retried up to ``retries`` times; other
+    errors, like a 404, are raised immediately.
+
+    """
+    def __init__(self, client=None, max_workers=8, retries=2,
+            retry_wait=1.0, progress=None):
+        if client is None:
+            client = PrecinctClient(max_workers=max_workers)
+        self.client = client
+        self.max_workers = max_workers
+        self.retries = retries
+        self.retry_wait = retry_wait
+        if progress is None:
+            progress = ScrapeProgress(stream=None)
+        self.progress = progress
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call a function that makes a single request, retrying on failure.
+        """
+        attempt = 0
+        while True:
+            self.progress.add_request(retry=attempt > 0)
+            try:
+                return fn(*args, **kwargs)
+            except requests.RequestException as e:
+                if attempt >= self.retries or not is_retriable(e):
+                    raise
+                attempt += 1
+                time.sleep(self.retry_wait * attempt)
+
+    def fetch_races(self, executor, elections, race_filter=None):
+        futures = [executor.submit(self.call, election.fetch_races)
+                   for election in elections]
+        for future in futures:
+            future.result()
+
+        races = []
+        for election in elections:
+            races.extend(r for r in election.races
+                         if race_filter is None or race_filter(r))
+        return races
+
+    def fetch_wards(self, executor, races):
+        futures = [executor.submit(self.call, race.fetch_wards)
+                   for race in races]
+        for future in futures:
+            future.result()
+
+    def run(self, elec_codes, race_filter=None):
+        """
+        Generate ``Result`` objects for the races in the given elections.
+
+        ``race_filter`` is an optional function that is passed each ``Race``
+        and returns True if its results should be fetched.  Results for each
+        ward are generated in ward order, but wards are generated in the
+        order their requests complete.
+
+        """
+        elections = [Election(elec_code=elec_code, client=self.client)
+                     for elec_code in elec_codes]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            races = self.fetch_races(executor, elections, race_filter)
+            self.fetch_wards(executor, races)
+
+            futures = {}
+            for race in races:
+                for ward in race.wards:
+                    future = executor.submit(self.call,
+                        self.client.fetch_precinct_result_dicts,
+                        elec_code=race.election.elec_code,
+                        race_number=race.number,
+                        ward_num=ward.number)
+                    futures[future] = (race, ward.number)
+
+            self.progress.wards_total = len(futures)
+            self.progress.report()
+
+            for future in as_completed(futures):
+                race, ward_num = futures.pop(future)
+                results = self.client.create_results(future.result(), race,
+                    ward_num)
+                self.progress.add_ward(len(results))
+                for result in results:
+                    yield result
+
+        self.progress.report()
@@ -0,0 +1,290 @@
+"""
+Simulate the Board of Elections website locally.
+
+``BoardSimulator`` serves a ``SyntheticElection`` at the same paths as
+chicagoelections.com, so the clients and the command line interface can be
+pointed at it to measure their throughput, or to see how they behave when
+the server is slow or failing, without making requests to the real site:
+
+* ``/ap/summary.txt`` and ``/results/ap/summary.txt``: the summary file,
+  whose vote counts grow as precincts report over the course of the
+  simulated night.  Like the real file, it has every column until polls
+  close and only the numeric columns afterwards.  Responses have an
+  ``ETag`` and answer conditional requests.
+* ``/en/wdlevel3.asp``: the select list of races for a GET, and the ward
+  results of the race named by the ``D3`` field for a POST.
+* ``/en/pctlevel3.asp``: the precinct results of a ward, by the
+  ``race_number`` and ``Ward`` query parameters.
+
+Every response can be delayed, failed at random, and limited to a number of
+requests per second, a number of requests at once, and a number of bytes per
+second.
+
+"""
+import hashlib
+import random
+import threading
+import time
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qs, urlparse
+
+from .precincts import RateLimiter
+from .synthetic import SyntheticElection
+
+SUMMARY_PATHS = ('/ap/summary.txt', '/results/ap/summary.txt')
+ELECTION_PATH = '/en/wdlevel3.asp'
+PRECINCT_PATH = '/en/pctlevel3.asp'
+
+
+class ElectionNight(object):
+    """
+    The progress of a simulated election night.
+
+    Precincts report steadily from the time the night starts until
+    ``duration`` seconds later, and the summary file is regenerated every
+    ``update_interval`` seconds.  The summary file has every column until
+    the first precincts report, then only the numeric columns, unless
+    ``numeric_only`` is False.
+
+    """
+    def __init__(self, election=None, duration=600, update_interval=10,
+            numeric_only=True, clock=time.time):
+        if election is None:
+            election = SyntheticElection()
+        self.election = election
+        self.duration = duration
+        self.update_interval = update_interval
+        self.numeric_only = numeric_only
+        self._clock = clock
+        self._start = clock()
+        self._summary = None
+        self._lock = threading.Lock()
+
+    @property
+    def update(self):
+        """
+        The number of times the summary file has been regenerated.
+        """
+        elapsed = self._clock() - self._start
+        return int(elapsed // self.update_interval)
+
+    def reporting(self, update=None):
+        """
+        The fraction of precincts that have reported by ``update``, or now.
+        """
+        if update is None:
+            update = self.update
+        if not self.duration:
+            return 1.0
+        return min(1.0, update * self.update_interval / float(self.duration))
+
+    def summary(self):
+        """
+        Return the current summary file as UTF-8 bytes and its ETag.
+        """
+        update = self.update
+        with self._lock:
+            if self._summary is None or self._summary[0] != update:
+                reporting = self.reporting(update)
+                content = self.election.summary_text(reporting=reporting,
+                    numeric_only=self.numeric_only and reporting > 0
+                ).encode('utf-8')
+                etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+                self._summary = (update, content, etag)
+            return self._summary[1:]
+
+
+class SimulatorRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def handle_request(self, method):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if not server.acquire():
+            self.send_content(503, b'Too many requests at once')
+            return
+
+        try:
+            server.throttle()
+            if server.fail():
+                self.send_content(500, b'Simulated error')
+                return
+
+            parsed_url = urlparse(self.path)
+            query = parse_qs(parsed_url.query)
+            form = parse_qs(body.decode('utf-8'))
+            try:
+                self.route(method, parsed_url.path, query, form)
+            except (KeyError, IndexError, ValueError):
+                self.send_content(404, b'Not found')
+        finally:
+            server.release()
+
+    def route(self, method, path, query, form):
+        election = self.server.night.election
+        if method == 'GET' and path in SUMMARY_PATHS:
+            self.send_summary()
+        elif method == 'GET' and path == ELECTION_PATH:
+            self.send_html(election.election_html())
+        elif method == 'POST' and path == ELECTION_PATH:
+            self.send_html(election.ward_results_html(form['D3'][0]))
+        elif method == 'GET' and path == PRECINCT_PATH:
+            race_number = int(query['race_number'][0])
+            ward = int(query['Ward'][0])
+            if ward not in election.wards:
+                raise KeyError(ward)
+            self.send_html(election.precinct_results_html(race_number, ward))
+        else:
+            raise KeyError(path)
+
+    def send_summary(self):
+        content, etag = self.server.night.summary()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_content(304, b'', {'ETag': etag})
+            return
+
+        self.send_content(200, content, {
+            'Content-Type': 'text/plain; charset=utf-8',
+            'ETag': etag,
+        })
+
+    def send_html(self, html_string):
+        self.send_content(200, html_string.encode('utf-8'), {
+            'Content-Type': 'text/html; charset=utf-8',
+        })
+
+    def send_content(self, status, content, headers=None):
+        self.server.record(status, len(content))
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.server.write(self.wfile, content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BoardSimulator(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Serve an ``ElectionNight`` over HTTP in a background thread.
+
+    Each response is delayed by ``latency`` seconds, plus up to ``jitter``
+    more at random, and fails with a 500 error with probability
+    ``error_rate``.  If ``max_rate`` is specified, requests beyond that many
+    per second wait their turn.  If ``max_concurrent`` is specified,
+    requests beyond that many at once are refused with a 503 error.  If
+    ``bandwidth`` is specified, each response is sent at no more than that
+    many bytes per second.
+
+    ``stats()`` returns the number of requests by status and the bytes sent.
+
+    """
+    daemon_threads = True
+    CHUNK_SIZE = 16 * 1024
+
+    def __init__(self, night=None, host='127.0.0.1', port=0, latency=0,
+            jitter=0, error_rate=0, max_rate=None, max_concurrent=None,
+            bandwidth=None, seed=None):
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port),
+            SimulatorRequestHandler)
+        if night is None:
+            night = ElectionNight()
+        self.night = night
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.bandwidth = bandwidth
+        if max_rate is not None:
+            self._rate_limiter = RateLimiter(max_rate)
+        else:
+            self._rate_limiter = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._concurrent = 0
+        self._statuses = {}
+        self._bytes = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def acquire(self):
+        with self._lock:
+            if (self.max_concurrent is not None and
+                    self._concurrent >= self.max_concurrent):
+                return False
+            self._concurrent += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._concurrent -= 1
+
+    def throttle(self):
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay += self._random.uniform(0, self.jitter)
+        if self._rate_limiter is not None:
+            # Requests over the rate wait in line before being handled
+            delay += self._rate_limiter.reserve(self.url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def record(self, status, size):
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            self._bytes += size
+
+    def write(self, f, content):
+        if self.bandwidth is None:
+            f.write(content)
+            return
+
+        for i in range(0, len(content), self.CHUNK_SIZE):
+            chunk = content[i:i + self.CHUNK_SIZE]
+            f.write(chunk)
+            f.flush()
+            time.sleep(len(chunk) / float(self.bandwidth))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': sum(self._statuses.values()),
+                'statuses': dict(self._statuses),
+                'bytes': self._bytes,
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+            kwargs={'poll_interval': 0.1})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
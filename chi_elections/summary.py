@@ -17,8 +17,11 @@ This file provides racewide results.
 
 """
 from collections import OrderedDict
+import io
+import mmap
+import time
 
-import requests
+import six
 
 from .constants import SUMMARY_URL
 from .transforms import replace_single_quotes
@@ -33,7 +36,7 @@ class FixedWidthField(object):
     def parse(self, s):
         try:
             s_decoded = s.decode('utf-8')
-        except UnicodeEncodeError:
+        except (AttributeError, UnicodeEncodeError):
             s_decoded = s
 
         val = s_decoded[self.index:self.index + self.length]
@@ -50,25 +53,60 @@ class FixedWidthField(object):
 class FixedWidthParserMeta(type):
     def __new__(cls, name, parents, dct):
         dct['_fields'] = []
-        for k, v in dct.items():
+        for k, v in list(dct.items()):
             if isinstance(v, FixedWidthField):
                 v.name = k
                 dct['_fields'].append(v)
                 del dct[k]
 
+        dct['_fields'].sort(key=lambda f: f.index)
+        dct['_plan'] = tuple((f.name, slice(f.index, f.index + f.length),
+                              f.transform) for f in dct['_fields'])
+
         new_cls = super(FixedWidthParserMeta, cls).__new__(cls, name, parents, dct)
         return new_cls
 
 
+@six.add_metaclass(FixedWidthParserMeta)
 class FixedWidthParser(object):
-    __metaclass__ = FixedWidthParserMeta
+    """
+    Parse lines of fixed-width text into dictionaries.
+
+    The field declarations are compiled, once per class, into a plan of
+    (name, slice, transform) tuples.  Each line is decoded a single time and
+    every field is then sliced out of the decoded line in one pass, rather
+    than having each ``FixedWidthField`` decode the line on its own.
 
+    """
     def parse_line(self, line):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+
+        attrs = {}
+        for name, field_slice, transform in self._plan:
+            val = line[field_slice].strip()
+            if transform is not None:
+                try:
+                    val = transform(val)
+                except ValueError:
+                    val = None
+
+            attrs[name] = val
+
+        return attrs
+
+    def parse_line_fields(self, line):
+        """
+        Parse a line by calling ``FixedWidthField.parse`` for each field.
+
+        This is the uncompiled path, kept for comparison with ``parse_line``.
+
+        """
         attrs = {}
         for field in self._fields:
             attrs[field.name] = field.parse(line)
 
-        return attrs 
+        return attrs
 
 
 class ResultParser(FixedWidthParser):
@@ -97,7 +135,120 @@ class ResultParser(FixedWidthParser):
     vote_for = FixedWidthField(151, 3, transform=int)
 
 
+class SummaryRecord(object):
+    """
+    A line of the summary file, read from a bytes buffer.
+
+    The numeric columns, which are always ASCII, are converted straight from
+    bytes.  The text columns are only decoded, all at once, the first time
+    one of them is accessed.  Their positions are in characters rather than
+    bytes, so they're sliced after decoding.
+
+    Records keep a reference to the buffer they were read from, so their
+    text columns can only be read while it's open.
+
+    """
+    __slots__ = ('_buf', '_start', '_end', '_text', 'contest_code',
+                 'candidate_number', 'precincts_total', 'vote_total',
+                 'precincts_reporting')
+
+    NUMERIC_LENGTH = 22
+
+    def __init__(self, buf, start, end):
+        self._buf = buf
+        self._start = start
+        self._end = end
+        self._text = None
+
+        numeric = buf[start:start + self.NUMERIC_LENGTH]
+        try:
+            self.contest_code = int(numeric[0:4])
+            self.candidate_number = int(numeric[4:7])
+            self.precincts_total = int(numeric[7:11])
+            self.vote_total = int(numeric[11:18])
+            self.precincts_reporting = int(numeric[18:22])
+        except ValueError:
+            # Only malformed lines get here, so handle each column separately
+            self.contest_code = self._int(numeric[0:4])
+            self.candidate_number = self._int(numeric[4:7])
+            self.precincts_total = self._int(numeric[7:11])
+            self.vote_total = self._int(numeric[11:18])
+            self.precincts_reporting = self._int(numeric[18:22])
+
+    @classmethod
+    def _int(cls, value):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    @property
+    def has_text(self):
+        return self._end - self._start > self.NUMERIC_LENGTH
+
+    def raw_text(self):
+        """
+        Return the undecoded bytes of the text columns.
+        """
+        return self._buf[self._start + self.NUMERIC_LENGTH:self._end]
+
+    def _get_text(self, start, end):
+        text = self._text
+        if text is None:
+            # Pad, so the text columns start at their position in the line
+            text = self._text = u' ' * self.NUMERIC_LENGTH + self._buf[
+                self._start + self.NUMERIC_LENGTH:self._end].decode('utf-8')
+        return text[start:end].strip()
+
+    @property
+    def party(self):
+        return self._get_text(22, 25)
+
+    @property
+    def race_name(self):
+        return self._get_text(32, 88)
+
+    @property
+    def candidate_name(self):
+        return replace_single_quotes(self._get_text(88, 126))
+
+    @property
+    def reporting_unit_name(self):
+        return self._get_text(126, 151)
+
+    @property
+    def vote_for(self):
+        return self._int(self._get_text(151, 154))
+
+
+def iter_records(buf):
+    """
+    Generate a ``SummaryRecord`` for each non-blank line of a bytes buffer.
+
+    ``buf`` is a ``bytes`` object or an ``mmap``.  Lines are found with
+    ``find()``, so the buffer is never split into a list of lines.
+
+    """
+    size = len(buf)
+    start = 0
+    while start < size:
+        end = buf.find(b'\n', start)
+        if end == -1:
+            end = size
+        next_start = end + 1
+
+        if end > start and buf[end - 1:end] == b'\r':
+            end -= 1
+        if end > start and buf[start:end].strip():
+            yield SummaryRecord(buf, start, end)
+
+        start = next_start
+
+
 class Result(object):
+    __slots__ = ('candidate_number', 'full_name', 'party', 'race',
+                 'vote_total')
+
     def __init__(self, candidate_number, full_name, party, race, vote_total,
             reporting_unit_name):
         self.candidate_number = candidate_number
@@ -107,7 +258,7 @@ class Result(object):
         self.vote_total = vote_total
 
     def __str__(self):
-        return "{}: {}d".format(self.name, self.vote_total)
+        return "{}: {}".format(self.full_name, self.vote_total)
 
     def serialize(self):
         return OrderedDict((
@@ -119,6 +270,9 @@ class Result(object):
 
 
 class Race(object):
+    __slots__ = ('contest_code', 'name', 'candidates', 'precincts_total',
+                 'precincts_reporting', 'vote_for')
+
     def __init__(self, contest_code, name, precincts_total=0,
             precincts_reporting=0, vote_for=1):
         self.contest_code = contest_code
@@ -141,19 +295,554 @@ class Race(object):
         return self.name
 
 
-class SummaryParser(object):
+class ChangeSet(object):
+    """
+    Differences between two versions of the summary file.
+
+    ``votes_changed`` holds the ``Result`` objects whose vote total changed
+    and ``precincts_changed`` the ``Race`` objects whose count of reporting
+    precincts changed.  The remaining lists hold races and candidate results
+    that appeared in, or disappeared from, the file.
+
+    """
     def __init__(self):
-        self._result_parser = ResultParser()
+        self.votes_changed = []
+        self.precincts_changed = []
+        self.races_added = []
+        self.races_removed = []
+        self.results_added = []
+        self.results_removed = []
 
-    def parse(self, s):
+    def __len__(self):
+        return (len(self.votes_changed) + len(self.precincts_changed) +
+            len(self.races_added) + len(self.races_removed) +
+            len(self.results_added) + len(self.results_removed))
+
+    def __bool__(self):
+        return len(self) > 0
+
+    __nonzero__ = __bool__
+
+    @classmethod
+    def _serialize_result(cls, result):
+        return OrderedDict((
+            ('contest_code', result.race.contest_code),
+            ('candidate_number', result.candidate_number),
+            ('vote_total', result.vote_total),
+        ))
+
+    @classmethod
+    def _serialize_race(cls, race):
+        return OrderedDict((
+            ('contest_code', race.contest_code),
+            ('precincts_reporting', race.precincts_reporting),
+        ))
+
+    def serialize(self):
+        return OrderedDict((
+            ('votes_changed',
+             [self._serialize_result(r) for r in self.votes_changed]),
+            ('precincts_changed',
+             [self._serialize_race(r) for r in self.precincts_changed]),
+            ('races_added', [r.contest_code for r in self.races_added]),
+            ('races_removed', [r.contest_code for r in self.races_removed]),
+            ('results_added',
+             [self._serialize_result(r) for r in self.results_added]),
+            ('results_removed',
+             [self._serialize_result(r) for r in self.results_removed]),
+        ))
+
+
+class MetadataStore(object):
+    """
+    Candidate and race metadata saved to a SQLite database.
+
+    Partway through election night, the summary file shrinks to only the
+    numeric columns.  Names, party and the number of candidates to vote for
+    from earlier, full-width versions of the file are saved here, keyed by
+    contest code and candidate number, so they can be filled back in.
+
+    The whole table is read into memory when the store is opened, so lookups
+    don't touch the database.  ``version`` is incremented each time ``save()``
+    adds or changes records.
+
+    """
+    COLUMNS = ('race_name', 'candidate_name', 'party', 'reporting_unit_name',
+               'vote_for')
+
+    def __init__(self, path):
+        import sqlite3
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            "contest_code INTEGER NOT NULL, "
+            "candidate_number INTEGER NOT NULL, "
+            "race_name TEXT, candidate_name TEXT, party TEXT, "
+            "reporting_unit_name TEXT, vote_for INTEGER, "
+            "PRIMARY KEY (contest_code, candidate_number))")
+        self._conn.commit()
+
+        self.version = 0
+        self._metadata = {}
+        for row in self._conn.execute("SELECT * FROM metadata"):
+            self._metadata[(row[0], row[1])] = tuple(row[2:])
+
+    def __len__(self):
+        return len(self._metadata)
+
+    def get(self, contest_code, candidate_number):
+        """
+        Return a dictionary of the saved metadata for a candidate, or None.
+        """
+        try:
+            values = self._metadata[(contest_code, candidate_number)]
+        except KeyError:
+            return None
+
+        return dict(zip(self.COLUMNS, values))
+
+    def save(self, attrs_list):
+        """
+        Save metadata from dictionaries of parsed field values.
+
+        Only new or changed records are written.
+
+        """
+        rows = []
+        for attrs in attrs_list:
+            key = (attrs['contest_code'], attrs['candidate_number'])
+            values = tuple(attrs[c] for c in self.COLUMNS)
+            if self._metadata.get(key) != values:
+                self._metadata[key] = values
+                rows.append(key + values)
+
+        if rows:
+            self.version += 1
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows)
+
+    def close(self):
+        self._conn.close()
+
+
+class HistoryStore(object):
+    """
+    A history of summary file polls saved to a SQLite database.
+
+    Only what changed since the previous snapshot is written: the vote
+    totals of results, keyed by contest code and candidate number, and the
+    precinct counts of races.  Results and races that disappear are
+    recorded with NULL values, and polls where nothing changed aren't
+    recorded at all.  Every ``keyframe_interval`` snapshots, the complete
+    state is written instead, so reconstructing a point in time only reads
+    the rows since the last keyframe.
+
+    Rows are indexed by contest code, so the history of a single race can be
+    read without touching the rows of other races.
+
+    """
+    def __init__(self, path, keyframe_interval=20):
+        self.keyframe_interval = keyframe_interval
+        import sqlite3
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "id INTEGER PRIMARY KEY, "
+                "timestamp REAL NOT NULL, "
+                "keyframe INTEGER NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS votes ("
+                "snapshot_id INTEGER NOT NULL, "
+                "contest_code INTEGER NOT NULL, "
+                "candidate_number INTEGER NOT NULL, "
+                "vote_total INTEGER)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS votes_contest "
+                "ON votes (contest_code, snapshot_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS precincts ("
+                "snapshot_id INTEGER NOT NULL, "
+                "contest_code INTEGER NOT NULL, "
+                "precincts_reporting INTEGER, "
+                "precincts_total INTEGER)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS precincts_contest "
+                "ON precincts (contest_code, snapshot_id)")
+
+        # The latest state, to compare new snapshots against
+        self._votes = {}
+        self._precincts = {}
+        self._since_keyframe = None
+        last = self._conn.execute(
+            "SELECT id, timestamp FROM snapshots "
+            "ORDER BY id DESC LIMIT 1").fetchone()
+        if last is not None:
+            self._votes, self._precincts = self._read_state(last[0])
+            keyframe_id = self._get_keyframe_id(last[0])
+            self._since_keyframe = self._conn.execute(
+                "SELECT COUNT(*) FROM snapshots WHERE id > ?",
+                (keyframe_id,)).fetchone()[0]
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def append(self, races, timestamp=None):
+        """
+        Record the state of a list of ``Race`` objects.
+
+        Returns the new snapshot's id, or None if nothing changed since the
+        previous snapshot, in which case nothing is written.
+
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        votes = {}
+        precincts = {}
+        for race in races:
+            precincts[race.contest_code] = (race.precincts_reporting,
+                race.precincts_total)
+            for result in race.candidates:
+                votes[(race.contest_code, result.candidate_number)] = \
+                    result.vote_total
+
+        vote_rows = self._diff(self._votes, votes, (None,))
+        precinct_rows = self._diff(self._precincts, precincts, (None, None))
+        if self._since_keyframe is not None and not (vote_rows or
+                precinct_rows):
+            return None
+
+        keyframe = (self._since_keyframe is None or
+            self._since_keyframe >= self.keyframe_interval)
+        if keyframe:
+            vote_rows = [key + (value,) for key, value in votes.items()]
+            precinct_rows = [(key,) + value
+                             for key, value in precincts.items()]
+
+        with self._conn:
+            snapshot_id = self._conn.execute(
+                "INSERT INTO snapshots (timestamp, keyframe) VALUES (?, ?)",
+                (timestamp, int(keyframe))).lastrowid
+            self._conn.executemany(
+                "INSERT INTO votes VALUES ({}, ?, ?, ?)".format(snapshot_id),
+                vote_rows)
+            self._conn.executemany(
+                "INSERT INTO precincts VALUES ({}, ?, ?, ?)".format(
+                    snapshot_id),
+                precinct_rows)
+
+        self._votes = votes
+        self._precincts = precincts
+        self._since_keyframe = 0 if keyframe else self._since_keyframe + 1
+        return snapshot_id
+
+    @classmethod
+    def _diff(cls, old, new, removed):
+        def as_tuple(key):
+            return key if isinstance(key, tuple) else (key,)
+
+        def as_values(value):
+            return value if isinstance(value, tuple) else (value,)
+
+        rows = [as_tuple(key) + as_values(value)
+                for key, value in new.items() if old.get(key) != value]
+        rows.extend(as_tuple(key) + removed for key in old if key not in new)
+        return rows
+
+    def snapshots(self):
+        """
+        Return a list of ``(snapshot_id, timestamp)`` tuples.
+        """
+        return self._conn.execute(
+            "SELECT id, timestamp FROM snapshots ORDER BY id").fetchall()
+
+    def _get_snapshot_id(self, timestamp):
+        if timestamp is None:
+            row = self._conn.execute("SELECT MAX(id) FROM snapshots").fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM snapshots WHERE timestamp <= ?",
+                (timestamp,)).fetchone()
+        return row[0]
+
+    def _get_keyframe_id(self, snapshot_id):
+        return self._conn.execute(
+            "SELECT MAX(id) FROM snapshots WHERE keyframe = 1 AND id <= ?",
+            (snapshot_id,)).fetchone()[0]
+
+    def _read_state(self, snapshot_id, contest_code=None):
+        keyframe_id = self._get_keyframe_id(snapshot_id)
+        where = "snapshot_id BETWEEN ? AND ?"
+        params = (keyframe_id, snapshot_id)
+        if contest_code is not None:
+            where = "contest_code = ? AND " + where
+            params = (contest_code,) + params
+
+        votes = {}
+        for contest, candidate_number, vote_total in self._conn.execute(
+                "SELECT contest_code, candidate_number, vote_total FROM votes "
+                "WHERE {} ORDER BY snapshot_id".format(where), params):
+            if vote_total is None:
+                votes.pop((contest, candidate_number), None)
+            else:
+                votes[(contest, candidate_number)] = vote_total
+
+        precincts = {}
+        for contest, reporting, total in self._conn.execute(
+                "SELECT contest_code, precincts_reporting, precincts_total "
+                "FROM precincts WHERE {} ORDER BY snapshot_id".format(where),
+                params):
+            if reporting is None:
+                precincts.pop(contest, None)
+            else:
+                precincts[contest] = (reporting, total)
+
+        return votes, precincts
+
+    def get_state(self, timestamp=None, contest_code=None):
+        """
+        Reconstruct the results as of the last snapshot at or before
+        ``timestamp``, or the latest snapshot.
+
+        Returns a dictionary mapping contest codes to dictionaries with
+        'precincts_reporting', 'precincts_total' and 'votes', which maps
+        candidate numbers to vote totals.  If ``contest_code`` is specified,
+        only that race is read.
+
+        """
+        snapshot_id = self._get_snapshot_id(timestamp)
+        if snapshot_id is None:
+            return {}
+
+        votes, precincts = self._read_state(snapshot_id, contest_code)
+        return self._combine(votes, precincts)
+
+    @classmethod
+    def _combine(cls, votes, precincts):
+        state = {}
+        for contest, (reporting, total) in precincts.items():
+            state[contest] = {
+                'precincts_reporting': reporting,
+                'precincts_total': total,
+                'votes': {},
+            }
+        for (contest, candidate_number), vote_total in votes.items():
+            if contest in state:
+                state[contest]['votes'][candidate_number] = vote_total
+        return state
+
+    def race_history(self, contest_code):
+        """
+        Return the history of a single race.
+
+        Returns a list of ``(timestamp, state)`` tuples for each snapshot in
+        which the race changed, where ``state`` is a dictionary like those
+        returned by ``get_state()``, or None if the race was removed.
+
+        """
+        timestamps = dict(self.snapshots())
+        changes = {}
+        for snapshot_id, candidate_number, vote_total in self._conn.execute(
+                "SELECT snapshot_id, candidate_number, vote_total FROM votes "
+                "WHERE contest_code = ?", (contest_code,)):
+            changes.setdefault(snapshot_id, ([], []))[0].append(
+                (candidate_number, vote_total))
+        for snapshot_id, reporting, total in self._conn.execute(
+                "SELECT snapshot_id, precincts_reporting, precincts_total "
+                "FROM precincts WHERE contest_code = ?", (contest_code,)):
+            changes.setdefault(snapshot_id, ([], []))[1].append(
+                (reporting, total))
+
+        keyframes = set(snapshot_id for snapshot_id, in self._conn.execute(
+            "SELECT id FROM snapshots WHERE keyframe = 1"))
+
+        # Keyframes have rows for every race, so a keyframe without any for
+        # this race means it was removed
+        history = []
+        state = None
+        for snapshot_id in sorted(set(changes) | keyframes):
+            vote_changes, precinct_changes = changes.get(snapshot_id,
+                ([], []))
+            if snapshot_id in keyframes or state is None:
+                votes = {}
+                precincts = None
+            else:
+                votes = dict(state['votes'])
+                precincts = (state['precincts_reporting'],
+                             state['precincts_total'])
+
+            for candidate_number, vote_total in vote_changes:
+                if vote_total is None:
+                    votes.pop(candidate_number, None)
+                else:
+                    votes[candidate_number] = vote_total
+            for reporting, total in precinct_changes:
+                precincts = (reporting, total) if reporting is not None else None
+
+            if precincts is None:
+                new_state = None
+            else:
+                new_state = {
+                    'precincts_reporting': precincts[0],
+                    'precincts_total': precincts[1],
+                    'votes': votes,
+                }
+
+            if new_state != state:
+                history.append((timestamps[snapshot_id], new_state))
+            state = new_state
+
+        return history
+
+
+class LineCacheStats(object):
+    """
+    Counts of summary file lines that were reused from the previous parse
+    (hits) and lines that had to be decoded (misses).
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def serialize(self):
+        return OrderedDict((
+            ('hits', self.hits),
+            ('misses', self.misses),
+        ))
+
+
+class SummaryParser(object):
+    """
+    Parse the summary file into ``Race`` and ``Result`` objects.
+
+    The raw text of each line is remembered, keyed by its first 7 characters
+    (contest code and candidate number).  When a later version of the file
+    contains exactly the same line, the values decoded from it the previous
+    time are reused instead of running it through ``ResultParser`` again.
+    ``line_stats`` counts how often this happens.
+
+    If a ``MetadataStore`` is provided, the names from full-width lines are
+    saved to it, and filled in for lines that only contain the numeric
+    columns.
+
+    """
+    KEY_LENGTH = 7
+    NUMERIC_LENGTH = 22
+    METADATA_BATCH_SIZE = 1000
+    TEXT_CACHE_SIZE = 100000
+
+    def __init__(self, metadata_store=None):
+        self._result_parser = ResultParser()
+        self._metadata_store = metadata_store
         self.races = []
         self._race_lookup = {}
+        self._result_lookup = {}
+        self._line_cache = {}
+        self._text_cache = {}
+        self._race_text_cache = {}
+        self.line_stats = LineCacheStats()
 
+    def parse_lines(self, s):
+        """
+        Generate a dictionary of field values for each line of ``s``.
+
+        The dictionaries may be shared with later calls, so they shouldn't be
+        modified.
+
+        """
+        store = self._metadata_store
+        line_cache = {}
+        full_width = []
         for line in s.splitlines(True):
+            key = line[:self.KEY_LENGTH]
+            try:
+                cached_line, parsed, version = self._line_cache[key]
+            except KeyError:
+                cached_line = None
+
+            # The version of the metadata store that numeric-only lines were
+            # joined with, or None for full-width lines
+            if cached_line == line:
+                self.line_stats.hits += 1
+                if version is not None and version != store.version:
+                    # Metadata was saved since the line was joined
+                    parsed = self.join_metadata(parsed)
+                    version = store.version
+            else:
+                parsed = self._result_parser.parse_line(line)
+                self.line_stats.misses += 1
+                version = None
+                if store is not None:
+                    if len(line.rstrip()) > self.NUMERIC_LENGTH:
+                        full_width.append(parsed)
+                    else:
+                        parsed = self.join_metadata(parsed)
+                        version = store.version
+
+            line_cache[key] = (line, parsed, version)
+            yield parsed
+
+        self._line_cache = line_cache
+        if full_width:
+            self._metadata_store.save(full_width)
+
+    def join_metadata(self, attrs):
+        metadata = self._metadata_store.get(attrs['contest_code'],
+            attrs['candidate_number'])
+        if metadata is None:
+            return attrs
+
+        joined = dict(attrs)
+        joined.update(metadata)
+        return joined
+
+    def iter_results(self, lines):
+        """
+        Generate ``(race, result)`` tuples from an iterable of lines.
+
+        ``lines`` can be a file object, or any iterable of lines as strings
+        or UTF-8 encoded bytes, such as the ``iter_lines()`` of a streamed
+        ``requests`` response.  Each line is decoded as it's read, and only
+        the race currently being read is kept, so memory use doesn't grow
+        with the size of the file.  Lines for a contest are expected to be
+        contiguous, as they are in the summary file.
+
+        This doesn't change ``races``.
+
+        """
+        race = None
+        full_width = []
+        for line in lines:
+            if not line.strip():
+                continue
+
             parsed = self._result_parser.parse_line(line)
-            race = self.get_or_create_race(parsed)
+            if self._metadata_store is not None:
+                if len(line.rstrip()) > self.NUMERIC_LENGTH:
+                    full_width.append(parsed)
+                    if len(full_width) >= self.METADATA_BATCH_SIZE:
+                        self._metadata_store.save(full_width)
+                        full_width = []
+                else:
+                    parsed = self.join_metadata(parsed)
+
+            if race is None or race.contest_code != parsed['contest_code']:
+                race = Race(
+                    contest_code=parsed['contest_code'],
+                    name=parsed['race_name'],
+                    precincts_total=parsed['precincts_total'],
+                    precincts_reporting=parsed['precincts_reporting'],
+                    vote_for=parsed['vote_for'],
+                )
+
             result = Result(
-                candidate_number=parsed['candidate_number'],    
+                candidate_number=parsed['candidate_number'],
                 vote_total=parsed['vote_total'],
                 party=parsed['party'],
                 race=race,
@@ -161,7 +850,188 @@ class SummaryParser(object):
                 reporting_unit_name=parsed['reporting_unit_name'],
             )
             race.candidates.append(result)
-    
+            yield race, result
+
+        if full_width:
+            self._metadata_store.save(full_width)
+
+    def iter_buffer_results(self, buf):
+        """
+        Generate ``(race, result)`` tuples from a bytes buffer, such as an
+        ``mmap`` of the summary file.
+
+        This is like ``iter_results()``, but lines are read as
+        ``SummaryRecord`` objects, so the numeric columns are never decoded.
+        The race's name and number to vote for are only read from the first
+        line of each contest, and the decoded text columns are cached by
+        their bytes, so parsing later versions of the file, where only the
+        numbers change, doesn't decode them again.  It doesn't use the
+        metadata store.
+
+        """
+        text_cache = self._text_cache
+        race_text_cache = self._race_text_cache
+        if len(text_cache) > self.TEXT_CACHE_SIZE:
+            text_cache.clear()
+            race_text_cache.clear()
+
+        race = None
+        for record in iter_records(buf):
+            # The text columns rarely change between versions of the file,
+            # so the decoded values are reused for identical bytes
+            raw_text = record.raw_text()
+            if race is None or race.contest_code != record.contest_code:
+                try:
+                    race_name, vote_for = race_text_cache[raw_text]
+                except KeyError:
+                    race_name, vote_for = race_text_cache[raw_text] = (
+                        record.race_name, record.vote_for)
+
+                race = Race(
+                    contest_code=record.contest_code,
+                    name=race_name,
+                    precincts_total=record.precincts_total,
+                    precincts_reporting=record.precincts_reporting,
+                    vote_for=vote_for,
+                )
+
+            try:
+                party, full_name = text_cache[raw_text]
+            except KeyError:
+                party, full_name = text_cache[raw_text] = (record.party,
+                    record.candidate_name)
+
+            result = Result(
+                candidate_number=record.candidate_number,
+                vote_total=record.vote_total,
+                party=party,
+                race=race,
+                full_name=full_name,
+                reporting_unit_name=None,
+            )
+            race.candidates.append(result)
+            yield race, result
+
+    def iter_file_results(self, f):
+        """
+        Generate ``(race, result)`` tuples from a summary file on disk.
+
+        The file is memory-mapped and parsed with ``iter_buffer_results()``.
+        Files that can't be mapped, like pipes and empty files, are read line
+        by line with ``iter_results()`` instead.
+
+        """
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, IOError, OSError, ValueError,
+                io.UnsupportedOperation):
+            for race, result in self.iter_results(f):
+                yield race, result
+            return
+
+        try:
+            for race, result in self.iter_buffer_results(buf):
+                yield race, result
+        finally:
+            buf.close()
+
+    def parse_file(self, f):
+        """
+        Parse a summary file on disk into ``races``, using
+        ``iter_file_results()``.
+        """
+        self.races = []
+        self._race_lookup = {}
+        self._result_lookup = {}
+        for race, result in self.iter_file_results(f):
+            if race.contest_code not in self._race_lookup:
+                self._race_lookup[race.contest_code] = race
+                self.races.append(race)
+            self._result_lookup[(race.contest_code,
+                                 result.candidate_number)] = result
+
+    def parse(self, s):
+        self.races = []
+        self._race_lookup = {}
+        self._result_lookup = {}
+
+        for parsed in self.parse_lines(s):
+            race = self.get_or_create_race(parsed)
+            self.create_result(parsed, race)
+
+    def update(self, s):
+        """
+        Parse a new version of the summary file into the existing races.
+
+        Races and results are looked up by contest code and candidate number
+        and updated in place, rather than being rebuilt.  Returns a
+        ``ChangeSet`` describing what changed since the previous call to
+        ``parse()`` or ``update()``.
+
+        """
+        changes = ChangeSet()
+        seen_races = set()
+        seen_results = set()
+        added_races = set()
+        races = []
+
+        for parsed in self.parse_lines(s):
+            contest_code = parsed['contest_code']
+            key = (contest_code, parsed['candidate_number'])
+
+            if contest_code not in seen_races:
+                seen_races.add(contest_code)
+                try:
+                    race = self._race_lookup[contest_code]
+                except KeyError:
+                    race = self.get_or_create_race(parsed)
+                    changes.races_added.append(race)
+                    added_races.add(contest_code)
+                else:
+                    race.precincts_total = parsed['precincts_total']
+                    if race.precincts_reporting != parsed['precincts_reporting']:
+                        race.precincts_reporting = parsed['precincts_reporting']
+                        changes.precincts_changed.append(race)
+                races.append(race)
+            else:
+                race = self._race_lookup[contest_code]
+
+            seen_results.add(key)
+            try:
+                result = self._result_lookup[key]
+            except KeyError:
+                result = self.create_result(parsed, race)
+                if contest_code not in added_races:
+                    changes.results_added.append(result)
+            else:
+                if result.vote_total != parsed['vote_total']:
+                    result.vote_total = parsed['vote_total']
+                    changes.votes_changed.append(result)
+
+        for race in self.races:
+            if race.contest_code not in seen_races:
+                changes.races_removed.append(race)
+                del self._race_lookup[race.contest_code]
+                continue
+
+            candidates = []
+            for result in race.candidates:
+                key = (race.contest_code, result.candidate_number)
+                if key in seen_results:
+                    candidates.append(result)
+                else:
+                    changes.results_removed.append(result)
+                    del self._result_lookup[key]
+            race.candidates = candidates
+
+        for race in changes.races_removed:
+            for result in race.candidates:
+                del self._result_lookup[(race.contest_code,
+                    result.candidate_number)]
+
+        self.races = races
+        return changes
+
     def get_or_create_race(self, attrs):
         try:
             race = self._race_lookup[attrs['contest_code']]
@@ -178,24 +1048,285 @@ class SummaryParser(object):
         
         return race
 
+    def create_result(self, attrs, race):
+        result = Result(
+            candidate_number=attrs['candidate_number'],
+            vote_total=attrs['vote_total'],
+            party=attrs['party'],
+            race=race,
+            full_name=attrs['candidate_name'],
+            reporting_unit_name=attrs['reporting_unit_name'],
+        )
+        race.candidates.append(result)
+        self._result_lookup[(race.contest_code, result.candidate_number)] = result
+        return result
+
+
+class FetchStats(object):
+    """
+    Counters describing the work done by a ``SummaryClient``.
+    """
+    def __init__(self):
+        self.fetches = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.parses = 0
+        self.errors = 0
+        self.bytes = 0
+        self.parse_time = 0.0
+
+    def serialize(self):
+        return OrderedDict((
+            ('fetches', self.fetches),
+            ('not_modified', self.not_modified),
+            ('unchanged', self.unchanged),
+            ('parses', self.parses),
+            ('errors', self.errors),
+            ('bytes', self.bytes),
+            ('parse_time', self.parse_time),
+        ))
+
 
 class SummaryClient(object):
+    """
+    Fetch and parse the summary file.
+
+    Requests are made through a single ``requests.Session``, so the
+    connection is reused between polls.  Each request is a conditional GET
+    using the ``ETag`` and ``Last-Modified`` headers of the previous response,
+    and the file is only parsed again when the server returns new content
+    whose hash differs from the last body that was parsed.
+
+    If ``incremental`` is True, new versions of the file are applied to the
+    existing races with ``SummaryParser.update()`` and the resulting
+    ``ChangeSet`` is available as ``changes``.
+
+    ``metadata_store`` is passed to ``SummaryParser``.  If a
+    ``HistoryStore`` is provided as ``history``, the results are appended
+    to it each time the file is parsed.
+
+    If an ``Instrumentation`` is provided as ``instrumentation``, each
+    request, each parse and the races and results created are recorded to
+    it.
+
+    """
     DEFAULT_URL = SUMMARY_URL 
 
-    def __init__(self, url=None):
+    def __init__(self, url=None, session=None, incremental=False,
+            metadata_store=None, history=None, instrumentation=None):
         if url is None:
             url = self.DEFAULT_URL
         self._url = url
 
-        self._parser = SummaryParser()
+        if session is None:
+            session = self.create_session()
+        self._session = session
+
+        self._parser = SummaryParser(metadata_store=metadata_store)
+        self.incremental = incremental
+        self._history = history
+        self.instrumentation = instrumentation
+        self.changes = None
+        self._etag = None
+        self._last_modified = None
+        self._body_hash = None
+        self.stats = FetchStats()
+
+    def create_session(self):
+        # requests is imported by the methods that use it, so parsing summary
+        # files doesn't pay for importing it
+        import requests
+        return requests.Session()
 
     def get_url(self):
         return self._url
 
+    def get_request_headers(self):
+        headers = {}
+        if self._etag is not None:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified is not None:
+            headers['If-Modified-Since'] = self._last_modified
+        return headers
+
     def fetch(self):
+        """
+        Fetch the summary file and parse it if it has changed.
+
+        Returns True if the file was parsed, False if the server reported
+        that it was not modified or its body was identical to the last one.
+
+        """
+        import requests
+
         url = self.get_url()
-        r = requests.get(url)
-        self._parser.parse(r.text)
+        start = time.time()
+        try:
+            r = self._session.get(url, headers=self.get_request_headers())
+        except requests.RequestException:
+            self.record_request(url, None, 0, start)
+            raise
+        self.record_request(url, r.status_code, len(r.content), start)
+        if r.status_code != 304:
+            r.raise_for_status()
+        return self.handle_response(r.status_code, r.headers, r.content,
+            r.text)
+
+    def record_request(self, url, status, size, start):
+        """
+        Record a request that started at ``start`` to the instrumentation.
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.record_request('summary', 'GET', url,
+                status, size, time.time() - start)
+
+    def handle_response(self, status_code, headers, content, text):
+        """
+        Update the validators and parse the body of a successful response.
+
+        This is separate from ``fetch()`` so clients that make requests
+        differently can share it.  Returns the same value as ``fetch()``.
+
+        """
+        self.stats.fetches += 1
+        if self.incremental:
+            self.changes = ChangeSet()
+
+        if status_code == 304:
+            self.stats.not_modified += 1
+            return False
+
+        self.stats.bytes += len(content)
+        self._etag = headers.get('ETag')
+        self._last_modified = headers.get('Last-Modified')
+
+        import hashlib
+        body_hash = hashlib.sha1(content).hexdigest()
+        if body_hash == self._body_hash:
+            self.stats.unchanged += 1
+            return False
+
+        start = time.time()
+        if self.incremental:
+            self.changes = self._parser.update(text)
+        else:
+            self._parser.parse(text)
+        parse_time = time.time() - start
+        self.stats.parse_time += parse_time
+        self.stats.parses += 1
+        if self.instrumentation is not None:
+            self.record_parse(content, parse_time)
+        self._body_hash = body_hash
+        if self._history is not None:
+            self._history.append(self.races)
+        return True
+
+    def record_parse(self, content, parse_time):
+        if self.changes is None:
+            races = self.races
+        else:
+            races = self.changes.races_added
+        results = sum(len(race.candidates) for race in races)
+        if self.changes is not None:
+            results += len(self.changes.results_added)
+
+        lines = content.count(b'\n')
+        if not content.endswith(b'\n'):
+            lines += 1
+        self.instrumentation.record_parse('summary', lines, parse_time)
+        self.instrumentation.record_created('summary.Race', len(races))
+        self.instrumentation.record_created('summary.Result', results)
+
+    def poll(self, interval=30, backoff=1, max_interval=None, callback=None,
+            max_polls=None):
+        """
+        Fetch the summary file repeatedly.
+
+        After each fetch that doesn't find new results, or that fails, the
+        wait is multiplied by ``backoff``, up to ``max_interval`` seconds.
+        The wait goes back to ``interval`` as soon as new results are parsed,
+        and ``callback``, if provided, is called with this client.
+
+        Polls forever unless ``max_polls`` is specified.
+
+        """
+        import requests
+
+        if max_interval is None:
+            max_interval = interval
+
+        wait = interval
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            try:
+                changed = self.fetch()
+            except requests.RequestException:
+                self.stats.errors += 1
+                changed = False
+
+            polls += 1
+
+            if changed:
+                wait = interval
+                if callback is not None:
+                    callback(self)
+            else:
+                wait = min(wait * backoff, max_interval)
+
+            if max_polls is None or polls < max_polls:
+                time.sleep(wait)
+
+    def iter_results(self):
+        """
+        Stream the summary file and generate ``(race, result)`` tuples.
+
+        Results are generated as lines arrive, before the download has
+        finished.  This doesn't make a conditional request or change
+        ``races``.
+
+        Because parsing is interleaved with the download, the request's
+        latency is recorded to the instrumentation when the headers arrive,
+        and the parse's duration includes the time spent downloading.
+
+        """
+        import requests
+
+        url = self.get_url()
+        start = time.time()
+        try:
+            r = self._session.get(url, stream=True)
+        except requests.RequestException:
+            self.record_request(url, None, 0, start)
+            raise
+        self.stats.fetches += 1
+        latency = time.time() - start
+        size = self.stats.bytes
+        races = results = 0
+        race = None
+        start = time.time()
+        try:
+            r.raise_for_status()
+            for race_result in self._parser.iter_results(self._iter_lines(r)):
+                results += 1
+                if race_result[0] is not race:
+                    race = race_result[0]
+                    races += 1
+                yield race_result
+        finally:
+            r.close()
+            if self.instrumentation is not None:
+                self.instrumentation.record_request('summary', 'GET', url,
+                    r.status_code, self.stats.bytes - size, latency)
+                self.instrumentation.record_parse('summary', results,
+                    time.time() - start)
+                self.instrumentation.record_created('summary.Race', races)
+                self.instrumentation.record_created('summary.Result',
+                    results)
+
+    def _iter_lines(self, r):
+        for line in r.iter_lines():
+            self.stats.bytes += len(line)
+            yield line
 
     @property
     def races(self):
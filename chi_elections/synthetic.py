@@ -0,0 +1,213 @@
+"""
+Generate synthetic elections of any size.
+
+``SyntheticElection`` renders an election as a fixed-width summary file and
+as the pages of the Board of Elections results site, for benchmarks and for
+testing against a local server.  Votes are derived from the race, candidate,
+ward and precinct, so the same election is generated every time, and the
+summary file, ward pages and precinct pages agree with each other.
+
+"""
+
+# Vote totals wrap at this many votes per precinct
+MAX_PRECINCT_VOTES = 500
+
+SUMMARY_PARTIES = ['DEM', 'REP', 'NON']
+
+
+def results_table(title, column_name, rows, candidates):
+    """
+    Build a results table like those on wdlevel3.asp and pctlevel3.asp.
+
+    ``rows`` is a list of ``(reporting_unit_cell, votes)`` tuples where
+    ``votes`` has one vote count per candidate.
+
+    """
+    header = ''.join('<td><b>{}</b></td><td><b>%</b></td>'.format(c)
+                     for c in candidates)
+    html = [
+        '<html><body><table>',
+        '<tr><td colspan="{}">{}</td></tr>'.format(len(candidates) * 2 + 2,
+            title),
+        '<tr><td>{}</td><td>Votes Cast</td>{}</tr>'.format(column_name,
+            header),
+    ]
+    for cell, votes in rows:
+        total = sum(votes)
+        cells = ''.join('<td>{}</td><td>{:.2f}%</td>'.format(
+            v, 100.0 * v / total if total else 0) for v in votes)
+        html.append('<tr><td>{}</td><td>{}</td>{}</tr>'.format(cell, total,
+            cells))
+    html.append('</table></body></html>')
+    return ''.join(html)
+
+
+def ward_results_html(elec_code, race_number, race_name, candidates, wards,
+        votes):
+    """
+    Build the page returned by a POST to wdlevel3.asp.
+
+    ``votes`` is a function taking a ward and precinct number, or ``None``
+    for the ward total, and returning a list of votes for each candidate.
+
+    """
+    rows = []
+    for ward in wards:
+        link = ('<a href="pctlevel3.asp?elec_code={}&race_number={}'
+                '&Ward={}">{}</a>').format(elec_code, race_number, ward, ward)
+        rows.append((link, votes(ward, None)))
+    rows.append(('Total', [sum(v) for v in zip(*[r[1] for r in rows])]))
+    return results_table(race_name, 'Ward', rows, candidates)
+
+
+def precinct_results_html(race_name, candidates, ward, precincts, votes):
+    """
+    Build the page returned by pctlevel3.asp for a single ward.
+    """
+    rows = [(precinct, votes(ward, precinct)) for precinct in precincts]
+    rows.append(('Total', votes(ward, None)))
+    return results_table(race_name, 'Pct', rows, candidates)
+
+
+def election_html(race_names):
+    """
+    Build the page returned by a GET of wdlevel3.asp, with a select list of
+    races.
+    """
+    options = ''.join('<option value="{}">{}</option>'.format(n, n)
+                      for n in race_names)
+    return ('<html><body><form><select name="D3"><option value=""></option>'
+            '{}</select></form></body></html>').format(options)
+
+
+def summary_line(contest_code, candidate_number, precincts_total, vote_total,
+        precincts_reporting, party=u'', race_name=u'', candidate_name=u'',
+        reporting_unit_name=u'', vote_for=1, numeric_only=False):
+    """
+    Format a line of the summary file, without the line ending.
+
+    If ``numeric_only`` is True, only the numeric columns are included, as
+    in the summary file on election night.
+
+    """
+    line = u"{:04d}{:03d}{:04d}{:07d}{:04d}".format(contest_code,
+        candidate_number, precincts_total, vote_total, precincts_reporting)
+    if numeric_only:
+        return line
+
+    return (line + party[:3].ljust(3) + u' ' * 7 + race_name[:56].ljust(56) +
+            candidate_name[:38].ljust(38) + reporting_unit_name[:25].ljust(25) +
+            u"{:03d}".format(vote_for))
+
+
+class SyntheticElection(object):
+    """
+    An election with ``races`` races of ``candidates`` candidates each,
+    voted on in every one of ``precincts`` precincts in each of ``wards``
+    wards.
+
+    Races are numbered from 1 and have contest codes starting at 10.
+    ``seed`` changes every vote count.
+
+    """
+    FIRST_CONTEST_CODE = 10
+    REPORTING_UNIT_NAME = u'CITY OF CHICAGO'
+
+    def __init__(self, races=10, candidates=5, wards=50, precincts=40,
+            elec_code='25', seed=0):
+        self.elec_code = elec_code
+        self.seed = seed
+        self.wards = list(range(1, wards + 1))
+        self.precincts = list(range(1, precincts + 1))
+        self.race_numbers = list(range(1, races + 1))
+        self.race_names = [u'RACE {}'.format(n) for n in self.race_numbers]
+        self.candidates = [u'CANDIDATE {}'.format(i + 1)
+                           for i in range(candidates)]
+        self._race_totals = {}
+
+    def contest_code(self, race_number):
+        return self.FIRST_CONTEST_CODE + race_number - 1
+
+    def get_race_number(self, race_name):
+        return self.race_numbers[self.race_names.index(race_name)]
+
+    def precinct_votes(self, race_number, ward, precinct):
+        """
+        Return a list of each candidate's votes in a precinct.
+        """
+        base = (self.seed * 7919 + race_number * 104729 + ward * 1009 +
+                precinct * 31)
+        return [(base + i * 8191) % MAX_PRECINCT_VOTES
+                for i in range(len(self.candidates))]
+
+    def votes(self, race_number, ward, precinct=None):
+        """
+        Return a list of each candidate's votes in a precinct, or in the ward
+        if ``precinct`` is None.
+        """
+        if precinct is not None:
+            return self.precinct_votes(race_number, ward, precinct)
+
+        return [sum(v) for v in zip(*[
+            self.precinct_votes(race_number, ward, p)
+            for p in self.precincts])]
+
+    def race_totals(self, race_number):
+        """
+        Return a list of each candidate's votes in every precinct.
+        """
+        try:
+            return self._race_totals[race_number]
+        except KeyError:
+            totals = [sum(v) for v in zip(*[self.votes(race_number, ward)
+                                            for ward in self.wards])]
+            self._race_totals[race_number] = totals
+            return totals
+
+    @property
+    def precincts_total(self):
+        return len(self.wards) * len(self.precincts)
+
+    def summary_lines(self, reporting=1.0, numeric_only=False):
+        """
+        Generate the lines of the summary file, without line endings, when
+        ``reporting`` of the precincts, between 0 and 1, have reported.
+
+        Vote totals are the final totals scaled by ``reporting``.
+
+        """
+        precincts_total = self.precincts_total
+        precincts_reporting = int(round(precincts_total * reporting))
+        for race_number, race_name in zip(self.race_numbers,
+                                          self.race_names):
+            contest_code = self.contest_code(race_number)
+            totals = self.race_totals(race_number)
+            for i, candidate in enumerate(self.candidates):
+                yield summary_line(contest_code, i + 1, precincts_total,
+                    int(totals[i] * reporting), precincts_reporting,
+                    party=SUMMARY_PARTIES[i % len(SUMMARY_PARTIES)],
+                    race_name=race_name, candidate_name=candidate,
+                    reporting_unit_name=self.REPORTING_UNIT_NAME,
+                    numeric_only=numeric_only)
+
+    def summary_text(self, reporting=1.0, numeric_only=False):
+        """
+        Return the summary file, with Windows line endings.
+        """
+        return u''.join(line + u'\r\n' for line in self.summary_lines(
+            reporting=reporting, numeric_only=numeric_only))
+
+    def election_html(self):
+        return election_html(self.race_names)
+
+    def ward_results_html(self, race_name):
+        race_number = self.get_race_number(race_name)
+        return ward_results_html(self.elec_code, race_number, race_name,
+            self.candidates, self.wards,
+            lambda ward, precinct: self.votes(race_number, ward, precinct))
+
+    def precinct_results_html(self, race_number, ward):
+        race_name = self.race_names[self.race_numbers.index(race_number)]
+        return precinct_results_html(race_name, self.candidates, ward,
+            self.precincts,
+            lambda ward, precinct: self.votes(race_number, ward, precinct))
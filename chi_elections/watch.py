@@ -0,0 +1,287 @@
+"""
+Watch the summary file and push changes to subscribers.
+
+A ``SummaryWatcher`` keeps one incremental ``SummaryClient`` polling, so
+consumers can subscribe to it rather than each fetching and parsing the same
+file.  It polls quickly while precincts are reporting and backs off while the
+results are idle.  Whenever the results change, it writes a JSON snapshot of
+every race to a file, replacing the old one atomically, and publishes the
+``ChangeSet`` to a ``ChangeBroadcaster``, which streams it to subscribers as
+server-sent events.
+
+"""
+from collections import OrderedDict
+import json
+import threading
+import time
+
+import requests
+from six.moves import BaseHTTPServer, queue, socketserver
+
+from .files import write_atomic
+from .summary import SummaryClient
+
+
+def serialize_races(races):
+    """
+    Return a list of serialized races, with their candidates' results.
+    """
+    serialized = []
+    for race in races:
+        race_dict = race.serialize()
+        race_dict['candidates'] = [c.serialize() for c in race.candidates]
+        serialized.append(race_dict)
+    return serialized
+
+
+def write_snapshot(path, races):
+    """
+    Write the races to ``path`` as JSON, replacing it atomically.
+    """
+    write_atomic(path, json.dumps(serialize_races(races)))
+
+class ChangeBroadcaster(object):
+    """
+    Fan events out to subscribers.
+
+    Each subscriber gets a queue of ``(id, event, data)`` tuples.  A
+    subscriber that falls more than ``max_queue`` events behind is
+    disconnected rather than holding up the others.
+
+    """
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.last_id = 0
+        self.snapshot = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+            if self.snapshot is not None:
+                q.put((self.last_id, 'snapshot', self.snapshot))
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event, data):
+        with self._lock:
+            self.last_id += 1
+            for q in list(self._subscribers):
+                try:
+                    q.put_nowait((self.last_id, event, data))
+                except queue.Full:
+                    self._subscribers.discard(q)
+                    self._close_queue(q)
+
+    def set_snapshot(self, data):
+        """
+        Set the data sent to new subscribers before any changes.
+        """
+        with self._lock:
+            self.snapshot = data
+
+    def close(self):
+        with self._lock:
+            for q in self._subscribers:
+                self._close_queue(q)
+            self._subscribers = set()
+
+    @classmethod
+    def _close_queue(cls, q):
+        # Make room for the end of stream marker
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        q.put_nowait(None)
+
+
+class EventStreamHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Serve ``/events`` as a stream of server-sent events and ``/snapshot``
+    as the latest JSON snapshot.
+    """
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/events':
+            self.send_events()
+        elif path == '/snapshot':
+            self.send_snapshot()
+        else:
+            self.send_error(404)
+
+    def send_snapshot(self):
+        snapshot = self.server.broadcaster.snapshot
+        content = json.dumps(snapshot).encode('utf-8')
+        self.send_response(200 if snapshot is not None else 503)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_events(self):
+        broadcaster = self.server.broadcaster
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.flush()
+
+        q = broadcaster.subscribe()
+        try:
+            while True:
+                try:
+                    item = q.get(timeout=self.server.keepalive)
+                except queue.Empty:
+                    self.wfile.write(b': keepalive\n\n')
+                    self.wfile.flush()
+                    continue
+
+                if item is None:
+                    break
+
+                event_id, event, data = item
+                self.wfile.write('id: {}\nevent: {}\ndata: {}\n\n'.format(
+                    event_id, event, json.dumps(data)).encode('utf-8'))
+                self.wfile.flush()
+        except (IOError, OSError):
+            # The subscriber disconnected
+            pass
+        finally:
+            broadcaster.unsubscribe(q)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EventServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Serve a ``ChangeBroadcaster``'s events over HTTP in a background thread.
+
+    A comment is sent to idle subscribers every ``keepalive`` seconds so
+    proxies don't close the connection.
+
+    """
+    daemon_threads = True
+
+    def __init__(self, broadcaster, host='127.0.0.1', port=0, keepalive=15):
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port),
+            EventStreamHandler)
+        self.broadcaster = broadcaster
+        self.keepalive = keepalive
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+            kwargs={'poll_interval': 0.1})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.broadcaster.close()
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+class SummaryWatcher(object):
+    """
+    Poll the summary file and publish what changes.
+
+    The wait between polls is ``interval`` seconds after a poll finds that
+    precincts have reported.  After a poll that finds nothing new, or that
+    fails, the wait is multiplied by ``backoff``, up to ``max_interval``.
+    Polls that only find changed vote totals leave the wait as it is.
+
+    When the results change, they're written to ``snapshot_path``, if
+    specified, and the changes are published to ``broadcaster`` as a
+    'changes' event.
+
+    """
+    def __init__(self, client=None, interval=5, max_interval=60, backoff=2,
+            snapshot_path=None, broadcaster=None, sleep=time.sleep):
+        if client is None:
+            client = SummaryClient(incremental=True)
+        elif not client.incremental:
+            raise ValueError("SummaryWatcher requires an incremental client")
+        self.client = client
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.snapshot_path = snapshot_path
+        self.broadcaster = broadcaster
+        self.wait = interval
+        self.polls = 0
+        self._sleep = sleep
+
+    def next_wait(self, changes):
+        if changes is not None and (changes.precincts_changed or
+                changes.races_added):
+            return self.interval
+        if changes:
+            return self.wait
+        return min(self.wait * self.backoff, self.max_interval)
+
+    def poll(self):
+        """
+        Fetch the summary file once and publish any changes.
+
+        Returns the ``ChangeSet``, which is empty if nothing changed, or
+        None if the request failed.
+
+        """
+        try:
+            self.client.fetch()
+        except requests.RequestException:
+            self.client.stats.errors += 1
+            changes = None
+        else:
+            changes = self.client.changes
+
+        self.polls += 1
+        if changes:
+            self.publish(changes)
+        self.wait = self.next_wait(changes)
+        return changes
+
+    def publish(self, changes):
+        races = self.client.races
+        if self.snapshot_path is not None:
+            write_snapshot(self.snapshot_path, races)
+
+        if self.broadcaster is not None:
+            self.broadcaster.set_snapshot(serialize_races(races))
+            data = changes.serialize()
+            data['polled_at'] = time.time()
+            self.broadcaster.publish('changes', data)
+
+    def run(self, max_polls=None):
+        """
+        Poll until interrupted, or until ``max_polls`` polls.
+        """
+        while max_polls is None or self.polls < max_polls:
+            self.poll()
+            if max_polls is None or self.polls < max_polls:
+                self._sleep(self.wait)
+
+    def serialize(self):
+        return OrderedDict((
+            ('polls', self.polls),
+            ('wait', self.wait),
+            ('fetch', self.client.stats.serialize()),
+        ))
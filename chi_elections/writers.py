@@ -0,0 +1,149 @@
+"""
+Write rows of results in different formats.
+
+Each writer is created with a file object and a list of ``(name, type)``
+fields, where type is ``int`` or ``str``.  Rows are tuples of values in
+the order of the fields.  Writers of typed formats convert each value to
+its field's type, so the output has the same types whatever produced the
+rows.  ``write()`` consumes an iterable of rows in batches, so rows can be
+written as they're scraped without holding all of them in memory.
+
+The Arrow and Parquet writers require ``pyarrow``.
+
+"""
+from itertools import islice
+import json
+import sys
+
+from six import text_type
+
+if sys.version_info < (3,):
+    from backports import csv
+else:
+    import csv
+
+
+def iter_batches(rows, batch_size):
+    """
+    Generate lists of up to ``batch_size`` rows from an iterable.
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def coerce(value, type):
+    """
+    Convert a value to a field's type, with None for missing values.
+    """
+    if value is None or value == '':
+        return None
+    if type is int:
+        return int(value)
+    return text_type(value)
+
+
+class CSVWriter(object):
+    binary = False
+    batch_size = 1000
+
+    def __init__(self, f, fields):
+        self._writer = csv.writer(f)
+        self._writer.writerow([name for name, type in fields])
+
+    def write(self, rows):
+        for batch in iter_batches(rows, self.batch_size):
+            self._writer.writerows(batch)
+
+    def close(self):
+        pass
+
+
+class NDJSONWriter(object):
+    """
+    Write a JSON object per line.
+    """
+    binary = False
+    batch_size = 1000
+
+    def __init__(self, f, fields):
+        self._f = f
+        self._fields = fields
+
+    def write(self, rows):
+        fields = self._fields
+        for batch in iter_batches(rows, self.batch_size):
+            self._f.write(''.join(
+                json.dumps(dict((name, coerce(value, type))
+                                for (name, type), value in zip(fields, row)))
+                + '\n'
+                for row in batch))
+
+    def close(self):
+        self._f.flush()
+
+
+class ArrowWriter(object):
+    """
+    Write an Arrow IPC file (Feather version 2), one record batch per
+    ``batch_size`` rows.
+    """
+    binary = True
+    batch_size = 64 * 1024
+
+    def __init__(self, f, fields):
+        import pyarrow
+
+        self._pyarrow = pyarrow
+        self._fields = fields
+        self.schema = pyarrow.schema([
+            (name, pyarrow.int64() if type is int else pyarrow.string())
+            for name, type in fields
+        ])
+        self._sink = pyarrow.PythonFile(f, mode='w')
+        self._writer = self.open_writer(self._sink)
+
+    def open_writer(self, sink):
+        return self._pyarrow.ipc.new_file(sink, self.schema)
+
+    def to_record_batch(self, batch):
+        columns = []
+        for i, (name, type) in enumerate(self._fields):
+            values = [coerce(row[i], type) for row in batch]
+            columns.append(self._pyarrow.array(values,
+                type=self.schema.field(name).type))
+        return self._pyarrow.RecordBatch.from_arrays(columns,
+            schema=self.schema)
+
+    def write(self, rows):
+        for batch in iter_batches(rows, self.batch_size):
+            self._writer.write(self.to_record_batch(batch))
+
+    def close(self):
+        self._writer.close()
+        self._sink.flush()
+
+
+class ParquetWriter(ArrowWriter):
+    """
+    Write a Parquet file, one row group per ``batch_size`` rows.
+    """
+    def open_writer(self, sink):
+        import pyarrow.parquet
+
+        return pyarrow.parquet.ParquetWriter(sink, self.schema)
+
+    def write(self, rows):
+        for batch in iter_batches(rows, self.batch_size):
+            self._writer.write_batch(self.to_record_batch(batch))
+
+
+WRITERS = {
+    'csv': CSVWriter,
+    'ndjson': NDJSONWriter,
+    'arrow': ArrowWriter,
+    'parquet': ParquetWriter,
+}
@@ -32,8 +32,14 @@ setup(
         'lxml',
         'six',
         'Click',
-        'backports.csv'
+        'backports.csv',
+        'futures; python_version < "3"',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+        'arrow': ['pyarrow'],
+        'async': ['aiohttp; python_version >= "3.6"'],
+    },
     entry_points={
         'console_scripts': (
             'chi_elections = chi_elections.cli:main'
@@ -0,0 +1,69 @@
+"""
+Serve the pages of a small election in the format of the Board of Elections
+results site, for tests that need a server to scrape.
+"""
+from unittest import TestCase
+
+from chi_elections.precincts import Election, PrecinctClient
+from chi_elections.synthetic import (election_html, precinct_results_html,
+        ward_results_html)
+
+from stub_server import StubServer
+
+ELEC_CODE = '5'
+RACE_NAMES = ['Mayor', 'Clerk']
+RACE_NUMBERS = [10, 11]
+CANDIDATES = ['RAHM EMANUEL', "JESUS ''CHUY'' GARCIA"]
+WARDS = list(range(1, 11))
+PRECINCTS = list(range(1, 4))
+
+
+def votes(ward, precinct):
+    if precinct is None:
+        return [sum(v) for v in zip(*[votes(ward, p) for p in PRECINCTS])]
+
+    return [ward * 100 + precinct, ward + precinct]
+
+
+class BoardServerTestCase(TestCase):
+    """
+    Run a stub server that serves the pages of a small election.
+    """
+    latency = 0
+
+    def setUp(self):
+        self.server = StubServer(routes={
+            ('GET', '/en/wdlevel3.asp'): self.election_route,
+            ('POST', '/en/wdlevel3.asp'): self.ward_results_route,
+            ('GET', '/en/pctlevel3.asp'): self.precinct_results_route,
+        }, latency=self.latency).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def election_route(self, request):
+        return 200, {'Content-Type': 'text/html'}, election_html(RACE_NAMES)
+
+    def ward_results_route(self, request):
+        race_name = request['form']['D3'][0]
+        race_number = RACE_NUMBERS[RACE_NAMES.index(race_name)]
+        return 200, {'Content-Type': 'text/html'}, ward_results_html(
+            ELEC_CODE, race_number, race_name, CANDIDATES, WARDS, votes)
+
+    def precinct_results_route(self, request):
+        race_number = int(request['query']['race_number'][0])
+        race_name = RACE_NAMES[RACE_NUMBERS.index(race_number)]
+        ward = int(request['query']['Ward'][0])
+        return 200, {'Content-Type': 'text/html'}, precinct_results_html(
+            race_name, CANDIDATES, ward, PRECINCTS, votes)
+
+    def get_client(self, **kwargs):
+        return PrecinctClient(
+            election_url=self.server.url('/en/wdlevel3.asp'),
+            precinct_url=self.server.url('/en/pctlevel3.asp'),
+            **kwargs)
+
+    def get_race(self, **kwargs):
+        election = Election(elec_code=ELEC_CODE,
+            client=self.get_client(**kwargs))
+        return election.races[0]
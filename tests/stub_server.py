@@ -0,0 +1,113 @@
+"""
+A small HTTP server that runs in a background thread, for tests that need a
+real socket rather than the mocked adapters provided by ``responses``.
+"""
+import socket
+import sys
+import threading
+import time
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qs, urlparse
+
+
+class StubRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _handle(self, method):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        parsed_url = urlparse(self.path)
+        request = {
+            'method': method,
+            'path': parsed_url.path,
+            'query': parse_qs(parsed_url.query),
+            'form': parse_qs(body.decode('utf-8')),
+            'headers': self.headers,
+        }
+        with server.lock:
+            server.requests.append(request)
+            server.concurrent += 1
+            server.max_concurrent = max(server.max_concurrent,
+                server.concurrent)
+
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+        finally:
+            with server.lock:
+                server.concurrent -= 1
+
+        try:
+            route = server.routes[(method, parsed_url.path)]
+        except KeyError:
+            status, headers, content = 404, {}, b''
+        else:
+            status, headers, content = route(request)
+
+        if not isinstance(content, bytes):
+            content = content.encode('utf-8')
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Serve canned responses from ``routes``, a dictionary mapping
+    ``(method, path)`` tuples to callables.
+
+    Each callable receives a dictionary describing the request and returns a
+    ``(status, headers, body)`` tuple.  Every request is recorded in
+    ``requests``, and each response is delayed by ``latency`` seconds.  The
+    most requests handled at once is recorded in ``max_concurrent``.
+
+    """
+    daemon_threads = True
+
+    def __init__(self, routes=None, latency=0):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+            StubRequestHandler)
+        self.routes = routes if routes is not None else {}
+        self.latency = latency
+        self.requests = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close their connection before the response
+        if not isinstance(sys.exc_info()[1], socket.error):
+            BaseHTTPServer.HTTPServer.handle_error(self, request,
+                client_address)
+
+    def url(self, path):
+        return 'http://127.0.0.1:{}{}'.format(self.server_address[1], path)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+            kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
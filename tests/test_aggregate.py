@@ -0,0 +1,96 @@
+from chi_elections.aggregate import (Discrepancy, group_sums,
+        reconcile_ward_totals, totals_by_race, totals_by_ward, vote_shares)
+
+from chi_elections.transforms import replace_single_quotes
+
+from board_pages import (BoardServerTestCase, CANDIDATES, PRECINCTS, WARDS,
+        votes)
+
+CANDIDATE_NAMES = [replace_single_quotes(c) for c in CANDIDATES]
+
+
+class AggregateTestCase(BoardServerTestCase):
+    use_numpy = False
+
+    def setUp(self):
+        super(AggregateTestCase, self).setUp()
+        self.race = self.get_race()
+        self.table = self.race.fetch_results(columnar=True)
+
+    def expected_total(self, candidate_index, wards=WARDS):
+        return sum(votes(w, p)[candidate_index]
+                   for w in wards for p in PRECINCTS)
+
+    def test_totals_by_race(self):
+        totals = totals_by_race(self.table, use_numpy=self.use_numpy)
+        actual = dict((c.name, v) for (race, c), v in totals.items())
+        self.assertEqual(actual[CANDIDATE_NAMES[0]], self.expected_total(0))
+        self.assertEqual(actual[CANDIDATE_NAMES[1]], self.expected_total(1))
+        self.assertEqual(actual['Votes Cast'],
+            self.expected_total(0) + self.expected_total(1))
+        self.assertIs(list(totals)[0][0], self.race)
+
+    def test_totals_by_ward(self):
+        totals = totals_by_ward(self.table, use_numpy=self.use_numpy,
+            candidates_only=True)
+        self.assertEqual(len(totals), len(WARDS) * len(CANDIDATES))
+        key = next(k for k in totals
+                   if k[1] == 3 and k[2].name == CANDIDATE_NAMES[1])
+        self.assertEqual(totals[key], self.expected_total(1, wards=[3]))
+
+    def test_group_by_precinct(self):
+        totals = group_sums(self.table, by=('ward', 'precinct'),
+            candidates_only=True, use_numpy=self.use_numpy)
+        self.assertEqual(list(totals)[:2], [(1, 1), (1, 2)])
+        self.assertEqual(totals[(2, 3)], sum(votes(2, 3)))
+
+    def test_group_by_ward_totals(self):
+        precinct_level = group_sums(self.table, by=('ward',),
+            use_numpy=self.use_numpy)
+        ward_level = group_sums(self.table, by=('ward',), level='ward',
+            use_numpy=self.use_numpy)
+        self.assertEqual(precinct_level, ward_level)
+
+    def test_invalid_column(self):
+        self.assertRaises(ValueError, group_sums, self.table, by=('votes',))
+
+    def test_vote_shares(self):
+        shares = vote_shares(self.table, by=('race_id', 'ward'),
+            use_numpy=self.use_numpy)
+        self.assertEqual(len(shares), len(WARDS) * len(CANDIDATES))
+        ward_votes = [self.expected_total(i, wards=[1])
+                      for i in range(len(CANDIDATES))]
+        self.assertAlmostEqual(shares[(self.race, 1, self.table.candidates[1])],
+            float(ward_votes[0]) / sum(ward_votes))
+
+    def test_reconcile_ward_totals(self):
+        self.assertEqual(
+            reconcile_ward_totals(self.table, use_numpy=self.use_numpy), [])
+
+        # Change a precinct result
+        self.table.votes[1] += 5
+        discrepancy = Discrepancy(self.race, self.table.candidates[1], 1,
+            votes(1, None)[0] + 5, votes(1, None)[0])
+        self.assertEqual(
+            reconcile_ward_totals(self.table, use_numpy=self.use_numpy),
+            [discrepancy])
+
+    def test_results(self):
+        results = self.get_race().fetch_results()
+        self.assertEqual(reconcile_ward_totals(results), [])
+        self.assertEqual(
+            [(c.name, v) for (race, c), v in totals_by_race(results).items()],
+            [(c.name, v) for (race, c), v in totals_by_race(
+                self.table).items()])
+
+
+class NumpyAggregateTestCase(AggregateTestCase):
+    use_numpy = True
+
+    def setUp(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        super(NumpyAggregateTestCase, self).setUp()
@@ -0,0 +1,215 @@
+# -*- coding=utf-8 -*-
+import asyncio
+import os.path
+from unittest import TestCase
+
+from board_pages import (BoardServerTestCase, CANDIDATES, ELEC_CODE,
+        PRECINCTS, RACE_NAMES, RACE_NUMBERS, WARDS, votes)
+from stub_server import StubServer
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'data')
+SUMMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results', 'ap',
+    'summary.txt')
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsyncTestCase(TestCase):
+    def setUp(self):
+        try:
+            from chi_elections import aio
+        except ImportError:
+            self.skipTest("aiohttp is not installed")
+        self.aio = aio
+        super(AsyncTestCase, self).setUp()
+
+
+class AsyncSummaryClientTestCase(AsyncTestCase):
+    def setUp(self):
+        super(AsyncSummaryClientTestCase, self).setUp()
+        with open(SUMMARY_TEST_FILENAME, 'rb') as f:
+            self.body = f.read()
+        self.server = StubServer(routes={
+            ('GET', '/ap/summary.txt'): self.summary_route,
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def summary_route(self, request):
+        if request['headers'].get('If-None-Match') == '"v1"':
+            return 304, {}, b''
+        return 200, {'Content-Type': 'text/plain', 'ETag': '"v1"'}, self.body
+
+    def test_fetch(self):
+        async def fetch():
+            async with self.aio.AsyncSummaryClient(
+                    url=self.server.url('/ap/summary.txt')) as client:
+                return client, await client.fetch(), await client.fetch()
+
+        client, first, second = run(fetch())
+        self.assertTrue(first)
+        self.assertFalse(second)
+        self.assertEqual(len(client.races), 98)
+        self.assertEqual(client.stats.not_modified, 1)
+        mayor = next(r for r in client.races if r.name == "Mayor")
+        self.assertEqual(len(mayor.candidates), 5)
+
+    def test_poll(self):
+        calls = []
+
+        async def callback(client):
+            calls.append(client)
+
+        async def poll():
+            async with self.aio.AsyncSummaryClient(
+                    url=self.server.url('/ap/summary.txt')) as client:
+                await client.poll(interval=0, max_polls=3, callback=callback)
+                return client
+
+        client = run(poll())
+        self.assertEqual(calls, [client])
+        self.assertEqual(client.stats.fetches, 3)
+
+    def test_iter_results(self):
+        from chi_elections.summary import SummaryParser
+
+        async def iter_results():
+            async with self.aio.AsyncSummaryClient(
+                    url=self.server.url('/ap/summary.txt')) as client:
+                return client, [race_result async for race_result
+                                in client.iter_results()]
+
+        client, race_results = run(iter_results())
+        expected = list(SummaryParser().iter_results(
+            self.body.decode('utf-8').splitlines()))
+        self.assertEqual(len(race_results), len(expected))
+        self.assertEqual(
+            [(race.contest_code, race.name, result.full_name,
+              result.vote_total) for race, result in race_results],
+            [(race.contest_code, race.name, result.full_name,
+              result.vote_total) for race, result in expected])
+        self.assertEqual(len(set(race for race, result in race_results)), 98)
+        self.assertEqual(client.stats.bytes, len(self.body))
+        self.assertEqual(client.races, [])
+
+
+class AsyncPrecinctClientTestCase(AsyncTestCase, BoardServerTestCase):
+    latency = 0.05
+
+    def get_async_client(self, **kwargs):
+        return self.aio.AsyncPrecinctClient(
+            election_url=self.server.url('/en/wdlevel3.asp'),
+            precinct_url=self.server.url('/en/pctlevel3.asp'),
+            **kwargs)
+
+    def test_fetch_results(self):
+        async def fetch():
+            async with self.get_async_client(max_workers=10) as client:
+                election = await client.fetch_election(ELEC_CODE)
+                race = election.races[0]
+                return race, await client.fetch_results(race)
+
+        race, results = run(fetch())
+        self.assertEqual(race.name, RACE_NAMES[0])
+        self.assertEqual(race.number, RACE_NUMBERS[0])
+        # Votes Cast, the candidates and a total row for each ward
+        self.assertEqual(len(results),
+            len(WARDS) * (len(PRECINCTS) + 1) * (len(CANDIDATES) + 1))
+        self.assertIs(race.results, results)
+        self.assertEqual([r.ward_number for r in results],
+            sorted(r.ward_number for r in results))
+
+        result = next(r for r in results if r.ward_number == 3
+                      and r.precinct_number == '2'
+                      and r.candidate.name == "RAHM EMANUEL")
+        self.assertEqual(result.votes, votes(3, 2)[0])
+
+    def test_concurrency_limit(self):
+        async def fetch():
+            async with self.get_async_client(max_workers=2) as client:
+                election = await client.fetch_election(ELEC_CODE)
+                return await client.fetch_results(election.races[0])
+
+        run(fetch())
+        # 1 election page, 1 ward page and 10 precinct pages
+        self.assertEqual(len(self.server.requests), 12)
+        self.assertLessEqual(self.server.max_concurrent, 2)
+
+    def test_matches_sync_client(self):
+        async def fetch():
+            async with self.get_async_client(max_workers=4,
+                    columnar=True) as client:
+                election = await client.fetch_election(ELEC_CODE)
+                return await client.fetch_results(election.races[1])
+
+        table = run(fetch())
+        expected = self.get_race(columnar=True).election.races[1].results
+        self.assertEqual(list(table.votes), list(expected.votes))
+
+    def test_retries(self):
+        failures = []
+        precinct_results_route = self.precinct_results_route
+
+        def flaky_route(request):
+            if len(failures) < 3:
+                failures.append(request)
+                return 500, {}, ''
+            return precinct_results_route(request)
+
+        self.server.routes[('GET', '/en/pctlevel3.asp')] = flaky_route
+
+        async def fetch():
+            async with self.get_async_client(max_workers=4, retries=3,
+                    retry_wait=0) as client:
+                election = await client.fetch_election(ELEC_CODE)
+                return await client.fetch_results(election.races[0])
+
+        results = run(fetch())
+        self.assertEqual(len(failures), 3)
+        self.assertEqual(len(set(r.ward_number for r in results)),
+            len(WARDS))
+
+    def test_not_retried(self):
+        import aiohttp
+        missing = []
+
+        def missing_route(request):
+            missing.append(request)
+            return 404, {}, ''
+
+        self.server.routes[('GET', '/en/pctlevel3.asp')] = missing_route
+
+        async def fetch():
+            async with self.get_async_client(max_workers=4, retries=3,
+                    retry_wait=0) as client:
+                election = await client.fetch_election(ELEC_CODE)
+                await client.fetch_wards(election.races[0])
+                return await client.fetch_precinct_result_dicts(ELEC_CODE,
+                    election.races[0].number, 1)
+
+        with self.assertRaises(aiohttp.ClientResponseError):
+            run(fetch())
+        self.assertEqual(len(missing), 1)
+
+    def test_timeout(self):
+        async def fetch():
+            async with self.get_async_client(timeout=0.01, retries=2,
+                    retry_wait=0) as client:
+                return await client.fetch_election(ELEC_CODE)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            run(fetch())
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_concurrency_unsupported(self):
+        from chi_elections.precincts import AdaptiveConcurrency
+        with self.assertRaises(ValueError):
+            self.get_async_client(concurrency=AdaptiveConcurrency())
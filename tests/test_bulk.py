@@ -0,0 +1,154 @@
+# -*- coding=utf-8 -*-
+import csv
+import io
+import math
+import os.path
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from chi_elections.bulk import (TOTAL, bulk_parse_precincts,
+        bulk_parse_summary, parse_precinct_file, parse_summary_file)
+from chi_elections.cache import ResponseCache
+from chi_elections.cli import main
+from chi_elections.precincts import PrecinctParser
+from chi_elections.summary import ResultParser
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'data')
+SUMMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results', 'ap',
+    'summary.txt')
+SUMMARY_2016_PRIMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results',
+    'ap', 'summary__2016_primary.txt')
+PRECINCT_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'precinct__unicode.html')
+
+
+def expected_summary_rows(filename):
+    parser = ResultParser()
+    rows = []
+    with io.open(filename, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            attrs = parser.parse_line(line)
+            rows.append(tuple(attrs[name] for name in (
+                'contest_code', 'race_name', 'precincts_total',
+                'precincts_reporting', 'vote_for', 'candidate_number',
+                'candidate_name', 'party', 'vote_total')))
+    return rows
+
+
+class ParseFileTestCase(TestCase):
+    def test_parse_summary_file(self):
+        batch = parse_summary_file(SUMMARY_2016_PRIMARY_TEST_FILENAME)
+        self.assertEqual(batch.path, SUMMARY_2016_PRIMARY_TEST_FILENAME)
+        self.assertEqual(len(batch), 907)
+        self.assertEqual(list(batch.rows()),
+            expected_summary_rows(SUMMARY_2016_PRIMARY_TEST_FILENAME))
+
+        unpickled = pickle.loads(pickle.dumps(batch, 2))
+        self.assertEqual(list(unpickled.rows()), list(batch.rows()))
+
+    def test_parse_precinct_file(self):
+        # The test page was saved as UTF-8, although it declares
+        # windows-1252
+        batch = parse_precinct_file(PRECINCT_TEST_FILENAME, encoding='utf-8')
+        with io.open(PRECINCT_TEST_FILENAME, encoding='utf-8') as f:
+            expected = PrecinctParser().parse(f.read())
+        self.assertEqual(len(batch), len(expected))
+        self.assertEqual(list(batch.rows()), [
+            (None if rd['reporting_unit_id'] == 'Total'
+             else int(rd['reporting_unit_id']), rd['candidate'], rd['votes'])
+            for rd in expected])
+        self.assertLess(len(batch.candidates), len(batch))
+
+        votes_cast = batch.candidates.index("Votes Cast")
+        self.assertTrue(math.isnan(batch.percent[
+            list(batch.candidate_id).index(votes_cast)]))
+        self.assertIn(TOTAL, batch.reporting_unit)
+
+    def test_parse_windows_1252_page(self):
+        with io.open(PRECINCT_TEST_FILENAME, encoding='utf-8') as f:
+            html_string = f.read().replace('Shana East', u'JOSÉ PEÑA')
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'pctlevel3.html')
+            with io.open(path, 'wb') as f:
+                f.write(html_string.encode('windows-1252'))
+            batch = parse_precinct_file(path)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        self.assertIn(u'JOSÉ PEÑA (Sanders)', batch.candidates)
+        self.assertIn(u'Álvaro R. Obregón (Sanders)', batch.candidates)
+        self.assertEqual(list(batch.rows()), [
+            (None if rd['reporting_unit_id'] == 'Total'
+             else int(rd['reporting_unit_id']), rd['candidate'], rd['votes'])
+            for rd in PrecinctParser().parse(html_string)])
+
+    def test_parse_cached_page(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            cache = ResponseCache(tmpdir)
+            with io.open(PRECINCT_TEST_FILENAME, encoding='utf-8') as f:
+                cache.set('GET', 'http://example.com/pctlevel3.asp', None,
+                    f.read())
+            path = cache.get_path(cache.get_key('GET',
+                'http://example.com/pctlevel3.asp'))
+            self.assertTrue(ResponseCache.is_cache_path(path))
+            self.assertEqual(list(parse_precinct_file(path).rows()),
+                list(parse_precinct_file(PRECINCT_TEST_FILENAME,
+                                         encoding='utf-8').rows()))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class BulkParseTestCase(TestCase):
+    def test_order(self):
+        paths = [SUMMARY_TEST_FILENAME, SUMMARY_2016_PRIMARY_TEST_FILENAME] * 3
+        for processes in (1, 2):
+            batches = list(bulk_parse_summary(paths, processes=processes))
+            self.assertEqual([b.path for b in batches], paths)
+            self.assertEqual(list(batches[3].rows()),
+                expected_summary_rows(SUMMARY_2016_PRIMARY_TEST_FILENAME))
+
+    def test_precincts(self):
+        paths = [PRECINCT_TEST_FILENAME] * 3
+        batches = list(bulk_parse_precincts(paths, encoding='utf-8',
+            processes=2))
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(list(batches[2].rows()),
+            list(parse_precinct_file(PRECINCT_TEST_FILENAME,
+                                     encoding='utf-8').rows()))
+
+
+class BulkCommandTestCase(TestCase):
+    def test_bulk_summary(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'summary.csv')
+            result = CliRunner().invoke(main, ['bulk', 'summary',
+                SUMMARY_TEST_FILENAME, SUMMARY_2016_PRIMARY_TEST_FILENAME,
+                '--processes', '2', '--output', path])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with io.open(path, encoding='utf-8', newline='') as f:
+                rows = list(csv.DictReader(f))
+        finally:
+            shutil.rmtree(tmpdir)
+
+        expected = expected_summary_rows(SUMMARY_TEST_FILENAME)
+        self.assertEqual(len(rows), len(expected) + 907)
+        self.assertEqual(rows[0]['file'], SUMMARY_TEST_FILENAME)
+        self.assertEqual(rows[-1]['file'], SUMMARY_2016_PRIMARY_TEST_FILENAME)
+
+    def test_bulk_precincts(self):
+        result = CliRunner().invoke(main, ['bulk', 'precincts',
+            PRECINCT_TEST_FILENAME, '--encoding', 'utf-8', '--processes',
+            '1', '--format', 'ndjson'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(len(result.output.splitlines()),
+            len(parse_precinct_file(PRECINCT_TEST_FILENAME,
+                                    encoding='utf-8')))
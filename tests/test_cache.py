@@ -0,0 +1,115 @@
+# -*- coding=utf-8 -*-
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from chi_elections.cache import CacheMiss, ResponseCache
+
+from board_pages import BoardServerTestCase, WARDS
+
+URL = 'http://www.chicagoelections.com/en/wdlevel3.asp?elec_code=5'
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_get_set(self):
+        cache = ResponseCache(self.path)
+        self.assertIsNone(cache.get('GET', URL))
+        cache.set('GET', URL, None, u'<html>Álvaro</html>')
+        self.assertEqual(cache.get('GET', URL), u'<html>Álvaro</html>')
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+        # Still there for a new cache in the same directory
+        cache = ResponseCache(self.path)
+        self.assertEqual(cache.get('GET', URL), u'<html>Álvaro</html>')
+
+    def test_uncompressed(self):
+        cache = ResponseCache(self.path, compress=False)
+        cache.set('GET', URL, None, u'<html></html>')
+        self.assertEqual(cache.get('GET', URL), u'<html></html>')
+        self.assertEqual(cache.size, len(u'<html></html>'))
+
+    def test_key(self):
+        self.assertEqual(
+            ResponseCache.get_key('POST', URL, {'D3': 'Mayor', 'flag': 1}),
+            ResponseCache.get_key('post', URL, {'flag': 1, 'D3': 'Mayor'}))
+        self.assertNotEqual(
+            ResponseCache.get_key('POST', URL, {'D3': 'Mayor'}),
+            ResponseCache.get_key('POST', URL, {'D3': 'Clerk'}))
+        self.assertNotEqual(ResponseCache.get_key('POST', URL),
+            ResponseCache.get_key('GET', URL))
+
+    def test_ttl(self):
+        cache = ResponseCache(self.path, ttl=60)
+        cache.set('GET', URL, None, u'<html></html>')
+        self.assertIsNotNone(cache.get('GET', URL))
+        path = cache.get_path(cache.get_key('GET', URL))
+        old = time.time() - 120
+        os.utime(path, (old, old))
+        self.assertIsNone(cache.get('GET', URL))
+
+    def test_max_size(self):
+        cache = ResponseCache(self.path, max_size=2500, compress=False)
+        for i in range(5):
+            url = URL + '&race={}'.format(i)
+            cache.set('GET', url, None, u'x' * 1000)
+            path = cache.get_path(cache.get_key('GET', url))
+            os.utime(path, (i, i))
+
+        self.assertLessEqual(cache.size, 2500 * cache.LOW_WATER_MARK)
+        self.assertIsNone(cache.get('GET', URL + '&race=0'))
+        self.assertIsNotNone(cache.get('GET', URL + '&race=4'))
+
+    def test_max_size_expired(self):
+        cache = ResponseCache(self.path, ttl=60, max_size=3500,
+            compress=False)
+        now = time.time()
+        for i, age in enumerate([130, 120, 0, 0]):
+            url = URL + '&race={}'.format(i)
+            cache.set('GET', url, None, u'x' * 1000)
+            path = cache.get_path(cache.get_key('GET', url))
+            os.utime(path, (now - age, now - age))
+
+        # Removing one expired response is enough, but both are removed
+        self.assertEqual(cache.size, 2000)
+        self.assertEqual(len(list(cache._iter_paths())), 2)
+        self.assertIsNotNone(cache.get('GET', URL + '&race=2'))
+
+
+class PrecinctClientCacheTestCase(BoardServerTestCase):
+    def setUp(self):
+        super(PrecinctClientCacheTestCase, self).setUp()
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(PrecinctClientCacheTestCase, self).tearDown()
+        shutil.rmtree(self.path)
+
+    def serialize(self, results):
+        return [(r.ward_number, r.precinct_number, r.candidate.name, r.votes)
+                for r in results]
+
+    def test_replay(self):
+        race = self.get_race(cache=ResponseCache(self.path))
+        results = self.serialize(race.results)
+        requests = len(self.server.requests)
+        self.assertEqual(requests, 2 + len(WARDS))
+
+        cache = ResponseCache(self.path, offline=True)
+        race = self.get_race(cache=cache)
+        self.assertEqual(self.serialize(race.results), results)
+        self.assertEqual(len(self.server.requests), requests)
+        self.assertEqual(cache.hits, requests)
+
+    def test_offline_miss(self):
+        client = self.get_client(cache=ResponseCache(self.path, offline=True))
+        self.assertRaises(CacheMiss, client.fetch_election_html, '5')
+        self.assertEqual(self.server.requests, [])
@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import os.path
+import shutil
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from chi_elections.cli import (SUMMARY_FIELDNAMES, main, precinct_rows,
+        summary_result_rows)
+from chi_elections.summary import SummaryParser
+
+from board_pages import BoardServerTestCase
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'data')
+SUMMARY_2016_PRIMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results',
+    'ap', 'summary__2016_primary.txt')
+
+
+class SummaryCommandTestCase(TestCase):
+    def test_summary_file(self):
+        result = CliRunner().invoke(main,
+            ['summary', '--file', SUMMARY_2016_PRIMARY_TEST_FILENAME])
+        self.assertEqual(result.exit_code, 0)
+        rows = list(csv.DictReader(io.StringIO(result.output)))
+        self.assertEqual(len(rows), 907)
+        self.assertEqual(list(rows[0]), SUMMARY_FIELDNAMES)
+
+        # The same as the serialized models
+        parser = SummaryParser()
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME,
+                encoding='utf-8') as f:
+            parser.parse(f.read())
+        race = parser.races[5]
+        expected = dict(race.serialize(), **race.candidates[0].serialize())
+        row = next(r for r in rows
+                   if r['contest_code'] == str(race.contest_code))
+        self.assertEqual(row, dict((k, '' if v is None else str(v))
+                                   for k, v in expected.items()))
+
+    def test_summary_ndjson(self):
+        result = CliRunner().invoke(main,
+            ['summary', '--file', SUMMARY_2016_PRIMARY_TEST_FILENAME,
+             '--format', 'ndjson'])
+        self.assertEqual(result.exit_code, 0)
+        rows = [json.loads(l) for l in result.output.splitlines()]
+        self.assertEqual(len(rows), 907)
+        self.assertEqual(list(rows[5]), SUMMARY_FIELDNAMES)
+        self.assertIsInstance(rows[5]['vote_total'], int)
+
+    def test_summary_stdin(self):
+        with open(SUMMARY_2016_PRIMARY_TEST_FILENAME, 'rb') as f:
+            content = f.read()
+        from_stdin = CliRunner().invoke(main, ['summary', '--file', '-'],
+            input=content)
+        from_file = CliRunner().invoke(main,
+            ['summary', '--file', SUMMARY_2016_PRIMARY_TEST_FILENAME])
+        self.assertEqual(from_stdin.exit_code, 0)
+        self.assertEqual(from_stdin.output, from_file.output)
+
+    def test_summary_output_file(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'summary.csv')
+            result = CliRunner().invoke(main,
+                ['summary', '--file', SUMMARY_2016_PRIMARY_TEST_FILENAME,
+                 '--output', path])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.output, '')
+            with io.open(path, encoding='utf-8', newline='') as f:
+                self.assertEqual(len(list(csv.reader(f))), 908)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_summary_result_rows(self):
+        parser = SummaryParser()
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME,
+                encoding='utf-8') as f:
+            text = f.read()
+        parser.parse(text)
+        rows = list(summary_result_rows(
+            SummaryParser().iter_results(text.splitlines())))
+        expected = [tuple(dict(race.serialize(), **c.serialize())[name]
+                          for name in SUMMARY_FIELDNAMES)
+                    for race in parser.races for c in race.candidates]
+        self.assertEqual(rows, expected)
+
+
+class PrecinctRowsTestCase(BoardServerTestCase):
+    def test_precinct_rows(self):
+        results = self.get_race().fetch_results()
+        expected = [tuple(r.serialize().values()) for r in results]
+        self.assertEqual(list(precinct_rows(results)), expected)
+
+        table = self.get_race().fetch_results(columnar=True)
+        self.assertEqual(list(precinct_rows(table)),
+            [row[:4] + (row[4] and int(row[4]),) + row[5:]
+             for row in expected])
@@ -0,0 +1,77 @@
+import os
+import os.path
+import subprocess
+import sys
+from unittest import TestCase, skipIf
+
+import chi_elections
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SUMMARY_2016_PRIMARY_TEST_FILENAME = os.path.join(PACKAGE_DIR, 'tests',
+    'data', 'results', 'ap', 'summary__2016_primary.txt')
+
+
+def import_times(code, *args):
+    """
+    Run Python code with ``-X importtime`` and return a dictionary of the
+    cumulative import time, in seconds, of each module it imported.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [PACKAGE_DIR] + [p for p in [env.get('PYTHONPATH')] if p])
+    p = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', code] +
+        list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    stdout, stderr = p.communicate()
+    if p.returncode != 0:
+        raise AssertionError(stderr.decode('utf-8'))
+
+    times = {}
+    for line in stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative_us) / 1e6
+    return times
+
+
+@skipIf(sys.version_info < (3, 7), "-X importtime requires Python 3.7")
+class ImportTimeTestCase(TestCase):
+    # Modules that are slow to import, and that the command line interface
+    # shouldn't import unless a command needs them
+    HEAVY_MODULES = ['requests', 'urllib3', 'lxml', 'sqlite3']
+
+    # Seconds the package's modules can take to import when running
+    # summary --file, not counting click.  This is generous, because it
+    # includes compiling them if there's no bytecode cache, but importing
+    # requests alone takes longer.
+    IMPORT_BUDGET = 0.1
+
+    def assert_not_imported(self, times):
+        self.assertEqual([m for m in self.HEAVY_MODULES if m in times], [])
+
+    def test_import_package(self):
+        self.assert_not_imported(import_times('import chi_elections'))
+
+    def test_summary_file(self):
+        times = import_times(
+            'import sys; from chi_elections.cli import main; '
+            'main(sys.argv[1:])',
+            'summary', '--file', SUMMARY_2016_PRIMARY_TEST_FILENAME,
+            '--output', os.devnull)
+        self.assert_not_imported(times)
+        self.assertIn('chi_elections.summary', times)
+
+        own_time = (times['chi_elections.cli'] - times['click'] +
+                    times['chi_elections.summary'])
+        self.assertLess(own_time, self.IMPORT_BUDGET)
+
+
+class LazyAttributeTestCase(TestCase):
+    def test_attributes(self):
+        from chi_elections.precincts import PrecinctClient
+        from chi_elections.summary import SummaryClient
+        self.assertIs(chi_elections.SummaryClient, SummaryClient)
+        self.assertIs(chi_elections.PrecinctClient, PrecinctClient)
+        self.assertIn('SummaryParser', dir(chi_elections))
+        with self.assertRaises(AttributeError):
+            chi_elections.NotAClient
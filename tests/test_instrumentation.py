@@ -0,0 +1,214 @@
+# -*- coding=utf-8 -*-
+import io
+import json
+import os
+import os.path
+import shutil
+import tempfile
+from unittest import TestCase
+
+from click.testing import CliRunner
+import requests
+
+from chi_elections.cli import main
+from chi_elections.instrumentation import Instrumentation, StatsFileExporter
+from chi_elections.summary import SummaryClient
+
+from board_pages import (BoardServerTestCase, CANDIDATES, ELEC_CODE,
+        PRECINCTS, RACE_NAMES, WARDS)
+from stub_server import StubServer
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'data')
+SUMMARY_2016_PRIMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results',
+    'ap', 'summary__2016_primary.txt')
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.instrumentation = Instrumentation()
+        self.instrumentation.record_request('precinct', 'GET',
+            'http://example.com/', 200, 100, 0.5)
+        self.instrumentation.record_request('precinct', 'GET',
+            'http://example.com/', 200, 50, 0.25)
+        self.instrumentation.record_request('precinct', 'GET',
+            'http://example.com/', None, 0, 1.0)
+        self.instrumentation.record_parse('precinct', 10, 0.125)
+        self.instrumentation.record_created('precincts.Result', 10)
+
+    def test_serialize(self):
+        stats = self.instrumentation.serialize()
+        self.assertEqual([(r['status'], r['count'], r['size'], r['seconds'],
+                           r['max_seconds']) for r in stats['requests']],
+            [(None, 1, 0, 1.0, 1.0), (200, 2, 150, 0.75, 0.5)])
+        self.assertEqual(stats['parses'][0]['rows'], 10)
+        self.assertEqual(stats['objects'], {'precincts.Result': 10})
+
+    def test_to_prometheus(self):
+        lines = self.instrumentation.to_prometheus().splitlines()
+        labels = 'client="precinct",method="GET",status="200"'
+        self.assertIn('chi_elections_http_request_seconds_sum{' + labels +
+            '} 0.75', lines)
+        self.assertIn('chi_elections_http_request_seconds_count{' + labels +
+            '} 2', lines)
+        self.assertIn('chi_elections_http_response_bytes_total{' + labels +
+            '} 150', lines)
+        self.assertIn('chi_elections_parse_rows_total{parser="precinct"} 10',
+            lines)
+        self.assertIn('chi_elections_objects_created_total'
+            '{kind="precincts.Result"} 10', lines)
+        self.assertIn('# TYPE chi_elections_parse_seconds summary', lines)
+
+    def test_callbacks(self):
+        events = []
+        self.instrumentation.add_callback(
+            lambda event, attrs: events.append((event, attrs)))
+        self.instrumentation.record_parse('ward', 5, 0.1)
+        self.assertEqual(events, [('parse', {'parser': 'ward', 'rows': 5,
+            'seconds': 0.1})])
+
+    def test_export(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            json_path = os.path.join(tmpdir, 'stats.json')
+            self.instrumentation.export(json_path)
+            with open(json_path) as f:
+                self.assertEqual(json.load(f)['objects'],
+                    {'precincts.Result': 10})
+
+            prom_path = os.path.join(tmpdir, 'stats.prom')
+            exporter = StatsFileExporter(self.instrumentation, prom_path,
+                interval=60)
+            self.instrumentation.record_created('precincts.Result', 5)
+            self.instrumentation.record_created('precincts.Result', 5)
+            with open(prom_path) as f:
+                self.assertIn('{kind="precincts.Result"} 15', f.read())
+
+            exporter.close()
+            with open(prom_path) as f:
+                self.assertIn('{kind="precincts.Result"} 20', f.read())
+            # Readable by a collector running as another user
+            self.assertEqual(os.stat(prom_path).st_mode & 0o044, 0o044)
+            self.assertEqual(sorted(os.listdir(tmpdir)),
+                ['stats.json', 'stats.prom'])
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class SummaryClientInstrumentationTestCase(TestCase):
+    def setUp(self):
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            self.body = f.read()
+        self.server = StubServer(routes={
+            ('GET', '/ap/summary.txt'): lambda request: (200, {
+                'Content-Type': 'text/plain', 'ETag': '"1"'}, self.body),
+        }).start()
+        self.instrumentation = Instrumentation()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get_client(self, **kwargs):
+        return SummaryClient(url=self.server.url('/ap/summary.txt'),
+            instrumentation=self.instrumentation, **kwargs)
+
+    def test_fetch(self):
+        client = self.get_client(incremental=True)
+        client.fetch()
+        client.fetch()
+
+        stats = self.instrumentation.serialize()
+        self.assertEqual([(r['client'], r['status'], r['count'])
+                          for r in stats['requests']],
+            [('summary', 200, 2)])
+        self.assertEqual(stats['requests'][0]['size'],
+            2 * len(self.body.encode('utf-8')))
+        # The second response is unchanged, so it isn't parsed
+        self.assertEqual(stats['parses'][0]['count'], 1)
+        self.assertEqual(stats['parses'][0]['rows'],
+            len(self.body.splitlines()))
+        self.assertEqual(stats['objects']['summary.Race'], len(client.races))
+        self.assertEqual(stats['objects']['summary.Result'],
+            sum(len(race.candidates) for race in client.races))
+
+    def test_iter_results(self):
+        results = list(self.get_client().iter_results())
+        stats = self.instrumentation.serialize()
+        self.assertEqual(stats['requests'][0]['count'], 1)
+        self.assertEqual(stats['parses'][0]['rows'], len(results))
+        self.assertEqual(stats['objects']['summary.Result'], len(results))
+
+
+class PrecinctClientInstrumentationTestCase(BoardServerTestCase):
+    def test_fetch_results(self):
+        instrumentation = Instrumentation()
+        race = self.get_race(instrumentation=instrumentation, max_workers=4)
+        results = race.results
+
+        stats = instrumentation.serialize()
+        self.assertEqual([(r['method'], r['status'], r['count'])
+                          for r in stats['requests']],
+            [('GET', 200, 1 + len(WARDS)), ('POST', 200, 1)])
+        # The "Votes Cast" column is parsed as a candidate
+        candidates = len(CANDIDATES) + 1
+        self.assertEqual(dict((p['parser'], (p['count'], p['rows']))
+                              for p in stats['parses']), {
+            'election': (1, len(RACE_NAMES) + 1),
+            'ward': (1, (len(WARDS) + 1) * candidates),
+            'precinct': (len(WARDS), len(results)),
+        })
+        self.assertEqual(stats['objects'], {
+            'precincts.Candidate': candidates,
+            'precincts.Election': 1,
+            'precincts.Race': len(RACE_NAMES),
+            'precincts.Result': len(WARDS) * (len(PRECINCTS) + 1) *
+                candidates,
+            'precincts.Ward': 2 * len(WARDS),
+        })
+
+    def test_errors(self):
+        instrumentation = Instrumentation()
+        client = self.get_client(instrumentation=instrumentation)
+        with self.assertRaises(requests.HTTPError):
+            client.request('GET', self.server.url('/missing'))
+        self.assertEqual(instrumentation.serialize()['requests'][0]['status'],
+            404)
+
+
+class StatsOptionTestCase(BoardServerTestCase):
+    def setUp(self):
+        super(StatsOptionTestCase, self).setUp()
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, 'rb') as f:
+            summary = f.read()
+        self.server.routes[('GET', '/ap/summary.txt')] = lambda request: (
+            200, {'Content-Type': 'text/plain'}, summary)
+        self.tmpdir = tempfile.mkdtemp()
+        self.stats_path = os.path.join(self.tmpdir, 'stats.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(StatsOptionTestCase, self).tearDown()
+
+    def invoke(self, args):
+        result = CliRunner().invoke(main, args + ['--stats', self.stats_path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with open(self.stats_path) as f:
+            return json.load(f)
+
+    def test_precincts(self):
+        stats = self.invoke(['precincts', '--no-progress', '--base-url',
+            self.server.url(''), '--workers', '4', '--output',
+            os.path.join(self.tmpdir, 'precincts.csv'), ELEC_CODE])
+        self.assertEqual(sum(r['count'] for r in stats['requests']),
+            1 + len(RACE_NAMES) + len(RACE_NAMES) * len(WARDS))
+        self.assertEqual(stats['objects']['precincts.Result'],
+            len(RACE_NAMES) * len(WARDS) * (len(PRECINCTS) + 1) *
+            (len(CANDIDATES) + 1))
+
+    def test_watch(self):
+        stats = self.invoke(['watch', '--no-serve', '--max-polls', '1',
+            '--url', self.server.url('/ap/summary.txt')])
+        self.assertEqual([(r['client'], r['status'], r['count'])
+                          for r in stats['requests']],
+            [('summary', 200, 1)])
+        self.assertEqual(stats['parses'][0]['rows'], 907)
@@ -0,0 +1,384 @@
+# -*- coding=utf-8 -*-
+import io
+import os.path
+import threading
+import time
+from unittest import TestCase
+
+import requests
+
+from chi_elections.precincts import (AdaptiveConcurrency, PrecinctParser,
+        RateLimiter, ResultTable, WardParser, group_by_reporting_unit)
+
+from board_pages import (BoardServerTestCase, CANDIDATES, ELEC_CODE,
+        PRECINCTS, RACE_NAMES, RACE_NUMBERS, WARDS, votes, ward_results_html)
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'data')
+PRECINCT_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'precinct__unicode.html')
+
+
+class PrecinctParserTestCase(TestCase):
+    def setUp(self):
+        with io.open(PRECINCT_TEST_FILENAME, encoding='utf-8') as f:
+            self.html_string = f.read()
+        self.parser = PrecinctParser()
+
+    def test_parse(self):
+        results = self.parser.parse(self.html_string)
+        self.assertEqual(len(results), 378)
+        obregon = next(r for r in results
+                       if r['candidate'] == u"Álvaro R. Obregón (Sanders)")
+        self.assertEqual(obregon, {
+            'reporting_unit_id': '1',
+            'candidate': u"Álvaro R. Obregón (Sanders)",
+            'votes': 168,
+            'percent': 10.64,
+        })
+
+    def test_iter_results(self):
+        self.assertEqual(list(self.parser.iter_results(self.html_string)),
+            self.parser.parse(self.html_string))
+
+    def test_iter_results_chunks(self):
+        content = self.html_string.encode('utf-8')
+        chunks = [content[i:i + 1000] for i in range(0, len(content), 1000)]
+        self.assertEqual(
+            list(self.parser.iter_results(chunks, encoding='utf-8')),
+            self.parser.parse(self.html_string))
+
+    def test_iter_results_windows_1252(self):
+        # The page declares windows-1252, which is used to decode bytes
+        # unless another encoding is given
+        content = self.html_string.encode('windows-1252')
+        self.assertEqual(list(self.parser.iter_results(content)),
+            self.parser.parse(self.html_string))
+
+    def test_ward_iter_results(self):
+        html_string = ward_results_html('5', 10, 'Mayor', CANDIDATES, WARDS,
+            votes)
+        parser = WardParser()
+        results = list(parser.iter_results(html_string))
+        self.assertEqual(results, parser.parse(html_string))
+        self.assertEqual(results[-1]['reporting_unit_id'], 'Total')
+
+class RaceTestCase(BoardServerTestCase):
+    def test_fetch_wards(self):
+        race = self.get_race()
+        self.assertEqual(race.name, RACE_NAMES[0])
+        self.assertEqual(sorted(w.number for w in race.wards), WARDS)
+        self.assertEqual(race.number, RACE_NUMBERS[0])
+
+    def test_fetch_results(self):
+        race = self.get_race()
+        results = race.results
+        # Votes Cast and each candidate, for every precinct and ward total
+        self.assertEqual(len(results),
+            len(WARDS) * (len(PRECINCTS) + 1) * (len(CANDIDATES) + 1))
+        rahm = [r for r in results if r.candidate.name == CANDIDATES[0]]
+        self.assertEqual([(r.ward_number, r.precinct_number, r.votes)
+                          for r in rahm[:4]],
+            [(1, '1', 101), (1, '2', 102), (1, '3', 103), (1, None, 306)])
+        self.assertEqual(rahm[0].race, race)
+
+
+class ConcurrentFetchResultsTestCase(BoardServerTestCase):
+    latency = 0.05
+
+    def serialize(self, results):
+        return [(r.ward_number, r.precinct_number, r.candidate.name, r.votes,
+                 r.percent) for r in results]
+
+    def test_same_order(self):
+        sequential = self.serialize(self.get_race().fetch_results())
+
+        start = time.time()
+        concurrent = self.serialize(
+            self.get_race().fetch_results(max_workers=5))
+        concurrent_secs = time.time() - start
+
+        self.assertEqual(concurrent, sequential)
+        # 10 wards, 5 at a time, should take about 2 round trips
+        self.assertLess(concurrent_secs, len(WARDS) * self.latency)
+
+    def test_client_max_workers(self):
+        race = self.get_race(max_workers=10)
+        start = time.time()
+        race.fetch_results()
+        self.assertLess(time.time() - start, len(WARDS) * self.latency)
+
+
+class RateLimiterTestCase(TestCase):
+    def test_wait(self):
+        limiter = RateLimiter(rate=50)
+        start = time.time()
+        for i in range(6):
+            limiter.wait('http://www.chicagoelections.com/en/pctlevel3.asp')
+        # The first request is immediate and the rest 1/50 sec apart
+        self.assertGreaterEqual(time.time() - start, 5 / 50.0 - 0.005)
+
+        start = time.time()
+        limiter.wait('http://example.com/')
+        self.assertLess(time.time() - start, 1 / 50.0)
+
+
+class AdaptiveConcurrencyTestCase(TestCase):
+    def test_increase(self):
+        concurrency = AdaptiveConcurrency(initial=1, max_limit=3)
+        concurrency.acquire()
+        concurrency.release(0.01)
+        self.assertEqual(concurrency.limit, 2.0)
+
+        # Only responses received while the limit is used raise it
+        concurrency.acquire()
+        concurrency.acquire()
+        concurrency.release(0.01)
+        concurrency.release(0.01)
+        self.assertEqual(concurrency.limit, 2.5)
+
+        for i in range(10):
+            concurrency.acquire()
+            concurrency.acquire()
+            concurrency.release(0.01)
+            concurrency.release(0.01)
+        self.assertEqual(concurrency.limit, 3.0)
+
+    def test_decrease(self):
+        concurrency = AdaptiveConcurrency(initial=8, min_limit=2)
+        concurrency.acquire()
+        concurrency.release(0.01)
+        concurrency.acquire()
+        concurrency.release(0.5, success=False)
+        self.assertEqual(concurrency.limit, 4.0)
+
+        # Failures within a round trip of the last decrease don't count
+        concurrency.acquire()
+        concurrency.release(0.5, success=False)
+        self.assertEqual(concurrency.limit, 4.0)
+
+        time.sleep(0.02)
+        concurrency.acquire()
+        concurrency.release(0.5, success=False)
+        self.assertEqual(concurrency.limit, 2.0)
+        time.sleep(0.02)
+        concurrency.acquire()
+        concurrency.release(0.5, success=False)
+        self.assertEqual(concurrency.limit, 2.0)
+        self.assertEqual(concurrency.errors, 4)
+
+        # Errors that aren't the server's fault don't count either
+        concurrency.acquire()
+        concurrency.release(0.01, success=None)
+        self.assertEqual(concurrency.errors, 4)
+
+    def test_slowdown(self):
+        concurrency = AdaptiveConcurrency(initial=4, min_slow_latency=0.05)
+        concurrency.acquire()
+        concurrency.release(0.03)
+        concurrency.acquire()
+        concurrency.release(0.05)
+        self.assertEqual(concurrency.limit, 4.0)
+        concurrency.acquire()
+        concurrency.release(0.07)
+        self.assertEqual(concurrency.limit, 2.0)
+        self.assertEqual(concurrency.slowdowns, 1)
+
+    def test_acquire(self):
+        concurrency = AdaptiveConcurrency(initial=1)
+        concurrency.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            concurrency.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        concurrency.release(0.01)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+    def test_retry_budget(self):
+        concurrency = AdaptiveConcurrency(retry_ratio=0.5, min_retries=2)
+        self.assertTrue(concurrency.retry())
+        self.assertTrue(concurrency.retry())
+        self.assertFalse(concurrency.retry())
+        for i in range(2):
+            concurrency.acquire()
+            concurrency.release(0.01)
+        self.assertTrue(concurrency.retry())
+        self.assertFalse(concurrency.retry())
+        self.assertEqual(concurrency.serialize()['retries'], 3)
+
+
+class AdaptiveClientTestCase(BoardServerTestCase):
+    latency = 0.02
+
+    def fail_route(self, count, status=500):
+        failures = []
+        election_route = self.election_route
+
+        def route(request):
+            if count is None or len(failures) < count:
+                failures.append(request)
+                return status, {}, ''
+            return election_route(request)
+
+        self.server.routes[('GET', '/en/wdlevel3.asp')] = route
+        return failures
+
+    def test_fetch_results(self):
+        concurrency = AdaptiveConcurrency(initial=1, max_limit=8,
+            min_slow_latency=1)
+        race = self.get_race(max_workers=8, concurrency=concurrency)
+        results = race.fetch_results()
+        self.assertEqual(len(results),
+            len(WARDS) * (len(PRECINCTS) + 1) * (len(CANDIDATES) + 1))
+        self.assertGreater(concurrency.limit, 1)
+        stats = concurrency.serialize()
+        self.assertEqual(stats['requests'], 2 + len(WARDS))
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertGreater(stats['requests_per_sec'], 0)
+
+    def test_retries(self):
+        failures = self.fail_route(2)
+        concurrency = AdaptiveConcurrency(initial=4)
+        client = self.get_client(concurrency=concurrency, retries=2,
+            retry_wait=0)
+        self.assertIn('Mayor', client.fetch_election_html(ELEC_CODE))
+        self.assertEqual(len(failures), 2)
+        self.assertEqual(concurrency.errors, 2)
+        self.assertEqual(concurrency.retries, 2)
+        self.assertLess(concurrency.limit, 4)
+
+    def test_retry_budget(self):
+        failures = self.fail_route(None)
+        concurrency = AdaptiveConcurrency(retry_ratio=0, min_retries=1)
+        client = self.get_client(concurrency=concurrency, retries=5,
+            retry_wait=0)
+        with self.assertRaises(requests.HTTPError):
+            client.fetch_election_html(ELEC_CODE)
+        self.assertEqual(len(failures), 2)
+
+    def test_client_errors(self):
+        failures = self.fail_route(None, status=404)
+        concurrency = AdaptiveConcurrency(initial=4)
+        client = self.get_client(concurrency=concurrency, retries=5,
+            retry_wait=0)
+        with self.assertRaises(requests.HTTPError):
+            client.fetch_election_html(ELEC_CODE)
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(concurrency.limit, 4)
+
+    def test_timeout(self):
+        self.server.latency = 0.5
+        concurrency = AdaptiveConcurrency(initial=4)
+        client = self.get_client(concurrency=concurrency, timeout=0.1)
+        with self.assertRaises(requests.Timeout):
+            client.fetch_election_html(ELEC_CODE)
+        self.assertEqual(concurrency.errors, 1)
+        self.assertEqual(concurrency.limit, 2)
+
+
+class ResultTableTestCase(BoardServerTestCase):
+    def test_fetch_results_columnar(self):
+        race = self.get_race()
+        table = race.fetch_results(columnar=True)
+        results = self.get_race().fetch_results()
+        self.assertIsInstance(table, ResultTable)
+        self.assertEqual(len(table), len(results))
+        self.assertEqual([r.serialize() for r in table],
+            [dict(r.serialize(), precinct=r.precinct_number and
+                  int(r.precinct_number)) for r in results])
+        self.assertEqual(table[-1].percent, results[-1].percent)
+        self.assertIsNone(table[0].percent)
+        self.assertIs(table[0].race, race)
+        # Candidates are interned
+        self.assertIs(table[1].candidate, table[len(CANDIDATES) + 2].candidate)
+        self.assertEqual(len(table.candidates), len(CANDIDATES) + 1)
+
+    def test_from_results(self):
+        race = self.get_race()
+        results = race.fetch_results()
+        table = ResultTable.from_results(results)
+        self.assertEqual(len(table), len(results))
+        for view, result in zip(table, results):
+            self.assertIs(view.race, race)
+            self.assertEqual(view.candidate.name, result.candidate.name)
+            self.assertEqual(view.ward_number, result.ward_number)
+            self.assertEqual(view.precinct_number,
+                result.precinct_number and int(result.precinct_number))
+            self.assertEqual(view.votes, result.votes)
+            self.assertEqual(view.percent, result.percent)
+        # Ward totals and missing percentages survive the round trip
+        self.assertTrue(any(r.precinct_number is None for r in table))
+        self.assertTrue(any(r.percent is None for r in table))
+
+        # The same columns as a table built from the parsed results, with
+        # NaN for missing percentages
+        columnar = self.get_race().fetch_results(columnar=True)
+        for name in ResultTable.COLUMNS:
+            self.assertEqual(getattr(table, name).tobytes(),
+                getattr(columnar, name).tobytes())
+
+    def test_client_columnar(self):
+        race = self.get_race(columnar=True)
+        self.assertIsInstance(race.results, ResultTable)
+
+    def test_views(self):
+        race = self.get_race()
+        table = ResultTable()
+        table.append(race, CANDIDATES[0], 2, 3, 10, 50.0)
+        table.append(race, CANDIDATES[0], 2, None, 30)
+        precinct_result, ward_result = list(table)
+        self.assertEqual(precinct_result.ward_number, 2)
+        self.assertEqual(precinct_result.precinct_number, 3)
+        self.assertEqual(str(precinct_result.reporting_unit), "02003")
+        self.assertIs(precinct_result.reporting_unit.ward,
+            ward_result.reporting_unit)
+        self.assertIsNone(ward_result.precinct_number)
+        self.assertIsNone(ward_result.percent)
+        self.assertEqual(table[-1].votes, 30)
+        self.assertRaises(IndexError, lambda: table[2])
+
+    def test_to_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        table = self.get_race().fetch_results(columnar=True)
+        columns = table.to_numpy()
+        self.assertEqual(list(columns), list(ResultTable.COLUMNS))
+        self.assertEqual(int(columns['votes'].sum()),
+            sum(r.votes for r in table))
+        self.assertEqual(int(numpy.isnan(columns['percent']).sum()),
+            sum(1 for r in table if r.percent is None))
+
+
+class ModelTestCase(BoardServerTestCase):
+    def test_slots(self):
+        race = self.get_race()
+        result = race.results[0]
+        for obj in (result, result.candidate, result.reporting_unit,
+                    result.reporting_unit.ward):
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+    def test_unregistered_results(self):
+        race = self.get_race(register_results=False)
+        results = race.results
+        precinct = results[0].reporting_unit
+        self.assertEqual(precinct.results, [])
+
+        index = group_by_reporting_unit(results)
+        self.assertEqual(index[precinct],
+            [r for r in results if r.reporting_unit is precinct])
+        self.assertEqual(len(index), len(WARDS) * (len(PRECINCTS) + 1))
+
+    def test_registered_results(self):
+        results = self.get_race().results
+        precinct = results[0].reporting_unit
+        self.assertEqual(precinct.results,
+            group_by_reporting_unit(results)[precinct])
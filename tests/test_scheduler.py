@@ -0,0 +1,112 @@
+import io
+import sys
+
+import requests
+
+from chi_elections.precincts import AdaptiveConcurrency
+from chi_elections.scheduler import ScrapeProgress, ScrapeScheduler
+
+from board_pages import (BoardServerTestCase, CANDIDATES, PRECINCTS,
+        RACE_NAMES, WARDS)
+
+
+class ScrapeSchedulerTestCase(BoardServerTestCase):
+    def get_scheduler(self, **kwargs):
+        return ScrapeScheduler(client=self.get_client(max_workers=4),
+            max_workers=4, retry_wait=0, **kwargs)
+
+    def serialize(self, results):
+        return sorted((r.race.name, r.ward_number, str(r.precinct_number),
+                       r.candidate.name, r.votes) for r in results)
+
+    def test_run(self):
+        scheduler = self.get_scheduler()
+        results = list(scheduler.run(['5']))
+        self.assertEqual(len(results), len(RACE_NAMES) * len(WARDS) *
+            (len(PRECINCTS) + 1) * (len(CANDIDATES) + 1))
+
+        # The same results as scraping each race serially
+        election = self.get_race().election
+        serial = []
+        for race in election.races:
+            serial.extend(race.fetch_results())
+        self.assertEqual(self.serialize(results), self.serialize(serial))
+
+        # One request for the election, one per race and one per ward
+        self.assertEqual(scheduler.progress.requests,
+            1 + len(RACE_NAMES) + len(RACE_NAMES) * len(WARDS))
+
+    def test_race_filter(self):
+        scheduler = self.get_scheduler()
+        results = list(scheduler.run(['5'],
+            race_filter=lambda r: r.name == 'Clerk'))
+        self.assertEqual(set(r.race.name for r in results), set(['Clerk']))
+
+    def test_retries(self):
+        failures = []
+        precinct_results_route = self.precinct_results_route
+
+        def flaky_route(request):
+            if len(failures) < 3:
+                failures.append(request)
+                return 500, {}, ''
+            return precinct_results_route(request)
+
+        self.server.routes[('GET', '/en/pctlevel3.asp')] = flaky_route
+        scheduler = self.get_scheduler(retries=3)
+        results = list(scheduler.run(['5']))
+        self.assertEqual(len(failures), 3)
+        self.assertEqual(scheduler.progress.retries, 3)
+        self.assertEqual(len(set((r.race.name, r.ward_number)
+                                 for r in results)),
+            len(RACE_NAMES) * len(WARDS))
+
+    def test_not_retried(self):
+        missing = []
+
+        def missing_route(request):
+            missing.append(request)
+            return 404, {}, ''
+
+        self.server.routes[('GET', '/en/pctlevel3.asp')] = missing_route
+        scheduler = self.get_scheduler(retries=3)
+        with self.assertRaises(requests.HTTPError):
+            list(scheduler.run(['5']))
+        # Every ward is requested once, and none are retried
+        self.assertEqual(len(missing), len(RACE_NAMES) * len(WARDS))
+        self.assertEqual(scheduler.progress.retries, 0)
+
+    def test_progress(self):
+        stream = io.StringIO()
+        scheduler = self.get_scheduler(
+            progress=ScrapeProgress(stream=stream, interval=0))
+        results = list(scheduler.run(['5']))
+        last_line = stream.getvalue().splitlines()[-1]
+        self.assertTrue(last_line.startswith("{0}/{0} wards".format(
+            len(RACE_NAMES) * len(WARDS))))
+        self.assertIn("{} rows".format(len(results)), last_line)
+        self.assertIn("requests/sec", last_line)
+
+    def test_progress_concurrency(self):
+        stream = io.StringIO()
+        concurrency = AdaptiveConcurrency(max_limit=4)
+        scheduler = ScrapeScheduler(
+            client=self.get_client(max_workers=4, concurrency=concurrency),
+            max_workers=4,
+            progress=ScrapeProgress(stream=stream, interval=0,
+                concurrency=concurrency))
+        list(scheduler.run(['5']))
+        last_line = stream.getvalue().splitlines()[-1]
+        self.assertIn("concurrency limit", last_line)
+        self.assertIn("requests/sec sent", last_line)
+
+    def test_no_progress(self):
+        stderr = sys.stderr
+        sys.stderr = io.StringIO()
+        try:
+            list(self.get_scheduler().run(['5']))
+            list(self.get_scheduler(progress=ScrapeProgress(stream=None,
+                interval=0)).run(['5']))
+            self.assertEqual(sys.stderr.getvalue(), '')
+        finally:
+            sys.stderr = stderr
@@ -0,0 +1,172 @@
+# -*- coding=utf-8 -*-
+import csv
+import io
+import os.path
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from click.testing import CliRunner
+import requests
+
+from chi_elections.cli import main
+from chi_elections.precincts import (AdaptiveConcurrency, Election,
+        PrecinctClient)
+from chi_elections.simulator import BoardSimulator, ElectionNight
+from chi_elections.summary import SummaryClient
+from chi_elections.synthetic import SyntheticElection
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ElectionNightTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.night = ElectionNight(SyntheticElection(races=2, candidates=3,
+            wards=2, precincts=5), duration=100, update_interval=10,
+            clock=self.clock)
+
+    def test_summary(self):
+        content, etag = self.night.summary()
+        lines = content.decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 6)
+        # Every column until precincts start reporting
+        self.assertEqual(len(lines[0]), 154)
+        self.assertEqual(lines[0][18:22], '0000')
+        self.assertEqual(self.night.summary(), (content, etag))
+
+        self.clock.now += 25
+        content, new_etag = self.night.summary()
+        lines = content.decode('utf-8').splitlines()
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(len(lines[0]), 22)
+        self.assertEqual(lines[0][18:22], '0002')
+
+        self.clock.now += 1000
+        self.assertEqual(self.night.reporting(), 1.0)
+
+
+class BoardSimulatorTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.election = SyntheticElection(races=2, candidates=3, wards=4,
+            precincts=5)
+        self.night = ElectionNight(self.election, duration=100,
+            update_interval=10, clock=self.clock)
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.stop()
+
+    def start(self, **kwargs):
+        self.server = BoardSimulator(self.night, **kwargs).start()
+        return self.server
+
+    def get_precinct_client(self, **kwargs):
+        return PrecinctClient(
+            election_url=self.server.url + '/en/wdlevel3.asp',
+            precinct_url=self.server.url + '/en/pctlevel3.asp',
+            **kwargs)
+
+    def test_summary(self):
+        self.start()
+        client = SummaryClient(url=self.server.url + '/ap/summary.txt',
+            incremental=True)
+        self.assertTrue(client.fetch())
+        self.assertEqual([race.name for race in client.races],
+            self.election.race_names)
+        self.assertFalse(client.fetch())
+        self.assertEqual(client.stats.not_modified, 1)
+
+        self.clock.now += 50
+        self.assertTrue(client.fetch())
+        self.assertEqual(len(client.changes.precincts_changed), 2)
+        self.assertEqual(client.races[0].precincts_reporting, 10)
+        self.assertEqual(self.server.stats()['statuses'], {200: 2, 304: 1})
+
+    def test_precincts(self):
+        self.start()
+        client = self.get_precinct_client(max_workers=4)
+        race = Election(elec_code='25', client=client).races[1]
+        results = race.fetch_results()
+        self.assertEqual(race.number, 2)
+        self.assertEqual(len(list(race.wards)), 4)
+        # A row for each precinct and the total, and a "Votes Cast" column
+        self.assertEqual(len(results), 4 * 6 * 4)
+        self.assertEqual([r.votes for r in results
+                          if r.ward_number == 3 and r.precinct_number == '2'
+                          and r.candidate.name != 'Votes Cast'],
+            self.election.votes(2, 3, 2))
+
+    def test_not_found(self):
+        self.start()
+        client = self.get_precinct_client()
+        with self.assertRaises(requests.HTTPError):
+            client.fetch_precinct_results_html('25', 1, 99)
+
+    def test_errors(self):
+        self.start(error_rate=1)
+        with self.assertRaises(requests.HTTPError):
+            self.get_precinct_client().fetch_election_html('25')
+        self.assertEqual(self.server.stats()['statuses'], {500: 1})
+
+    def test_adaptive_errors(self):
+        self.start(error_rate=1)
+        concurrency = AdaptiveConcurrency(initial=8, retry_ratio=0,
+            min_retries=3)
+        client = self.get_precinct_client(concurrency=concurrency, retries=5,
+            retry_wait=0)
+        with self.assertRaises(requests.HTTPError):
+            client.fetch_election_html('25')
+        # The retry budget runs out before the request's retries
+        self.assertEqual(self.server.stats()['statuses'], {500: 4})
+        self.assertEqual(concurrency.limit, 1)
+
+    def test_max_concurrent(self):
+        self.start(max_concurrent=0)
+        r = requests.get(self.server.url + '/ap/summary.txt')
+        self.assertEqual(r.status_code, 503)
+
+    def test_max_rate(self):
+        self.start(max_rate=20)
+        session = requests.Session()
+        start = time.time()
+        for i in range(5):
+            session.get(self.server.url + '/en/wdlevel3.asp')
+        self.assertGreaterEqual(time.time() - start, 0.19)
+
+    def test_cli(self):
+        self.start()
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'precincts.csv')
+            result = CliRunner().invoke(main, ['precincts', '--no-progress',
+                '--base-url', self.server.url, '--race', 'RACE 1',
+                '--output', path, '25'])
+            self.assertEqual(result.exit_code, 0)
+            with io.open(path, encoding='utf-8', newline='') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 4 * 6 * 4)
+
+            result = CliRunner().invoke(main, ['precincts', '--no-progress',
+                '--base-url', self.server.url, '--race', 'RACE 2',
+                '--workers', '4', '--adaptive', '--timeout', '5',
+                '--output', path, '25'])
+            self.assertEqual(result.exit_code, 0)
+            with io.open(path, encoding='utf-8', newline='') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 4 * 6 * 4)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        result = CliRunner().invoke(main, ['summary', '--url',
+            self.server.url + '/ap/summary.txt'])
+        self.assertEqual(result.exit_code, 0)
+        rows = list(csv.DictReader(io.StringIO(result.output)))
+        self.assertEqual(len(rows), 6)
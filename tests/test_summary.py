@@ -1,16 +1,24 @@
 # -*- coding=utf-8 -*-
+import io
 import os.path
+import shutil
+import tempfile
 from unittest import TestCase
 
 import responses
 
-from chi_elections.summary import (FixedWidthField, ResultParser, SummaryClient,
-        SummaryParser)
+from chi_elections.summary import (FixedWidthField, HistoryStore,
+        MetadataStore, ResultParser, SummaryClient, SummaryParser,
+        iter_records)
+
+from stub_server import StubServer
 
 TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
     'data')
 SUMMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results', 'ap',
     'summary.txt')
+SUMMARY_2016_PRIMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results',
+    'ap', 'summary__2016_primary.txt')
 
 class ParserTestCase(TestCase):
 
@@ -28,6 +36,11 @@ class ParserTestCase(TestCase):
             rahm = next(c for c in mayor.candidates
                         if c.full_name == "RAHM EMANUEL")
             self.assertEqual(rahm.vote_total, 0)
+            self.assertEqual(str(rahm), "RAHM EMANUEL: 0")
+            rahm.vote_total = None
+            self.assertEqual(str(rahm), "RAHM EMANUEL: None")
+            self.assertFalse(hasattr(rahm, '__dict__'))
+            self.assertFalse(hasattr(mayor, '__dict__'))
 
            
 class FixedWidthFieldTestCase(TestCase):
@@ -91,6 +104,19 @@ class ResultParserTestCase(TestCase):
         self.assertEqual(result['reporting_unit_name'], "4th Congressional Distric")
         self.assertEqual(result['vote_for'], 5)
 
+    def test_parse_line_matches_fields(self):
+        parser = ResultParser()
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            for line in f:
+                self.assertEqual(parser.parse_line(line),
+                    parser.parse_line_fields(line))
+
+    def test_parse_line_bytes(self):
+        parser = ResultParser()
+        line = u"0023012034800000000000DEM       Delegate, National Convention 4th DEM                   Álvaro R. Obregón (Sanders)           4th Congressional Distric005"
+        result = parser.parse_line(line.encode('utf-8'))
+        self.assertEqual(result, parser.parse_line(line))
+
 
 class SummaryClientTestCase(TestCase):
     @responses.activate
@@ -109,3 +135,525 @@ class SummaryClientTestCase(TestCase):
             rahm = next(c for c in mayor.candidates
                         if c.full_name == "RAHM EMANUEL")
             self.assertEqual(rahm.vote_total, 0)
+
+
+class SummaryClientPollingTestCase(TestCase):
+    def setUp(self):
+        with open(SUMMARY_TEST_FILENAME, 'rb') as f:
+            self.body = f.read()
+        self.etag = '"v1"'
+        self.server = StubServer(routes={
+            ('GET', '/ap/summary.txt'): self.summary_route,
+        }).start()
+        self.client = SummaryClient(url=self.server.url('/ap/summary.txt'))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def summary_route(self, request):
+        if request['headers'].get('If-None-Match') == self.etag:
+            return 304, {}, b''
+
+        return 200, {
+            'Content-Type': 'text/plain',
+            'ETag': self.etag,
+            'Last-Modified': 'Tue, 15 Mar 2016 23:00:00 GMT',
+        }, self.body
+
+    def test_not_modified(self):
+        self.assertTrue(self.client.fetch())
+        self.assertEqual(len(self.client.races), 98)
+        self.assertFalse(self.client.fetch())
+        self.assertEqual(len(self.client.races), 98)
+
+        second_request = self.server.requests[1]
+        self.assertEqual(second_request['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(second_request['headers']['If-Modified-Since'],
+            'Tue, 15 Mar 2016 23:00:00 GMT')
+        self.assertEqual(self.client.stats.fetches, 2)
+        self.assertEqual(self.client.stats.not_modified, 1)
+        self.assertEqual(self.client.stats.parses, 1)
+        self.assertEqual(self.client.stats.bytes, len(self.body))
+
+    def test_unchanged_body(self):
+        self.client.fetch()
+        # New validator, same content
+        self.etag = '"v2"'
+        self.assertFalse(self.client.fetch())
+        self.assertEqual(self.client.stats.unchanged, 1)
+        self.assertEqual(self.client.stats.parses, 1)
+
+    def test_poll(self):
+        calls = []
+        self.client.poll(interval=0, max_polls=3,
+            callback=lambda client: calls.append(client))
+        self.assertEqual(calls, [self.client])
+        self.assertEqual(self.client.stats.fetches, 3)
+        self.assertEqual(self.client.stats.not_modified, 2)
+
+
+class SummaryParserStreamingTestCase(TestCase):
+    def setUp(self):
+        self.parser = SummaryParser()
+
+    def rows(self, pairs):
+        return [(race.contest_code, race.name, race.precincts_reporting,
+                 result.candidate_number, result.full_name, result.vote_total)
+                for race, result in pairs]
+
+    def expected_rows(self, filename):
+        parser = SummaryParser()
+        with io.open(filename, encoding='utf-8') as f:
+            parser.parse(f.read())
+        return [(race.contest_code, race.name, race.precincts_reporting,
+                 result.candidate_number, result.full_name, result.vote_total)
+                for race in parser.races for result in race.candidates]
+
+    def test_iter_results_file(self):
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            rows = self.rows(self.parser.iter_results(f))
+        self.assertEqual(rows,
+            self.expected_rows(SUMMARY_2016_PRIMARY_TEST_FILENAME))
+        self.assertEqual(self.parser.races, [])
+
+    def test_iter_results_bytes(self):
+        with open(SUMMARY_TEST_FILENAME, 'rb') as f:
+            rows = self.rows(self.parser.iter_results(f))
+        self.assertEqual(rows, self.expected_rows(SUMMARY_TEST_FILENAME))
+
+    def test_iter_results_races(self):
+        with open(SUMMARY_TEST_FILENAME, 'rb') as f:
+            pairs = list(self.parser.iter_results(f))
+        mayor = next(race for race, result in pairs if race.name == "Mayor")
+        self.assertEqual(len(mayor.candidates), 5)
+        self.assertTrue(all(result.race is race for race, result in pairs))
+
+
+class SummaryRecordTestCase(TestCase):
+    def test_record(self):
+        line = u"0023012034800000420000DEM       Delegate, National Convention 4th DEM                   Álvaro R. Obregón (Sanders)           4th Congressional Distric005"
+        buf = b'\r\n' + line.encode('utf-8') + b'\r\n\r\n0023013\n'
+        records = list(iter_records(buf))
+        self.assertEqual(len(records), 2)
+        record = records[0]
+        self.assertEqual(record.contest_code, 23)
+        self.assertEqual(record.candidate_number, 12)
+        self.assertEqual(record.precincts_total, 348)
+        self.assertEqual(record.vote_total, 42)
+        self.assertEqual(record.precincts_reporting, 0)
+        self.assertIsNone(record._text)
+        self.assertEqual(record.candidate_name, u"Álvaro R. Obregón (Sanders)")
+        self.assertEqual(record.reporting_unit_name,
+            "4th Congressional Distric")
+        self.assertEqual(record.vote_for, 5)
+        self.assertTrue(record.has_text)
+
+        self.assertEqual(records[1].candidate_number, 13)
+        self.assertIsNone(records[1].vote_total)
+        self.assertFalse(records[1].has_text)
+        self.assertEqual(records[1].race_name, "")
+
+    def test_matches_parse_line(self):
+        parser = ResultParser()
+        with open(SUMMARY_2016_PRIMARY_TEST_FILENAME, 'rb') as f:
+            buf = f.read()
+        lines = [l for l in buf.splitlines() if l.strip()]
+        records = list(iter_records(buf))
+        self.assertEqual(len(records), len(lines))
+        for line, record in zip(lines, records):
+            expected = parser.parse_line(line)
+            self.assertEqual(dict((k, getattr(record, k)) for k in expected),
+                expected)
+
+
+class SummaryParserFileTestCase(TestCase):
+    def serialize(self, races):
+        return [(r.serialize(), [c.serialize() for c in r.candidates])
+                for r in races]
+
+    def expected(self, filename):
+        parser = SummaryParser()
+        with io.open(filename, encoding='utf-8') as f:
+            parser.parse(f.read())
+        return self.serialize(parser.races)
+
+    def test_parse_file(self):
+        parser = SummaryParser()
+        for filename in (SUMMARY_TEST_FILENAME,
+                SUMMARY_2016_PRIMARY_TEST_FILENAME):
+            with open(filename, 'rb') as f:
+                parser.parse_file(f)
+            self.assertEqual(self.serialize(parser.races),
+                self.expected(filename))
+
+    def test_race_text(self):
+        parser = SummaryParser()
+        with open(SUMMARY_2016_PRIMARY_TEST_FILENAME, 'rb') as f:
+            buf = f.read()
+        races = []
+        for race, result in parser.iter_buffer_results(buf):
+            if not races or races[-1] is not race:
+                races.append(race)
+        self.assertEqual(self.serialize(races),
+            self.expected(SUMMARY_2016_PRIMARY_TEST_FILENAME))
+        # Race names are only decoded from the first line of each contest
+        self.assertEqual(len(parser._race_text_cache), len(races))
+
+    def test_not_mapped(self):
+        with open(SUMMARY_2016_PRIMARY_TEST_FILENAME, 'rb') as f:
+            f = io.BytesIO(f.read())
+        parser = SummaryParser()
+        parser.parse_file(f)
+        self.assertEqual(self.serialize(parser.races),
+            self.expected(SUMMARY_2016_PRIMARY_TEST_FILENAME))
+
+    def test_empty_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'empty.txt')
+        try:
+            open(path, 'wb').close()
+            parser = SummaryParser()
+            with open(path, 'rb') as f:
+                parser.parse_file(f)
+            self.assertEqual(parser.races, [])
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+
+
+class SummaryClientStreamingTestCase(TestCase):
+    def setUp(self):
+        with open(SUMMARY_TEST_FILENAME, 'rb') as f:
+            self.body = f.read()
+        self.server = StubServer(routes={
+            ('GET', '/ap/summary.txt'): lambda request: (200, {
+                'Content-Type': 'text/plain'}, self.body),
+        }).start()
+        self.client = SummaryClient(url=self.server.url('/ap/summary.txt'))
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_iter_results(self):
+        pairs = list(self.client.iter_results())
+        self.assertEqual(len(set(race.contest_code for race, result in pairs)),
+            98)
+        rahm = next(result for race, result in pairs
+                    if result.full_name == "RAHM EMANUEL")
+        self.assertEqual(rahm.race.name, "Mayor")
+        self.assertEqual(self.client.stats.fetches, 1)
+        self.assertEqual(self.client.races, [])
+
+
+class SummaryParserUpdateTestCase(TestCase):
+    def setUp(self):
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            self.lines = f.read().splitlines(True)
+        self.parser = SummaryParser()
+
+    def replace_numbers(self, line, vote_total=None, precincts_reporting=None):
+        if vote_total is not None:
+            line = line[:11] + "{:07d}".format(vote_total) + line[18:]
+        if precincts_reporting is not None:
+            line = line[:18] + "{:04d}".format(precincts_reporting) + line[22:]
+        return line
+
+    def test_update_first(self):
+        changes = self.parser.update(''.join(self.lines))
+        self.assertEqual(len(changes.races_added), len(self.parser.races))
+        self.assertEqual(changes.results_added, [])
+        self.assertEqual(changes.votes_changed, [])
+
+    def test_update_unchanged(self):
+        self.parser.parse(''.join(self.lines))
+        races = list(self.parser.races)
+        changes = self.parser.update(''.join(self.lines))
+        self.assertFalse(changes)
+        self.assertEqual(self.parser.races, races)
+
+    def test_update_in_place(self):
+        self.parser.parse(''.join(self.lines))
+        lines = list(self.lines)
+        # Update the second candidate in the race on line 10 and the
+        # reporting precincts for each line in that race
+        contest_code = lines[10][:4]
+        lines[10] = self.replace_numbers(lines[10], vote_total=1234)
+        lines = [self.replace_numbers(l, precincts_reporting=12)
+                 if l[:4] == contest_code else l for l in lines]
+        race = next(r for r in self.parser.races
+                    if r.contest_code == int(contest_code))
+        result = next(c for c in race.candidates
+                      if c.candidate_number == int(lines[10][4:7]))
+
+        changes = self.parser.update(''.join(lines))
+        self.assertEqual(changes.votes_changed, [result])
+        self.assertEqual(changes.precincts_changed, [race])
+        self.assertEqual(result.vote_total, 1234)
+        self.assertEqual(race.precincts_reporting, 12)
+        self.assertEqual(changes.serialize()['votes_changed'], [{
+            'contest_code': race.contest_code,
+            'candidate_number': result.candidate_number,
+            'vote_total': 1234,
+        }])
+
+    def test_update_added_removed(self):
+        # The first line is the only one in its race, the last line is the
+        # second candidate in the last race.
+        self.parser.parse(''.join(self.lines[:-1]))
+        first_race = self.parser.races[0]
+        last_race = self.parser.races[-1]
+        changes = self.parser.update(''.join(self.lines[1:]))
+        self.assertEqual(changes.races_removed, [first_race])
+        self.assertEqual(changes.races_added, [])
+        self.assertEqual(len(changes.results_added), 1)
+        self.assertIs(changes.results_added[0].race, last_race)
+        self.assertEqual(len(last_race.candidates), 2)
+        self.assertNotIn(first_race, self.parser.races)
+
+    def test_update_numeric_only(self):
+        self.parser.parse(''.join(self.lines))
+        numeric_lines = [self.replace_numbers(l[:22], vote_total=5) + '\r\n'
+                         for l in self.lines]
+        changes = self.parser.update(''.join(numeric_lines))
+        self.assertFalse(changes.races_added)
+        self.assertTrue(all(r.name for r in self.parser.races[1:]))
+        self.assertTrue(all(c.vote_total == 5 for r in self.parser.races
+                            for c in r.candidates))
+
+
+class SummaryParserLineCacheTestCase(TestCase):
+    def setUp(self):
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            self.lines = f.read().splitlines(True)
+        self.parser = SummaryParser()
+
+    def test_unchanged_lines_are_not_decoded(self):
+        self.parser.parse(''.join(self.lines))
+        self.assertEqual(self.parser.line_stats.misses, len(self.lines))
+        self.assertEqual(self.parser.line_stats.hits, 0)
+
+        lines = list(self.lines)
+        lines[10] = lines[10][:11] + "0001234" + lines[10][18:]
+        changes = self.parser.update(''.join(lines))
+        self.assertEqual(self.parser.line_stats.misses, len(self.lines) + 1)
+        self.assertEqual(self.parser.line_stats.hits, len(self.lines) - 1)
+        self.assertEqual(changes.votes_changed[0].vote_total, 1234)
+
+    def test_parse_from_cache(self):
+        self.parser.parse(''.join(self.lines))
+        first = [(r.contest_code, r.name, [c.serialize() for c in r.candidates])
+                 for r in self.parser.races]
+        self.parser.parse(''.join(self.lines))
+        second = [(r.contest_code, r.name, [c.serialize() for c in r.candidates])
+                  for r in self.parser.races]
+        self.assertEqual(first, second)
+        self.assertEqual(self.parser.line_stats.hits, len(self.lines))
+
+
+class MetadataStoreTestCase(TestCase):
+    def setUp(self):
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            self.lines = f.read().splitlines(True)
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'metadata.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_numeric_only(self):
+        store = MetadataStore(self.path)
+        parser = SummaryParser(metadata_store=store)
+        parser.parse(''.join(self.lines))
+        expected = [(r.contest_code, r.name, r.vote_for,
+                     [(c.candidate_number, c.full_name, c.party)
+                      for c in r.candidates])
+                    for r in parser.races]
+        self.assertEqual(len(store), len(self.lines))
+        store.close()
+
+        # A new process, after the file has shrunk to the numeric columns
+        store = MetadataStore(self.path)
+        self.assertEqual(len(store), len(self.lines))
+        parser = SummaryParser(metadata_store=store)
+        parser.parse(''.join(l[:22] + '\r\n' for l in self.lines))
+        actual = [(r.contest_code, r.name, r.vote_for,
+                   [(c.candidate_number, c.full_name, c.party)
+                    for c in r.candidates])
+                  for r in parser.races]
+        self.assertEqual(actual, expected)
+        store.close()
+
+    def test_metadata_saved_later(self):
+        numeric_only = ''.join(l[:22] + '\r\n' for l in self.lines)
+        store = MetadataStore(self.path)
+        parser = SummaryParser(metadata_store=store)
+        parser.parse(numeric_only)
+        self.assertEqual(parser.races[0].name, '')
+
+        # Another parser sees a full-width file and saves its metadata
+        full_width = SummaryParser(metadata_store=store)
+        full_width.parse(''.join(self.lines))
+        parser.parse(numeric_only)
+        self.assertEqual(parser.line_stats.hits, len(self.lines))
+        self.assertEqual([(r.name, [c.full_name for c in r.candidates])
+                          for r in parser.races],
+            [(r.name, [c.full_name for c in r.candidates])
+             for r in full_width.races])
+        store.close()
+
+    def test_get(self):
+        store = MetadataStore(self.path)
+        self.assertIsNone(store.get(23, 12))
+        SummaryParser(metadata_store=store).parse(''.join(self.lines))
+        metadata = store.get(23, 12)
+        self.assertEqual(metadata['race_name'],
+            "Delegate, National Convention 4th DEM")
+        self.assertEqual(metadata['candidate_name'],
+            u"Álvaro R. Obregón (Sanders)")
+        self.assertEqual(metadata['vote_for'], 5)
+        store.close()
+
+
+class HistoryStoreTestCase(TestCase):
+    def setUp(self):
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            self.lines = f.read().splitlines(True)
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'history.sqlite')
+        self.parser = SummaryParser()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def set_line(self, i, vote_total=None, precincts_reporting=None):
+        line = self.lines[i]
+        if vote_total is not None:
+            line = line[:11] + "{:07d}".format(vote_total) + line[18:]
+        if precincts_reporting is not None:
+            line = line[:18] + "{:04d}".format(precincts_reporting) + line[22:]
+        self.lines[i] = line
+
+    def snapshot(self):
+        self.parser.update(''.join(self.lines))
+        return dict(
+            (race.contest_code, {
+                'precincts_reporting': race.precincts_reporting,
+                'precincts_total': race.precincts_total,
+                'votes': dict((c.candidate_number, c.vote_total)
+                              for c in race.candidates),
+            }) for race in self.parser.races)
+
+    def append_polls(self, store, polls):
+        states = []
+        for i in range(polls):
+            self.set_line(5 + i % 3, vote_total=100 * i)
+            if i % 4 == 0:
+                self.set_line(5, precincts_reporting=i)
+            state = self.snapshot()
+            store.append(self.parser.races, timestamp=float(i))
+            states.append(state)
+        return states
+
+    def test_get_state(self):
+        store = HistoryStore(self.path, keyframe_interval=3)
+        states = self.append_polls(store, 10)
+        self.assertEqual(len(store), 10)
+        for i, state in enumerate(states):
+            self.assertEqual(store.get_state(timestamp=i + 0.5), state)
+        self.assertEqual(store.get_state(), states[-1])
+        self.assertEqual(store.get_state(timestamp=-1), {})
+
+        contest_code = self.parser.races[1].contest_code
+        self.assertEqual(store.get_state(timestamp=4, contest_code=contest_code),
+            {contest_code: states[4][contest_code]})
+        store.close()
+
+    def test_unchanged(self):
+        store = HistoryStore(self.path, keyframe_interval=3)
+        self.snapshot()
+        self.assertEqual(store.append(self.parser.races, timestamp=0), 1)
+        self.assertIsNone(store.append(self.parser.races, timestamp=1))
+
+        # Only the changed result is written
+        self.set_line(5, vote_total=12345)
+        self.snapshot()
+        store.append(self.parser.races, timestamp=2)
+        self.assertEqual(store._conn.execute(
+            "SELECT COUNT(*) FROM votes WHERE snapshot_id = 2").fetchone()[0],
+            1)
+        store.close()
+
+    def test_removed(self):
+        store = HistoryStore(self.path)
+        self.snapshot()
+        store.append(self.parser.races, timestamp=0)
+        removed = self.parser.races[-1].contest_code
+        self.lines = [l for l in self.lines
+                      if int(l[:4]) != removed]
+        state = self.snapshot()
+        store.append(self.parser.races, timestamp=1)
+        self.assertNotIn(removed, store.get_state())
+        self.assertEqual(store.get_state(), state)
+        self.assertEqual(store.race_history(removed)[-1], (1.0, None))
+        store.close()
+
+    def test_removed_keyframe(self):
+        store = HistoryStore(self.path, keyframe_interval=2)
+        self.append_polls(store, 3)
+        removed = self.parser.races[-1].contest_code
+        self.lines = [l for l in self.lines
+                      if int(l[:4]) != removed]
+        state = self.snapshot()
+        store.append(self.parser.races, timestamp=3.0)
+        self.assertEqual(store._conn.execute(
+            "SELECT keyframe FROM snapshots ORDER BY id DESC").fetchone()[0],
+            1)
+        self.assertNotIn(removed, store.get_state())
+        self.assertEqual(store.get_state(), state)
+        history = store.race_history(removed)
+        self.assertEqual(history[-1], (3.0, None))
+        self.assertEqual(len(history), 2)
+        store.close()
+
+    def test_race_history(self):
+        store = HistoryStore(self.path, keyframe_interval=3)
+        states = self.append_polls(store, 10)
+        contest_code = int(self.lines[5][:4])
+        expected = []
+        for i, state in enumerate(states):
+            if not expected or expected[-1][1] != state[contest_code]:
+                expected.append((float(i), state[contest_code]))
+        self.assertEqual(store.race_history(contest_code), expected)
+        store.close()
+
+    def test_reopen(self):
+        store = HistoryStore(self.path, keyframe_interval=3)
+        self.append_polls(store, 4)
+        store.close()
+
+        store = HistoryStore(self.path, keyframe_interval=3)
+        self.assertIsNone(store.append(self.parser.races, timestamp=5))
+        self.set_line(5, vote_total=54321)
+        state = self.snapshot()
+        store.append(self.parser.races, timestamp=6)
+        self.assertEqual(store.get_state(), state)
+        keyframes = [k for k, in store._conn.execute(
+            "SELECT keyframe FROM snapshots ORDER BY id")]
+        self.assertEqual(keyframes, [1, 0, 0, 0, 1])
+        store.close()
+
+    def test_client(self):
+        store = HistoryStore(self.path)
+        body = ''.join(self.lines).encode('utf-8')
+        server = StubServer(routes={
+            ('GET', '/ap/summary.txt'): lambda request: (200, {
+                'Content-Type': 'text/plain; charset=utf-8'}, body),
+        }).start()
+        try:
+            client = SummaryClient(url=server.url('/ap/summary.txt'),
+                history=store)
+            client.fetch()
+            client.fetch()
+        finally:
+            server.stop()
+        self.assertEqual(len(store), 1)
+        self.assertEqual(len(store.get_state()), len(client.races))
+        store.close()
@@ -0,0 +1,52 @@
+# -*- coding=utf-8 -*-
+from unittest import TestCase
+
+from chi_elections.precincts import PrecinctParser, WardParser
+from chi_elections.summary import SummaryParser
+from chi_elections.synthetic import SyntheticElection
+
+
+class SyntheticElectionTestCase(TestCase):
+    def setUp(self):
+        self.election = SyntheticElection(races=3, candidates=4, wards=5,
+            precincts=6)
+
+    def test_summary(self):
+        parser = SummaryParser()
+        parser.parse(self.election.summary_text())
+        self.assertEqual([race.name for race in parser.races],
+            self.election.race_names)
+        race = parser.races[1]
+        self.assertEqual(race.contest_code, 11)
+        self.assertEqual(race.precincts_total, 30)
+        self.assertEqual(race.precincts_reporting, 30)
+        self.assertEqual(race.vote_for, 1)
+        self.assertEqual([c.full_name for c in race.candidates],
+            self.election.candidates)
+        self.assertEqual([c.vote_total for c in race.candidates],
+            self.election.race_totals(2))
+
+    def test_summary_reporting(self):
+        lines = list(self.election.summary_lines(reporting=0.5,
+            numeric_only=True))
+        self.assertEqual(len(lines), 12)
+        self.assertEqual(len(lines[0]), 22)
+        self.assertEqual(lines[0][18:22], '0015')
+        self.assertEqual(int(lines[0][11:18]),
+            int(self.election.race_totals(1)[0] * 0.5))
+
+    def test_pages(self):
+        ward_results = WardParser().parse(
+            self.election.ward_results_html('RACE 2'))
+        precinct_results = PrecinctParser().parse(
+            self.election.precinct_results_html(2, 3))
+
+        ward_3 = [r['votes'] for r in ward_results
+                  if r['reporting_unit_id'] == '3' and
+                  r['candidate'] != 'Votes Cast']
+        self.assertEqual(ward_3, self.election.votes(2, 3))
+        totals = [r['votes'] for r in precinct_results
+                  if r['reporting_unit_id'] == 'Total' and
+                  r['candidate'] != 'Votes Cast']
+        self.assertEqual(totals, ward_3)
+        self.assertEqual(len(precinct_results), 7 * 5)
@@ -0,0 +1,154 @@
+# -*- coding=utf-8 -*-
+import io
+import json
+import os
+import os.path
+import shutil
+import tempfile
+from unittest import TestCase
+
+import requests
+
+from chi_elections.summary import SummaryClient
+from chi_elections.watch import (ChangeBroadcaster, EventServer,
+        SummaryWatcher)
+
+from stub_server import StubServer
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'data')
+SUMMARY_2016_PRIMARY_TEST_FILENAME = os.path.join(TEST_DATA_DIR, 'results',
+    'ap', 'summary__2016_primary.txt')
+
+
+class SummaryWatcherTestCase(TestCase):
+    def setUp(self):
+        with io.open(SUMMARY_2016_PRIMARY_TEST_FILENAME, encoding='utf-8') as f:
+            self.lines = f.read().splitlines(True)
+        self.body = ''.join(self.lines)
+        self.server = StubServer(routes={
+            ('GET', '/ap/summary.txt'): lambda request: (200, {
+                'Content-Type': 'text/plain'}, self.body),
+        }).start()
+        self.tmpdir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.tmpdir, 'snapshot.json')
+        self.broadcaster = ChangeBroadcaster()
+        self.watcher = SummaryWatcher(
+            client=SummaryClient(url=self.server.url('/ap/summary.txt'),
+                incremental=True),
+            interval=1, max_interval=8, backoff=2,
+            snapshot_path=self.snapshot_path,
+            broadcaster=self.broadcaster,
+            sleep=lambda seconds: None)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def set_line(self, i, vote_total=None, precincts_reporting=None):
+        line = self.lines[i]
+        if vote_total is not None:
+            line = line[:11] + "{:07d}".format(vote_total) + line[18:]
+        if precincts_reporting is not None:
+            line = line[:18] + "{:04d}".format(precincts_reporting) + line[22:]
+        self.lines[i] = line
+        self.body = ''.join(self.lines)
+
+    def test_incremental_client(self):
+        client = SummaryClient(url=self.server.url('/ap/summary.txt'))
+        self.assertFalse(client.incremental)
+        with self.assertRaises(ValueError):
+            SummaryWatcher(client=client)
+
+    def test_adaptive_interval(self):
+        self.watcher.poll()
+        self.assertEqual(self.watcher.wait, 1)
+        self.watcher.poll()
+        self.assertEqual(self.watcher.wait, 2)
+        self.watcher.poll()
+        self.assertEqual(self.watcher.wait, 4)
+
+        # Vote totals alone don't speed polling up
+        self.set_line(0, vote_total=12345)
+        self.assertEqual(len(self.watcher.poll().votes_changed), 1)
+        self.assertEqual(self.watcher.wait, 4)
+
+        self.watcher.run(max_polls=6)
+        self.assertEqual(self.watcher.wait, 8)
+
+        self.set_line(0, precincts_reporting=42)
+        self.assertEqual(len(self.watcher.poll().precincts_changed), 1)
+        self.assertEqual(self.watcher.wait, 1)
+
+    def test_snapshot(self):
+        self.watcher.poll()
+        with open(self.snapshot_path) as f:
+            snapshot = json.load(f)
+        self.assertEqual(len(snapshot), len(self.watcher.client.races))
+        self.assertEqual(snapshot[0]['candidates'][0]['vote_total'],
+            self.watcher.client.races[0].candidates[0].vote_total)
+
+        self.set_line(0, vote_total=12345)
+        self.watcher.poll()
+        with open(self.snapshot_path) as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot[0]['candidates'][0]['vote_total'], 12345)
+        self.assertEqual(os.listdir(self.tmpdir), ['snapshot.json'])
+        # Readable by a web server running as another user
+        self.assertEqual(os.stat(self.snapshot_path).st_mode & 0o044, 0o044)
+
+    def test_publish(self):
+        q = self.broadcaster.subscribe()
+        self.watcher.poll()
+        self.watcher.poll()
+        self.assertEqual(q.qsize(), 1)
+        event_id, event, data = q.get_nowait()
+        self.assertEqual(event, 'changes')
+        self.assertEqual(len(data['races_added']),
+            len(self.watcher.client.races))
+
+        # New subscribers start with the snapshot
+        q = self.broadcaster.subscribe()
+        event_id, event, data = q.get_nowait()
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(len(data), len(self.watcher.client.races))
+
+
+class ChangeBroadcasterTestCase(TestCase):
+    def test_slow_subscriber(self):
+        broadcaster = ChangeBroadcaster(max_queue=2)
+        slow = broadcaster.subscribe()
+        for i in range(3):
+            broadcaster.publish('changes', i)
+        self.assertEqual(len(broadcaster), 0)
+        self.assertIsNone(slow.get_nowait())
+
+
+class EventServerTestCase(TestCase):
+    def setUp(self):
+        self.broadcaster = ChangeBroadcaster()
+        self.server = EventServer(self.broadcaster).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_events(self):
+        self.broadcaster.set_snapshot([{'contest_code': 1}])
+        r = requests.get(self.server.url + '/events', stream=True, timeout=5)
+        self.assertEqual(r.headers['Content-Type'], 'text/event-stream')
+        lines = r.iter_lines(chunk_size=1, decode_unicode=True)
+        self.assertEqual([next(lines) for i in range(3)],
+            ['id: 0', 'event: snapshot', 'data: [{"contest_code": 1}]'])
+        self.assertEqual(next(lines), '')
+
+        self.broadcaster.publish('changes', {'votes_changed': []})
+        self.assertEqual([next(lines) for i in range(3)],
+            ['id: 1', 'event: changes', 'data: {"votes_changed": []}'])
+        r.close()
+
+    def test_snapshot(self):
+        r = requests.get(self.server.url + '/snapshot')
+        self.assertEqual(r.status_code, 503)
+        self.broadcaster.set_snapshot([{'contest_code': 1}])
+        r = requests.get(self.server.url + '/snapshot')
+        self.assertEqual(r.json(), [{'contest_code': 1}])
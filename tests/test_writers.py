@@ -0,0 +1,96 @@
+# -*- coding=utf-8 -*-
+import io
+import json
+from unittest import TestCase
+
+from chi_elections.writers import (ArrowWriter, CSVWriter, NDJSONWriter,
+        ParquetWriter, iter_batches)
+
+FIELDS = [('race_name', str), ('ward', int), ('precinct', int),
+          ('votes', int)]
+ROWS = [
+    (u'Mayor', 1, 1, 10),
+    (u'Mayor', 1, None, 20),
+    (u'Delegate, National Convention 4th DEM', 2, '3', 30),
+    (u'Álvaro', 2, '', 0),
+]
+
+
+class IterBatchesTestCase(TestCase):
+    def test_iter_batches(self):
+        self.assertEqual(list(iter_batches(iter(range(5)), 2)),
+            [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_batches([], 2)), [])
+
+
+class CSVWriterTestCase(TestCase):
+    def test_write(self):
+        f = io.StringIO()
+        writer = CSVWriter(f, FIELDS)
+        writer.batch_size = 3
+        writer.write(iter(ROWS))
+        writer.close()
+        self.assertEqual(f.getvalue().splitlines(), [
+            'race_name,ward,precinct,votes',
+            'Mayor,1,1,10',
+            'Mayor,1,,20',
+            '"Delegate, National Convention 4th DEM",2,3,30',
+            u'Álvaro,2,,0',
+        ])
+
+
+class NDJSONWriterTestCase(TestCase):
+    def test_write(self):
+        f = io.StringIO()
+        writer = NDJSONWriter(f, FIELDS)
+        writer.write(iter(ROWS))
+        writer.close()
+        rows = [json.loads(l) for l in f.getvalue().splitlines()]
+        self.assertEqual(rows[1], {'race_name': 'Mayor', 'ward': 1,
+            'precinct': None, 'votes': 20})
+        self.assertEqual(len(rows), len(ROWS))
+        # Values are converted to the fields' types
+        self.assertEqual([row['precinct'] for row in rows], [1, None, 3, None])
+
+
+class ArrowWriterTestCase(TestCase):
+    writer_cls = ArrowWriter
+
+    def setUp(self):
+        try:
+            import pyarrow
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        self.pyarrow = pyarrow
+
+    def read_table(self, content):
+        return self.pyarrow.ipc.open_file(self.pyarrow.BufferReader(
+            content)).read_all()
+
+    def test_write(self):
+        f = io.BytesIO()
+        writer = self.writer_cls(f, FIELDS)
+        writer.batch_size = 3
+        writer.write(iter(ROWS))
+        writer.close()
+
+        table = self.read_table(f.getvalue())
+        self.assertEqual(table.column_names,
+            [name for name, type in FIELDS])
+        self.assertEqual(table.schema.field('votes').type,
+            self.pyarrow.int64())
+        self.assertEqual(table.column('precinct').to_pylist(),
+            [1, None, 3, None])
+        self.assertEqual(table.column('race_name').to_pylist()[3], u'Álvaro')
+
+
+class ParquetWriterTestCase(ArrowWriterTestCase):
+    writer_cls = ParquetWriter
+
+    def read_table(self, content):
+        import pyarrow.parquet
+
+        parquet_file = pyarrow.parquet.ParquetFile(
+            self.pyarrow.BufferReader(content))
+        self.assertEqual(parquet_file.num_row_groups, 2)
+        return parquet_file.read()